@@ -15,6 +15,7 @@ import threading
 # Check for other required modules
 try:
     from modules.voice_recognition import VoiceRecognizer
+    from modules.endpointer import intent_class
     from modules.command_processor import CommandProcessor
     from modules.spotify_controller import SpotifyController
     from modules.youtube_controller import YouTubeController
@@ -175,6 +176,9 @@ class Natasha:
             
             # Process the command
             result = self.command_processor.process(command)
+            if isinstance(result, tuple) and len(result) == 2:
+                # Learn how long this speaker pauses in this kind of command
+                self.voice_recognizer.endpointer.learn(intent_class(result[0]))
             response = self._handle_command_result(result, command)
             
             if not response:
@@ -187,8 +191,8 @@ class Natasha:
             # Log the interaction
             self.logger.log_interaction(command, response, sentiment)
             
-            # Speak the response
-            self.voice_recognizer.speak(response)
+            # Speak the response; the user can talk over it to correct it
+            self.voice_recognizer.speak(response, barge_in=True)
             
             return response
         except Exception as e:
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Measure how long the assistant keeps talking after the user starts to
+talk over it: from the start of the user's speech in a simulated 16 kHz
+microphone stream to the moment the assistant's audio stops. The speech
+pipeline plays the help text in real time, once with a stoppable player
+(as with winsound or simpleaudio) and once speaking directly through the
+engine, where the sentence being spoken can't be cut short. Also checks
+that the echo of the assistant's own speech doesn't trigger a barge-in.
+
+Usage: python benchmarks/bench_barge_in.py
+"""
+
+import os
+import sys
+import time
+import threading
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_speech_pipeline import HELP_TEXT
+from modules.barge_in import BargeInMonitor
+from modules.speech_pipeline import SpeechPipeline
+from utils.benchmark import percentile
+
+RATE = 16000
+CHUNK = 1024  # the default of speech_recognition.Microphone
+ECHO_LEVEL = 150  # RMS of the speakers picked up by the microphone
+VOICE_LEVEL = 2000  # RMS of the user talking
+VOICE_SECONDS = 0.6
+# Speech runs at ~15 characters per second, synthesis at a fifth of real time
+AUDIO_SECONDS_PER_CHAR = 0.066
+SYNTHESIS_FACTOR = 0.2
+
+
+class SimulatedAudio:
+    """Renderer and stoppable player that sleep for as long as the audio would take
+
+    Notes when the last sound ended, so the stop can be timed in either mode.
+    """
+
+    def __init__(self):
+        self.stopped = threading.Event()
+        self.idle = threading.Event()
+        self.idle.set()
+        self.ended = None
+
+    def render(self, text, path):
+        time.sleep(len(text) * AUDIO_SECONDS_PER_CHAR * SYNTHESIS_FACTOR)
+        with open(path, "w") as file:
+            file.write(text)
+
+    def speak(self, text):
+        self._sound(len(text) * AUDIO_SECONDS_PER_CHAR, threading.Event())
+
+    def __call__(self, path):
+        with open(path) as file:
+            duration = len(file.read()) * AUDIO_SECONDS_PER_CHAR
+        self.stopped.clear()
+        self._sound(duration, self.stopped)
+
+    def stop(self):
+        self.stopped.set()
+
+    def _sound(self, duration, stopped):
+        self.idle.clear()
+        stopped.wait(duration)
+        self.ended = time.perf_counter()
+        self.idle.set()
+
+
+class SimulatedMicrophone:
+    """A speech_recognition-like source delivering echo, and the user's voice from voice_at seconds, in real time"""
+
+    CHUNK = CHUNK
+    SAMPLE_RATE = RATE
+
+    def __init__(self, rng, voice_at=None):
+        self.stream = self
+        self.rng = rng
+        self.start = time.perf_counter()
+        self.position = 0
+        self.voice = None if voice_at is None else (int(voice_at * RATE), int((voice_at + VOICE_SECONDS) * RATE))
+
+    def voice_started(self):
+        """Get the perf_counter time the user started talking"""
+        return self.start + self.voice[0] / RATE
+
+    def read(self, size):
+        # A frame can only be read once all of it has been captured
+        end = self.position + size
+        delay = self.start + end / RATE - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        samples = self.rng.standard_normal(size) * ECHO_LEVEL
+        if self.voice:
+            positions = np.arange(self.position, end)
+            talking = (positions >= self.voice[0]) & (positions < self.voice[1])
+            samples += talking * np.sin(2 * np.pi * 220 * positions / RATE) * VOICE_LEVEL * np.sqrt(2)
+        self.position = end
+        return np.clip(samples, -32768, 32767).astype('<i2').tobytes()
+
+
+def barge_in_run(pipeline, audio, monitor, rng):
+    """Talk over the help text; returns ms from the start of the voice to the audio stopping"""
+    job = pipeline.speak(HELP_TEXT)
+    source = SimulatedMicrophone(rng, voice_at=rng.uniform(0.5, 2.5))
+    stopped = []
+
+    def stop_speech():
+        pipeline.cancel(job)
+        stopped.append(time.perf_counter())
+
+    if monitor.monitor(source, job, stop_speech) is None:
+        raise AssertionError("The user talking over the speech didn't stop it")
+    audio.idle.wait()
+    return (max(audio.ended, stopped[0]) - source.voice_started()) * 1000
+
+
+def main():
+    rng = np.random.default_rng(7)
+    runs = 8
+    print(f"Barge-in on the help text, {runs} runs per mode, {CHUNK}-sample frames at {RATE // 1000} kHz")
+
+    for mode, streaming in (("stoppable player", True), ("direct engine", False)):
+        audio = SimulatedAudio()
+        pipeline = SpeechPipeline(audio, audio if streaming else False)
+        monitor = BargeInMonitor(silence_ms=200)
+        latencies = [barge_in_run(pipeline, audio, monitor, rng) for _ in range(runs)]
+
+        if streaming:
+            # The echo of a sentence alone must not interrupt it
+            job = pipeline.speak("Here are things I can help you with, in a few words.")
+            if monitor.monitor(SimulatedMicrophone(rng), job, lambda: pipeline.cancel(job)) is not None:
+                raise AssertionError("The echo of the speech triggered a barge-in")
+
+        stats = monitor.stats()
+        print(f"  {mode:16}: voice start to audio stopped p50 {percentile(latencies, 50):6.0f}ms "
+              f"max {max(latencies):6.0f}ms, first loud frame read to stop p50 {stats['reaction_p50_ms']:.2f}ms")
+        pipeline.close()
+    print("  echo alone: no barge-in")
+
+
+if __name__ == "__main__":
+    main()
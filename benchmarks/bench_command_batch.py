@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Measure the throughput of cli_app's batch mode (command_batch.process_lines)
+with 1, 2, 4, ... worker processes up to the number of cores, on synthetic
+commands: a mix of the stock commands and text that matches none of them.
+Output is checked to be in input order and the same for every worker count.
+
+Usage: python benchmarks/bench_command_batch.py [--lines N]
+"""
+
+import os
+import sys
+import time
+import random
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.command_batch import process_lines
+from utils.benchmark import synthetic_utterances
+
+COMMANDS = [
+    "tell me a joke", "set a timer for 10", "what time is it", "search for cheap flights to lisbon",
+    "remember that the spare key is under the mat", "roll a dice", "roll 20 sided dice",
+    "remind me to call mom in 2", "who are you", "help"
+]
+
+
+def synthetic_lines(count, seed=3):
+    """Half stock commands, half other text"""
+    rng = random.Random(seed)
+    others = synthetic_utterances(count, 50)
+    return [rng.choice(COMMANDS) if rng.random() < 0.5 else others[i] for i in range(count)]
+
+
+def main():
+    count = int(sys.argv[sys.argv.index("--lines") + 1]) if "--lines" in sys.argv else 200000
+    lines = synthetic_lines(count)
+    cores = os.cpu_count() or 1
+    worker_counts = sorted({1} | {2 ** k for k in range(1, cores.bit_length() + 1) if 2 ** k <= cores} | {cores})
+
+    print(f"{count} lines, {cores} cores")
+    print(f"{'workers':>8} {'seconds':>9} {'lines/s':>10} {'speedup':>8}")
+    expected, baseline = None, None
+    for workers in worker_counts:
+        start = time.perf_counter()
+        records = list(process_lines(iter(lines), workers))
+        seconds = time.perf_counter() - start
+        if expected is None:
+            expected, baseline = records, seconds
+        elif records != expected:
+            raise SystemExit(f"{workers} workers gave different output")
+        print(f"{workers:8} {seconds:9.2f} {count / seconds:10.0f} {baseline / seconds:7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Compare the CommandRouter with the re.search loop over every command
+pattern that CommandProcessor.process used before, at 10, 100 and 1000
+commands.
+
+Usage: python benchmarks/bench_command_router.py
+"""
+
+import os
+import random
+import re
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.command_processor import CommandProcessor
+from modules.command_router import CommandRouter
+from modules.utterance import Utterance
+from utils.benchmark import VOCABULARY, intent_keywords, time_calls, format_summary
+
+
+def synthetic_commands(count):
+    """Build the stock command patterns followed by keyword commands"""
+    patterns = list(CommandProcessor().commands)
+    for i in range(count - len(patterns)):
+        first, second = intent_keywords(i, 2)
+        patterns.append(rf'(?i){first}\s+(?:the\s+)?{second}\s*(.*)')
+    return patterns
+
+
+def synthetic_texts(count, command_count, seed=11):
+    """Build texts that mostly miss, sometimes mention a keyword command"""
+    rng = random.Random(seed)
+    texts = []
+    for _ in range(count):
+        words = rng.choices(VOCABULARY, k=rng.randint(3, 10))
+        if rng.random() < 0.3 and command_count > 10:
+            words.insert(rng.randint(0, len(words)), " ".join(intent_keywords(rng.randrange(command_count - 10), 2)))
+        texts.append(" ".join(words))
+    return texts
+
+
+def linear_match(patterns, text):
+    """The previous CommandProcessor.process loop"""
+    for index, pattern in enumerate(patterns):
+        match = re.search(pattern, text)
+        if match:
+            return index, match
+    return None
+
+
+def check_case_mapping():
+    """Check that words lower() and casefold() map differently still find their commands"""
+    patterns = [r'straße\s+(.*)', r'(?i)λόγος\s+(.*)']
+    router = CommandRouter(patterns)
+    for text in ("Straße nach Hause", "straße nach hause", "ο λόγος μου"):
+        expected = linear_match(router.regexes, text)
+        for routed in (router.match(text), router.match(Utterance(text))):
+            if (expected and (expected[0], expected[1].span())) != (routed and (routed[0], routed[1].span())):
+                raise AssertionError(f"Mismatch for {text!r}")
+
+
+def main():
+    check_case_mapping()
+    for command_count in (10, 100, 1000):
+        patterns = synthetic_commands(command_count)
+        router = CommandRouter(patterns)
+        texts = synthetic_texts(300, command_count)
+
+        # Past 512 patterns the re.search loop also recompiles, as they no longer fit the re cache
+        for text in texts:
+            expected = linear_match(router.regexes, text)
+            routed = router.match(text)
+            if (expected and (expected[0], expected[1].span())) != (routed and (routed[0], routed[1].span())):
+                raise AssertionError(f"Mismatch for {text!r}")
+
+        print(f"\n{command_count} commands")
+        print(format_summary("  re.search loop", time_calls(lambda t: linear_match(patterns, t), texts)))
+        print(format_summary("  command router", time_calls(router.match, texts)))
+
+
+if __name__ == "__main__":
+    main()
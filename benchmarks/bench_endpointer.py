@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Measure end-of-speech latency of the adaptive endpointer on a corpus of
+commands and dictated phrases: the time from the end of the last word to
+the end of capture, and how many phrases were cut off before the speaker
+finished. Compared with the fixed endpointing of Recognizer.listen(), which
+waits for 0.8 s of quiet and cuts phrases at phrase_time_limit (10 s in
+VoiceRecognizer.listen, 5 s in the SpeechRecognizer loop).
+
+The corpus is synthetic: a fast and a slow speaker, each saying commands of
+two to four words and, in random order, dictation of seven to fourteen
+words: a command phrase ("remind me to") and free text with a few longer
+pauses to think once it is under way.
+
+Usage: python benchmarks/bench_endpointer.py
+"""
+
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_wake_word import OTHER_SYLLABLES, RATE, synthesize_word
+from modules.endpointer import COMMAND, DICTATION, Endpointer
+from utils.benchmark import percentile
+
+THRESHOLD = 150
+NOISE = 60
+CHUNK = 1024
+
+# (name, shortest and longest gap between words in seconds)
+SPEAKERS = [("fast", 0.06, 0.18), ("slow", 0.15, 0.40)]
+
+
+class ArraySource:
+    """An audio source over samples, followed by background noise once they run out"""
+
+    def __init__(self, samples, rng):
+        self.SAMPLE_RATE = RATE
+        self.SAMPLE_WIDTH = 2
+        self.CHUNK = CHUNK
+        self.samples = samples
+        self.rng = rng
+        self.position = 0
+        self.stream = self
+
+    def read(self, size):
+        part = self.samples[self.position:self.position + size]
+        if len(part) < size:
+            tail = (self.rng.standard_normal(size - len(part)) * NOISE).astype(np.int16)
+            part = np.concatenate((part, tail))
+        self.position += size
+        return part.astype('<i2').tobytes()
+
+
+def phrase(rng, words, gaps, pauses=0):
+    """Say words with gaps between them, a few of them long; returns samples and where speech ends"""
+    parts = [rng.standard_normal(int(RATE * 0.3)) * NOISE]
+    # Pauses to think come in the free text, a few words after the command phrase
+    candidates = range(5, words - 1)
+    long_gaps = set(rng.choice(candidates, size=min(pauses, len(candidates)), replace=False)) if pauses else set()
+    for i in range(words):
+        syllables = [OTHER_SYLLABLES[j] for j in rng.choice(len(OTHER_SYLLABLES), size=rng.integers(1, 3))]
+        parts.append(synthesize_word(syllables, rng, jitter=0.2))
+        if i < words - 1:
+            gap = rng.uniform(0.4, 0.7) if i in long_gaps else rng.uniform(*gaps)
+            parts.append(np.zeros(int(RATE * gap)))
+    end = sum(len(part) for part in parts)
+    speech = np.concatenate(parts)
+    speech = speech + rng.standard_normal(len(speech)) * NOISE
+    return np.clip(speech, -32768, 32767).astype(np.int16), end
+
+
+def corpus(rng, gaps, count=40):
+    """Build the phrases of one speaker: (class, samples, speech end)"""
+    phrases = []
+    for _ in range(count):
+        if rng.uniform() < 0.7:
+            phrases.append((COMMAND,) + phrase(rng, int(rng.integers(2, 5)), gaps))
+        else:
+            phrases.append((DICTATION,) + phrase(rng, int(rng.integers(7, 15)), gaps, pauses=2))
+    return phrases
+
+
+def fixed_endpoint(source, pause_threshold=0.8, phrase_time_limit=10):
+    """End a phrase like Recognizer.listen(): after pause_threshold of quiet chunks, or at the limit"""
+    chunk_seconds = CHUNK / RATE
+    while np.sqrt(np.mean(np.frombuffer(source.read(CHUNK), dtype='<i2').astype(np.float32) ** 2)) <= THRESHOLD:
+        pass
+    start = source.position - CHUNK
+    quiet = 0.0
+    while quiet < pause_threshold and (source.position - start) / RATE < phrase_time_limit:
+        energy = np.sqrt(np.mean(np.frombuffer(source.read(CHUNK), dtype='<i2').astype(np.float32) ** 2))
+        quiet = 0.0 if energy > THRESHOLD else quiet + chunk_seconds
+    return source.position
+
+
+def main():
+    rng = np.random.default_rng(11)
+    noise = np.random.default_rng(12)
+    results = {"fixed 0.8s, 10s limit": [], "fixed 0.8s, 5s limit": [], "adaptive": []}
+
+    for name, low, high in SPEAKERS:
+        endpointer = Endpointer(RATE, energy_threshold=THRESHOLD)
+        for phrase_class, samples, end in corpus(rng, (low, high)):
+            for label, limit in (("fixed 0.8s, 10s limit", 10), ("fixed 0.8s, 5s limit", 5)):
+                source = ArraySource(samples, noise)
+                results[label].append((name, phrase_class, fixed_endpoint(source, phrase_time_limit=limit) - end))
+
+            source = ArraySource(samples, noise)
+            endpointer.capture(source)
+            endpointer.learn(phrase_class)  # the app files the phrase under its command's class
+            results["adaptive"].append((name, phrase_class, source.position - end))
+        stats = endpointer.stats()
+        print(f"{name} speaker: adaptive quiet {stats['command_silence_ms']:.0f}ms for commands, "
+              f"{stats['dictation_silence_ms']:.0f}ms for dictation after {stats['dictation_after_ms']:.0f}ms of speech")
+
+    print()
+    print(f"{'endpointing':24} {'class':10} {'p50 ms':>8} {'p95 ms':>8} {'cut off':>8}")
+    for label, rows in results.items():
+        for phrase_class in (COMMAND, DICTATION):
+            offsets = [offset / RATE * 1000 for _, cls, offset in rows if cls == phrase_class]
+            latencies = [offset for offset in offsets if offset >= 0]
+            cut = len(offsets) - len(latencies)
+            print(f"{label:24} {phrase_class:10} {percentile(latencies, 50):8.0f} {percentile(latencies, 95):8.0f} "
+                  f"{cut:4}/{len(offsets)}")
+
+
+if __name__ == "__main__":
+    main()
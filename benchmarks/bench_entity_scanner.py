@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Compare the merged EntityScanner with the per-pattern finditer loop that
+NLPProcessor.extract_entities used before, on short commands and on long
+dictated notes.
+
+Usage: python benchmarks/bench_entity_scanner.py
+"""
+
+import os
+import random
+import re
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.entity_scanner import EntityScanner
+from utils.benchmark import VOCABULARY, time_calls, format_summary
+
+DEFAULT_ENTITIES = [
+    {"tag": "time_unit", "patterns": [
+        {"regex": "\\b(minute|minutes|min)\\b", "value": "minutes"},
+        {"regex": "\\b(second|seconds|sec)\\b", "value": "seconds"},
+        {"regex": "\\b(hour|hours|hr)\\b", "value": "hours"},
+        {"regex": "\\b(day|days)\\b", "value": "days"},
+    ]},
+    {"tag": "location", "patterns": [
+        {"regex": "\\bin ([a-zA-Z\\s]+)\\b", "group": 1},
+        {"regex": "\\bfor ([a-zA-Z\\s]+)\\b", "group": 1},
+    ]},
+    {"tag": "number", "patterns": [
+        {"regex": "\\b(\\d+)\\b", "group": 1},
+    ]},
+]
+
+
+def extra_entities(count):
+    """Build additional keyword entity types"""
+    return [
+        {"tag": f"keyword_{i}", "patterns": [{"regex": f"\\b(word{i}a|word{i}b)\\b", "value": f"kw{i}"}]}
+        for i in range(count)
+    ]
+
+
+def compile_per_pattern(entities):
+    """Compile entity patterns the way compile_patterns used to"""
+    return {
+        entity["tag"]: [
+            {"regex": re.compile(p["regex"], re.IGNORECASE), "value": p.get("value"), "group": p.get("group", 0)}
+            for p in entity["patterns"]
+        ]
+        for entity in entities
+    }
+
+
+def per_pattern_extract(compiled, text):
+    """The previous extract_entities implementation"""
+    entities = {}
+    for entity_type, patterns in compiled.items():
+        entities[entity_type] = []
+        for info in patterns:
+            for match in info["regex"].finditer(text):
+                value = info["value"] or match.group(info["group"])
+                if entity_type == "number":
+                    try:
+                        value = int(value)
+                    except ValueError:
+                        pass
+                entities[entity_type].append({"value": value, "start": match.start(info["group"]), "end": match.end(info["group"])})
+    return entities
+
+
+def make_texts(count, words, seed=3):
+    """Build texts of the given length from vocabulary, numbers and time units"""
+    rng = random.Random(seed)
+    pool = VOCABULARY + ["5", "10", "minutes", "hours", "in", "for", "word3a"]
+    return [" ".join(rng.choices(pool, k=words)) + "." for _ in range(count)]
+
+
+def main():
+    for extra in (0, 50):
+        entities = DEFAULT_ENTITIES + extra_entities(extra)
+        compiled = compile_per_pattern(entities)
+        scanner = EntityScanner(entities)
+        pattern_count = sum(len(entity["patterns"]) for entity in entities)
+
+        for label, texts in (("command", make_texts(300, 8)), ("dictated note", make_texts(30, 400))):
+            for text in texts:
+                expected = {k: v for k, v in per_pattern_extract(compiled, text).items() if v}
+                if expected != scanner.extract(text):
+                    raise AssertionError(f"Mismatch for {text!r}")
+
+            print(f"\n{pattern_count} entity patterns, {label}")
+            print(format_summary("  per-pattern loop", time_calls(lambda t: per_pattern_extract(compiled, t), texts)))
+            print(format_summary("  merged scanner  ", time_calls(scanner.extract, texts)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Compare VoiceAssistant._extract_command on a shared Utterance with the
+version that lowercased the text for every check, and check that both
+give the same command and arguments, including for amounts written
+without a space ("10min", "2hours").
+
+Usage: python benchmarks/bench_extract_command.py
+"""
+
+import os
+import random
+import re
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.utterance import Utterance
+from modules.voice_assistant import VoiceAssistant
+from utils.benchmark import VOCABULARY, time_calls, format_summary
+
+CASES = [
+    ("timer", "set a timer for 10 minutes"),
+    ("timer", "set a timer for 10min"),
+    ("timer", "set timer for 30sec"),
+    ("timer", "set a timer"),
+    ("reminder", "remind me to stretch in 2 hours"),
+    ("reminder", "remind me to stretch in 2hours"),
+    ("reminder", "remind me to call mom in 15min"),
+    ("reminder", "remind me to call mom"),
+    ("volume", "turn the volume up"),
+    ("calculation", "calculate 12 times 7"),
+    ("search", "search cheap flights"),
+    ("unknown", "open the calculator"),
+    ("unknown", "play jazz on spotify"),
+]
+
+
+def string_extract_command(text, intent):
+    """The previous _extract_command implementation"""
+    intent_to_command = {
+        'weather': ('weather', 'local'),
+        'time': ('get_time', None),
+        'reminder': ('reminder', None),
+        'timer': ('timer', None),
+        'search': ('search', text.replace('search', '').strip()),
+        'play': ('youtube', text.replace('play', '').strip()),
+        'volume': ('volume', None),
+        'joke': ('joke', None),
+        'calculation': ('math', None),
+        'help': ('help', None)
+    }
+    if intent['intent'] in intent_to_command:
+        cmd, default_args = intent_to_command[intent['intent']]
+        if cmd == 'timer':
+            match = re.search(r'(\d+)\s*(minute|minutes|min|second|seconds|sec)', text.lower())
+            if match:
+                amount = int(match.group(1))
+                if match.group(2).startswith('sec'):
+                    amount /= 60
+                return (cmd, amount)
+            return (cmd, 5)
+        elif cmd == 'reminder':
+            match = re.search(r'remind\s+me\s+to\s+(.+?)\s+in\s+(\d+)\s*(hour|hours|minute|minutes|min)', text.lower())
+            if match:
+                amount = int(match.group(2))
+                if match.group(3).startswith('min'):
+                    amount /= 60
+                return (cmd, (match.group(1), amount))
+        elif cmd == 'volume':
+            if 'up' in text.lower() or 'increase' in text.lower():
+                return (cmd, 'up')
+            elif 'down' in text.lower() or 'decrease' in text.lower() or 'lower' in text.lower():
+                return (cmd, 'down')
+            elif 'mute' in text.lower():
+                return (cmd, 'mute')
+        elif cmd == 'math':
+            expression = text.lower().replace('calculate', '').replace('compute', '').replace('what is', '').strip()
+            return (cmd, expression)
+        return (cmd, default_args)
+
+    if 'open' in text.lower() and len(text.split()) >= 2:
+        return ('app', text.lower().replace('open', '').strip())
+    if 'search for' in text.lower():
+        return ('search', text.lower().replace('search for', '').strip())
+    if 'play' in text.lower():
+        content = text.lower().replace('play', '').strip()
+        if 'spotify' in text.lower():
+            return ('spotify', content.replace('on spotify', '').strip())
+        return ('youtube', content.replace('on youtube', '').strip())
+    return ('search', text)
+
+
+def make_cases(count, seed=5):
+    """Build (intent, text) cases from the fixed ones and random commands"""
+    rng = random.Random(seed)
+    intents = [intent for intent, _ in CASES]
+    cases = list(CASES)
+    for _ in range(count - len(cases)):
+        words = rng.choices(VOCABULARY + ["10", "10min", "2hours", "30sec", "minutes"], k=rng.randint(3, 9))
+        cases.append((rng.choice(intents), " ".join(words)))
+    return cases
+
+
+def main():
+    # _extract_command uses nothing of the assistant, so it runs without one;
+    # process_input analyzes the utterance before the parsers run
+    utterances = {}
+
+    def extract(case):
+        intent, text = case
+        return VoiceAssistant._extract_command(None, utterances[text], {"intent": intent})
+
+    def previous(case):
+        intent, text = case
+        return string_extract_command(text, {"intent": intent})
+
+    cases = make_cases(2000)
+    utterances.update((text, Utterance(text)) for _, text in cases)
+    for case in cases:
+        if extract(case) != previous(case):
+            raise AssertionError(f"Mismatch for {case!r}: {extract(case)!r} != {previous(case)!r}")
+
+    print(f"{len(cases)} commands, same results")
+    print(format_summary("  lowercase per check", time_calls(previous, cases, repeat=5)))
+    print(format_summary("  shared Utterance   ", time_calls(extract, cases, repeat=5)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Compare the single-pass IntentMatcher with the per-pattern regex loop
+that NLPProcessor.extract_intent used before.
+
+Usage: python benchmarks/bench_intent_matcher.py
+"""
+
+import os
+import re
+import sys
+from collections import defaultdict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.intent_matcher import IntentMatcher
+from utils.benchmark import synthetic_intents, synthetic_utterances, time_calls, format_summary
+
+
+def compile_regex_loop(intents):
+    """Compile patterns the way compile_patterns used to"""
+    return {
+        intent["tag"]: [re.compile(f"\\b{pattern}\\b", re.IGNORECASE) for pattern in intent["patterns"]]
+        for intent in intents["intents"]
+    }
+
+
+def regex_loop_best_match(compiled_patterns, text):
+    """The previous extract_intent implementation"""
+    best_match = {"intent": "unknown", "confidence": 0}
+    matches = defaultdict(int)
+
+    for intent, patterns in compiled_patterns.items():
+        for pattern in patterns:
+            if pattern.search(text.lower()):
+                matches[intent] += 1
+
+    for intent, match_count in matches.items():
+        confidence = match_count / max(1, len(compiled_patterns[intent]))
+        if confidence > best_match["confidence"]:
+            best_match = {"intent": intent, "confidence": confidence}
+
+    return best_match
+
+
+def main():
+    for intent_count in (10, 100, 1000):
+        utterances = synthetic_utterances(200, intent_count)
+        intents = synthetic_intents(intent_count)
+        compiled_patterns = compile_regex_loop(intents)
+        matcher = IntentMatcher(intents["intents"])
+
+        for text in utterances:
+            expected = regex_loop_best_match(compiled_patterns, text)
+            actual = matcher.best_match(text)
+            if expected != actual:
+                raise AssertionError(f"Mismatch for {text!r}: {expected} != {actual}")
+
+        print(f"\n{intent_count} intents ({intent_count * 10} patterns)")
+        print(format_summary("  regex loop  ", time_calls(lambda t: regex_loop_best_match(compiled_patterns, t), utterances)))
+        print(format_summary("  intent index", time_calls(matcher.best_match, utterances)))
+
+
+if __name__ == "__main__":
+    main()
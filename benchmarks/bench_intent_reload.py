@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Compare a full recompile of intents.json with the incremental reload used
+by the intents file watcher, for changes of 1 and 10 intents.
+
+Usage: python benchmarks/bench_intent_reload.py
+"""
+
+import copy
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.nlp_processor import NLPProcessor
+from utils.benchmark import synthetic_intents, synthetic_utterances
+
+
+def modified(intents, count):
+    """Copy intents with the patterns of the first count intents changed"""
+    new_intents = copy.deepcopy(intents)
+    for intent in new_intents["intents"][:count]:
+        intent["patterns"] = [pattern + " please" for pattern in intent["patterns"]]
+    return new_intents
+
+
+def check_order(directory):
+    """Check that ties between intents resolve like a fresh compile after intents are removed, re-added and moved"""
+    intents_file = os.path.join(directory, "order.json")
+    tags = ["first", "second", "third"]
+
+    def intents_in(order):
+        return {"intents": [{"tag": tag, "patterns": ["shared words", f"only {tag}"]} for tag in order]}
+
+    with open(intents_file, "w") as file:
+        json.dump(intents_in(tags), file)
+    nlp = NLPProcessor(intents_file)
+    for order in (tags[1:], tags[1:] + tags[:1], ["third", "second", "first"]):
+        new_intents = intents_in(order)
+        nlp.update_intents(new_intents)
+        with open(intents_file, "w") as file:
+            json.dump(new_intents, file)
+        fresh = NLPProcessor(intents_file)
+        for text in ("shared words", "shared wrds"):
+            if nlp.extract_intent(text) != fresh.extract_intent(text):
+                raise AssertionError(f"Tie resolved differently after reload to {order} for {text!r}")
+
+
+def main():
+    with tempfile.TemporaryDirectory() as directory:
+        check_order(directory)
+        intents_file = os.path.join(directory, "intents.json")
+
+        for intent_count in (100, 1000):
+            intents = synthetic_intents(intent_count)
+            with open(intents_file, "w") as file:
+                json.dump(intents, file)
+            nlp = NLPProcessor(intents_file)
+
+            start = time.perf_counter()
+            nlp.compile_patterns()
+            full_time = time.perf_counter() - start
+
+            print(f"\n{intent_count} intents: full recompile {full_time * 1000:.1f}ms")
+
+            for changed in (1, 10):
+                new_intents = modified(intents, changed)
+                nlp.update_intents(intents)
+
+                start = time.perf_counter()
+                nlp.update_intents(new_intents)
+                incremental_time = time.perf_counter() - start
+
+                # The incremental tables must behave like a fresh compile
+                with open(intents_file, "w") as file:
+                    json.dump(new_intents, file)
+                fresh = NLPProcessor(intents_file)
+                for text in synthetic_utterances(200, intent_count):
+                    if nlp.extract_intent(text) != fresh.extract_intent(text):
+                        raise AssertionError(f"Mismatch after reload for {text!r}")
+
+                print(f"  {changed} changed: incremental reload {incremental_time * 1000:.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
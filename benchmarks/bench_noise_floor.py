@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Measure the background noise floor estimator on synthetic audio: a quiet
+room, a fan switching on and off again, and a word about every three
+seconds throughout. Reports how long the energy threshold takes to follow
+each change in the noise level, whether speech stays above it, and the
+CPU cost, next to the per-turn cost of the old calibration, which read
+half a second of audio with adjust_for_ambient_noise() before every
+listen.
+
+Usage: python benchmarks/bench_noise_floor.py
+"""
+
+import os
+import sys
+import time
+import types
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_wake_word import OTHER_SYLLABLES, RATE, synthesize_word
+from modules.noise_floor import NoiseFloorEstimator
+
+# (seconds, noise level) of each stretch of the recording
+STRETCHES = [(20, 60), (20, 400), (20, 60)]
+CALIBRATION_MS = 500
+
+
+def recording(rng):
+    """Build the recording; returns the samples and the (start, end) positions of the words"""
+    samples = np.concatenate([rng.standard_normal(seconds * RATE) * level for seconds, level in STRETCHES])
+    words = []
+    for start in np.arange(1.0, len(samples) / RATE - 1, 3.0):
+        syllables = [OTHER_SYLLABLES[j] for j in rng.choice(len(OTHER_SYLLABLES), size=2)]
+        word = synthesize_word(syllables, rng)
+        offset = int((start + rng.uniform(0, 1)) * RATE)
+        samples[offset:offset + len(word)] += word
+        words.append((offset, offset + len(word)))
+    return np.clip(samples, -32768, 32767).astype(np.int16), words
+
+
+def main():
+    samples, words = recording(np.random.default_rng(3))
+    # The estimator only needs the sample rate when it is fed directly
+    estimator = NoiseFloorEstimator(types.SimpleNamespace(rate=RATE))
+
+    thresholds = []
+    start = time.process_time()
+    for offset in range(0, len(samples), estimator.window):
+        thresholds.append((offset + estimator.window, estimator.process(samples[offset:offset + estimator.window])))
+    cpu = time.process_time() - start
+    seconds = len(samples) / RATE
+
+    print(f"Recording of {seconds:.0f}s, {len(words)} words, noise levels {[level for _, level in STRETCHES]}")
+
+    # Time for the threshold to settle within 25% of its value at the end of each stretch
+    position = 0
+    for seconds_in, level in STRETCHES:
+        end = position + seconds_in * RATE
+        inside = [(at, value) for at, value in thresholds if position < at <= end]
+        target = inside[-1][1]
+        settled = next(at for at, value in inside
+                       if all(abs(v - target) <= 0.25 * target for a, v in inside if a >= at))
+        print(f"  noise {level}: threshold {target:.0f}, settled {(settled - position) / RATE:.2f}s after the change")
+        position = end
+
+    # Speech stays above the threshold when its loudest window beats it
+    heard = 0
+    for first, last in words:
+        threshold = max(value for at, value in thresholds if first <= at <= last)
+        window = samples[first:last].astype(np.float32)
+        frames = window[:len(window) // estimator.window * estimator.window].reshape(-1, estimator.window)
+        heard += np.sqrt(np.mean(frames ** 2, axis=1)).max() > threshold
+    print(f"  words above the threshold: {heard}/{len(words)}")
+
+    print(f"  estimator CPU: {cpu / seconds * 3600:.2f} seconds per hour ({cpu / seconds * 100:.3f}% of a core)")
+    print(f"  latency before each listen: per-turn calibration {CALIBRATION_MS}ms, estimator 0ms")
+
+
+if __name__ == "__main__":
+    main()
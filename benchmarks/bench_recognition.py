@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Measure recognition latency of the recognizer race compared with the old
+sequential fallback, which only ran Sphinx after Google failed. Uses
+stand-in backends: a cloud recognizer that usually answers in about half a
+second but is sometimes slow, sometimes doesn't understand and sometimes
+fails after a network timeout, and a local recognizer that answers in
+about 300 ms with a low confidence.
+
+Delays are scaled down by --scale (default 0.05) to keep the run short;
+latencies are reported at full scale.
+
+Usage: python benchmarks/bench_recognition.py [--trials N] [--scale F]
+"""
+
+import os
+import sys
+import time
+import random
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.recognition import RecognitionRace, StandInBackend
+from utils.benchmark import percentile
+
+NETWORK_TIMEOUT = 5.0
+
+
+class CloudStandIn(StandInBackend):
+    """A cloud recognizer with a network: fast, slow, not understood or timed out"""
+
+    def __init__(self, rng, scale):
+        super().__init__("cloud", "turn on the kitchen lights", confidence=0.9)
+        self.rng = rng
+        self.scale = scale
+
+    def recognize(self, audio):
+        roll = self.rng.random()
+        if roll < 0.05:
+            time.sleep(NETWORK_TIMEOUT * self.scale)
+            raise TimeoutError("recognition request timed out")
+        if roll < 0.08:
+            time.sleep(self.rng.uniform(0.4, 0.8) * self.scale)
+            return None
+        slow = roll < 0.18
+        time.sleep((self.rng.uniform(1.5, 3.0) if slow else self.rng.lognormvariate(-0.8, 0.3)) * self.scale)
+        return self.transcript, self.confidence
+
+
+def sequential(cloud, local, audio):
+    """The old fallback: the local recognizer only after the cloud failed or didn't understand"""
+    try:
+        answer = cloud.recognize(audio)
+        if answer:
+            return answer
+    except Exception:
+        pass
+    return local.recognize(audio)
+
+
+def main():
+    trials = int(sys.argv[sys.argv.index("--trials") + 1]) if "--trials" in sys.argv else 200
+    scale = float(sys.argv[sys.argv.index("--scale") + 1]) if "--scale" in sys.argv else 0.05
+
+    rng = random.Random(4)
+    cloud = CloudStandIn(rng, scale)
+    local = StandInBackend("local", "turn on the kitchen light", confidence=0.5,
+                           delay=lambda: rng.uniform(0.25, 0.35) * scale)
+    race = RecognitionRace([cloud, local], min_confidence=0.6, deadline=1.5 * scale, patience=1.0 * scale)
+
+    # Both strategies start from the same random network conditions
+    results = {"sequential fallback": [], "race": []}
+    deadline = race.deadline / scale
+    for label in results:
+        rng.seed(4)
+        for _ in range(trials):
+            start = time.perf_counter()
+            if label == "race":
+                race.recognize(None)
+            else:
+                sequential(cloud, local, None)
+            results[label].append((time.perf_counter() - start) / scale * 1000)
+    race.shutdown()
+
+    print(f"{trials} recognitions, cloud: 5% time out after {NETWORK_TIMEOUT:.0f}s, 3% not understood, 10% slow")
+    print(f"{'strategy':22} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    for label, latencies in results.items():
+        print(f"{label:22} {percentile(latencies, 50):8.0f} {percentile(latencies, 95):8.0f} "
+              f"{percentile(latencies, 99):8.0f} {max(latencies):8.0f}")
+    stats = race.stats()
+    print(f"race (deadline {deadline:.1f}s, patience {race.patience / scale:.1f}s): {stats['confident']} confident, "
+          f"{stats['fallback']} fell back to the most confident answer, "
+          f"{stats['deadline']} hit the deadline, {stats['patience']} ran out of patience, wins {stats['wins']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Measure how long alerts (reminders, timers) wait before they are spoken
+while replies and chatter arrive faster than they can be spoken, with the
+old unbounded FIFO queue compared with the ResponseQueue.
+
+Speech is simulated with a fixed duration per character (scaled down 100x);
+a preempted response stops at once.
+
+Usage: python benchmarks/bench_response_queue.py [--seconds N]
+"""
+
+import os
+import sys
+import time
+import queue
+import random
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.response_queue import ResponseQueue, ALERT, REPLY, CHATTER
+from utils.benchmark import percentile
+
+AUDIO_SECONDS_PER_CHAR = 0.066 / 100
+
+REPLIES = [
+    "It's 3:45 PM.",
+    "The weather in current location is currently sunny with a temperature of 72 degrees.",
+    "Why don't scientists trust atoms? Because they make up everything!",
+    "Hi! I'm Natasha, your voice assistant. Here are things I can help you with: weather information, "
+    "time and date, reminders, timers, web searches, media, volume control, jokes, math calculations "
+    "and opening applications. You can also ask me questions like 'What's your name?' or 'How are you?'",
+]
+CHATTER_TEXTS = ["Still working on that, give me a moment.", "I'm listening"]
+
+
+def fifo_consumer(responses, latencies, stop):
+    """Speak every response to completion in arrival order"""
+    while not stop.is_set():
+        try:
+            queued, priority, text = responses.get(timeout=0.05)
+        except queue.Empty:
+            continue
+        latencies.setdefault(priority, []).append((time.perf_counter() - queued) * 1000)
+        time.sleep(len(text) * AUDIO_SECONDS_PER_CHAR)
+
+
+def priority_consumer(responses, stop):
+    """Speak the most urgent response until it ends or is preempted"""
+    while not stop.is_set():
+        response = responses.get(timeout=0.05)
+        if response is None:
+            continue
+        response.job = threading.Event()
+        if not response.preempted:
+            response.job.wait(len(response.text) * AUDIO_SECONDS_PER_CHAR)
+        responses.done(response)
+
+
+def produce(put, seconds, seed=3):
+    """Queue a reply every 15ms, chatter every 45ms and an alert every 150ms"""
+    rng = random.Random(seed)
+    start = time.perf_counter()
+    tick = 0
+    while time.perf_counter() - start < seconds:
+        put(rng.choice(REPLIES), REPLY)
+        if tick % 3 == 0:
+            put(rng.choice(CHATTER_TEXTS), CHATTER)
+        if tick % 10 == 0:
+            put(f"Reminder: task number {tick}", ALERT)
+        tick += 1
+        time.sleep(0.015)
+
+
+def report(label, latencies, extra=""):
+    """Print delivery latency per message class"""
+    print(f"  {label}{extra}")
+    for priority in (ALERT, REPLY, CHATTER):
+        values = latencies.get(priority, [])
+        print(f"    {priority:7} delivered {len(values):4}  p50 {percentile(values, 50):8.1f}ms  "
+              f"p95 {percentile(values, 95):8.1f}ms  max {max(values, default=0.0):8.1f}ms")
+
+
+def run_fifo(seconds):
+    """Run the load against the old unbounded FIFO queue"""
+    responses, latencies, stop = queue.Queue(), {}, threading.Event()
+    consumer = threading.Thread(target=fifo_consumer, args=(responses, latencies, stop), daemon=True)
+    consumer.start()
+    produce(lambda text, priority: responses.put((time.perf_counter(), priority, text)), seconds)
+    stop.set()
+    consumer.join()
+    report("FIFO queue", latencies, f" (backlog left: {responses.qsize()})")
+
+
+def run_priority(seconds):
+    """Run the load against the ResponseQueue"""
+    responses = ResponseQueue(maxsize=20, on_preempt=lambda response: response.job and response.job.set())
+    stop = threading.Event()
+    consumer = threading.Thread(target=priority_consumer, args=(responses, stop), daemon=True)
+    consumer.start()
+    produce(responses.put, seconds)
+    stop.set()
+    consumer.join()
+
+    stats = responses.stats()
+    latencies = {priority: list(responses.latency_ms[priority]) for priority in stats["latency"]}
+    report("ResponseQueue", latencies, f" (backlog left: {stats['pending']}, coalesced {stats['coalesced']}, "
+                                      f"dropped {stats['dropped']}, preempted {stats['preempted']})")
+
+
+def main():
+    seconds = float(sys.argv[sys.argv.index("--seconds") + 1]) if "--seconds" in sys.argv else 3.0
+    print(f"{seconds:.0f}s of replies every 15ms, chatter every 45ms and alerts every 150ms")
+    run_fifo(seconds)
+    run_priority(seconds)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Load test the multi-session server: start it on a local port and run
+concurrent client sessions against it, each on its own keep-alive HTTP
+connection, sending utterances one after the other and waiting for each
+answer. Reports requests per second and latency percentiles for each
+number of concurrent sessions, and how many requests were turned away
+with 429 or 503 (a turned away request is retried after a short pause).
+
+The assistant runs with speech off and the network stand-ins of the
+replay mode. Needs Flask.
+
+Usage: python benchmarks/bench_server.py [--sessions 1,10,50] [--requests N] [--workers N]
+"""
+
+import os
+import sys
+import json
+import time
+import logging
+import threading
+import contextlib
+import http.client
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.session_manager import build_session_manager
+from modules.transcript_replay import StandInKeys, StandInTranslator
+from modules.web_server import FLASK_AVAILABLE, make_http_server
+from utils.benchmark import percentile
+
+UTTERANCES = [
+    "hello", "what time is it", "tell me a joke", "thank you", "what is your name",
+    "how are you", "what's the weather like", "calculate 12 times 7", "help"
+]
+
+
+def call(connection, method, path, body=None):
+    """Send a request on a keep-alive connection; returns (status, parsed JSON body)"""
+    headers = {"Content-Type": "application/json"} if body is not None else {}
+    connection.request(method, path, body=json.dumps(body) if body is not None else None, headers=headers)
+    response = connection.getresponse()
+    data = response.read()
+    return response.status, json.loads(data) if data else None
+
+
+def client(port, requests, offset, results):
+    """One session: create it, then send requests utterances, each after the previous answer"""
+    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    status, body = call(connection, "POST", "/sessions")
+    if status != 201:
+        results["session_errors"] += 1
+        return
+    path = f"/sessions/{body['session']}/utterances"
+    for i in range(requests):
+        text = UTTERANCES[(offset + i) % len(UTTERANCES)]
+        while True:
+            start = time.perf_counter()
+            status, body = call(connection, "POST", path, {"text": text})
+            if status in (429, 503):
+                results["rejected"][status] += 1
+                time.sleep(0.01)
+                continue
+            break
+        results["latencies"].append(time.perf_counter() - start)
+        results["statuses"][status] = results["statuses"].get(status, 0) + 1
+    call(connection, "DELETE", f"/sessions/{path.split('/')[2]}")
+    connection.close()
+
+
+def load(port, sessions, requests):
+    """Run sessions clients at once; returns their results and the wall time"""
+    results = {"latencies": [], "statuses": {}, "rejected": {429: 0, 503: 0}, "session_errors": 0}
+    threads = [threading.Thread(target=client, args=(port, requests, i, results)) for i in range(sessions)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results, time.perf_counter() - start
+
+
+def main():
+    if not FLASK_AVAILABLE:
+        print("The server needs Flask: pip install flask")
+        return
+    levels = [int(n) for n in sys.argv[sys.argv.index("--sessions") + 1].split(",")] if "--sessions" in sys.argv else [1, 10, 50]
+    requests = int(sys.argv[sys.argv.index("--requests") + 1]) if "--requests" in sys.argv else 100
+    workers = int(sys.argv[sys.argv.index("--workers") + 1]) if "--workers" in sys.argv else 8
+
+    manager = build_session_manager(workers=workers, max_pending=workers * 8, max_sessions=max(levels) + 1)
+    manager.assistant.api_key_manager = StandInKeys()
+    manager.assistant.translator = StandInTranslator()
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+    server = make_http_server(manager, "127.0.0.1", 0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    rows = []
+    # The assistant prints every turn; keep the report readable
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        for sessions in levels:
+            rows.append((sessions,) + load(server.server_port, sessions, requests))
+    server.shutdown()
+    manager.shutdown()
+    manager.assistant.stop()
+
+    print(f"{requests} requests per session, {workers} workers")
+    print(f"{'sessions':>8} {'requests':>9} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'429':>6} {'503':>6}")
+    for sessions, results, seconds in rows:
+        latencies = [latency * 1000 for latency in results["latencies"]]
+        print(f"{sessions:8} {len(latencies):9} {len(latencies) / seconds:8.0f} {percentile(latencies, 50):8.2f} "
+              f"{percentile(latencies, 95):8.2f} {percentile(latencies, 99):8.2f} "
+              f"{results['rejected'][429]:6} {results['rejected'][503]:6}")
+
+
+if __name__ == "__main__":
+    main()
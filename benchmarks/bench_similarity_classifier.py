@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Measure the similarity fallback classifier: per-query latency and
+classify_batch throughput at 1,000 to 10,000 patterns. First check, on the
+default intents, that small talk no pattern matches stays unknown at the
+default threshold and misspelled commands don't.
+
+Usage: python benchmarks/bench_similarity_classifier.py
+"""
+
+import os
+import sys
+import time
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.intent_classifier import SimilarityClassifier
+from modules.nlp_processor import NLPProcessor
+from utils.benchmark import synthetic_intents, synthetic_utterances, time_calls, format_summary
+
+SMALL_TALK = [
+    "hows it goin", "how is it going", "whats up", "who are you", "where are you", "see ya",
+    "what are you doing", "tell me about yourself", "how was your day", "whats new", "maybe later",
+    "that's great", "good night", "i am bored", "ok", "sure", "lol",
+]
+MISSPELLED = {
+    "set a timr": "timer", "what tim is it": "time", "incrase volume": "volume",
+    "is it rainin": "weather", "tel me a joke": "joke", "goodby": "farewell",
+}
+
+
+def check_threshold():
+    """Check the default threshold on the default intents"""
+    with tempfile.TemporaryDirectory() as directory:
+        intents = NLPProcessor(os.path.join(directory, "intents.json")).intents["intents"]
+    classifier = SimilarityClassifier(intents)
+    for text in SMALL_TALK:
+        result = classifier.classify(text)
+        if result["intent"] != "unknown":
+            raise AssertionError(f"Small talk {text!r} classified as {result}")
+    for text, intent in MISSPELLED.items():
+        result = classifier.classify(text)
+        if result["intent"] != intent:
+            raise AssertionError(f"{text!r} classified as {result}, not {intent}")
+    print(f"Threshold {classifier.threshold}: {len(SMALL_TALK)} small talk probes unknown, "
+          f"{len(MISSPELLED)} misspelled commands matched")
+
+
+def main():
+    check_threshold()
+    for intent_count in (100, 500, 1000):
+        intents = synthetic_intents(intent_count)
+        utterances = synthetic_utterances(2000, intent_count)
+
+        start = time.perf_counter()
+        classifier = SimilarityClassifier(intents["intents"])
+        build_time = time.perf_counter() - start
+
+        print(f"\n{intent_count} intents ({intent_count * 10} patterns), built in {build_time * 1000:.1f}ms")
+        print(format_summary("  classify      ", time_calls(classifier.classify, utterances[:500])))
+
+        start = time.perf_counter()
+        classifier.classify_batch(utterances)
+        batch_time = time.perf_counter() - start
+        print(f"  classify_batch: {len(utterances) / batch_time:.0f} utterances/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Compare time-to-first-audio and the gaps between sentences when a long
+response (the help text) is synthesized as a whole and then played, with
+the streaming SpeechPipeline.
+
+By default synthesis and playback are simulated with a fixed cost per
+character (scaled down 10x), so the benchmark runs without audio
+hardware. Pass --engine to use pyttsx3 and the local audio player.
+
+Usage: python benchmarks/bench_speech_pipeline.py [--engine]
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.speech_pipeline import SpeechPipeline, Pyttsx3Renderer, find_player
+
+HELP_TEXT = (
+    "Hi! I'm Natasha, your voice assistant. Here are things I can help you with:\n\n"
+    "- Weather information: 'What's the weather like?'\n"
+    "- Time and date: 'What time is it?'\n"
+    "- Reminders: 'Remind me to call John in 2 hours'\n"
+    "- Timers: 'Set a timer for 5 minutes'\n"
+    "- Web searches: 'Search for recipes for lasagna'\n"
+    "- Play media: 'Play Bohemian Rhapsody on YouTube'\n"
+    "- Volume control: 'Turn the volume up/down'\n"
+    "- Jokes: 'Tell me a joke'\n"
+    "- Math calculations: 'What is 15 times 7?'\n"
+    "- Open applications: 'Open calculator'\n\n"
+    "You can also ask me questions like 'What's your name?' or 'How are you?'"
+)
+
+# Simulated costs: speech runs at ~15 characters per second and synthesizes
+# at a fifth of real time, plus a fixed startup cost per call
+AUDIO_SECONDS_PER_CHAR = 0.066 / 10
+SYNTHESIS_FACTOR = 0.2
+SYNTHESIS_OVERHEAD = 0.02 / 10
+
+
+class SimulatedRenderer:
+    """Sleep for as long as synthesizing the text would take"""
+
+    def render(self, text, path):
+        time.sleep(SYNTHESIS_OVERHEAD + len(text) * AUDIO_SECONDS_PER_CHAR * SYNTHESIS_FACTOR)
+        with open(path, "w") as file:
+            file.write(text)
+
+    def speak(self, text):
+        self.render(text, os.devnull)
+        time.sleep(len(text) * AUDIO_SECONDS_PER_CHAR)
+
+
+def simulated_player(path):
+    """Sleep for as long as playing the rendered text would take"""
+    with open(path) as file:
+        time.sleep(len(file.read()) * AUDIO_SECONDS_PER_CHAR)
+
+
+def whole_text(renderer, player, directory, text):
+    """Synthesize the whole text, then play it; returns (first audio ms, total ms)"""
+    start = time.perf_counter()
+    path = os.path.join(directory, "whole.wav")
+    renderer.render(text, path)
+    first_audio = time.perf_counter() - start
+    player(path)
+    return first_audio * 1000, (time.perf_counter() - start) * 1000
+
+
+def main():
+    if "--engine" in sys.argv:
+        import pyttsx3
+        renderer, player = Pyttsx3Renderer(pyttsx3.init()), find_player()
+        if not player:
+            raise SystemExit("No audio player available (winsound or simpleaudio)")
+    else:
+        renderer, player = SimulatedRenderer(), simulated_player
+
+    pipeline = SpeechPipeline(renderer, player)
+    repeat = 5
+
+    results = [whole_text(renderer, player, pipeline.directory, HELP_TEXT) for _ in range(repeat)]
+    print(f"Help text, {len(HELP_TEXT)} characters, {repeat} runs")
+    print(f"  whole text: first audio {min(r[0] for r in results):7.1f}ms, "
+          f"total {min(r[1] for r in results):7.1f}ms")
+
+    totals = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        pipeline.speak(HELP_TEXT, wait=True)
+        totals.append((time.perf_counter() - start) * 1000)
+
+    stats = pipeline.stats()
+    print(f"  streaming:  first audio {stats['first_audio_p50_ms']:7.1f}ms, total {min(totals):7.1f}ms, "
+          f"gaps p50 {stats['gap_p50_ms']:.2f}ms p95 {stats['gap_p95_ms']:.2f}ms max {stats['gap_max_ms']:.2f}ms")
+
+    # A response with nothing to say must not stay behind as a pending job
+    for text in ("", "  \n "):
+        pipeline.speak(text, wait=True)
+    if pipeline.jobs:
+        raise AssertionError(f"{len(pipeline.jobs)} empty speech jobs left in the pipeline")
+    pipeline.close()
+
+
+if __name__ == "__main__":
+    main()
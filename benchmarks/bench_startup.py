@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Compare a cold startup, which compiles the routing tables from
+intents.json, with a warm startup from the mmap'd routing cache.
+
+Usage: python benchmarks/bench_startup.py
+"""
+
+import json
+import os
+import shutil
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.nlp_processor import NLPProcessor
+from modules.routing_cache import RoutingCache, build_routing_cache
+from utils.benchmark import synthetic_intents, synthetic_utterances
+
+
+def main():
+    with tempfile.TemporaryDirectory() as directory:
+        intents_file = os.path.join(directory, "intents.json")
+        cache_file = os.path.join(directory, "data", "routing_cache.bin")
+
+        for intent_count in (10, 100, 1000):
+            with open(intents_file, "w") as file:
+                json.dump(synthetic_intents(intent_count), file)
+
+            result = build_routing_cache(cache_file, intents_file)
+            if not result["loaded"]:
+                raise AssertionError("The routing cache just written didn't load")
+
+            # The cached tables must behave like a fresh compile
+            cold = NLPProcessor(intents_file)
+            warm = NLPProcessor(intents_file, routing_cache=RoutingCache(cache_file, intents_file))
+            for text in synthetic_utterances(200, intent_count):
+                if cold.extract_intent(text) != warm.extract_intent(text):
+                    raise AssertionError(f"Mismatch after cache load for {text!r}")
+
+            size = os.path.getsize(cache_file) / 1024
+            print(f"{intent_count:5d} intents: cold {result['cold_seconds'] * 1000:7.1f}ms, "
+                  f"warm {result['warm_seconds'] * 1000:7.1f}ms, cache {size:.0f}KB")
+
+        if hasattr(os, "getuid"):
+            # A cache and directory saved under a group-writable umask still load
+            shutil.rmtree(os.path.dirname(cache_file))
+            umask = os.umask(0o002)
+            try:
+                build_routing_cache(cache_file, intents_file)
+            finally:
+                os.umask(umask)
+            if RoutingCache(cache_file, intents_file).load() is None:
+                raise AssertionError("A routing cache saved under umask 002 didn't load")
+
+            # A cache someone else could have written is compiled over, not unpickled
+            os.chmod(cache_file, 0o666)
+            if RoutingCache(cache_file, intents_file).load() is not None:
+                raise AssertionError("Loaded a routing cache others can write to")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Measure the latency from the end of speech to a parsed command, for batch
+recognition (transcribe the phrase once it ended, then parse it) and for
+streaming recognition (transcribe while the phrase is captured, parse each
+partial transcript, then only finish the transcript and look the parse up).
+
+With --model DIR and --fixtures DIR this runs Vosk on the WAV files in
+DIR (16-bit mono) for both paths. Otherwise stand-in recognizers model an
+offline batch recognizer at a real-time factor of 0.3 and a streaming one
+that needs 50 ms to finish, on synthetic commands; their delays are scaled
+by --scale (default 0.2) and reported at full scale. Parsing always uses
+the real NLP processor on 1000 synthetic intents.
+
+Usage: python benchmarks/bench_streaming.py [--model DIR --fixtures DIR] [--scale F]
+"""
+
+import glob
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.nlp_processor import NLPProcessor
+from modules.parse_cache import ParseCache
+from modules.recognition import StandInBackend
+from modules.streaming_recognition import StandInStreamingBackend, StreamingTranscriber, VOSK_AVAILABLE
+from modules.utterance import Utterance
+from utils.benchmark import percentile, synthetic_intents, synthetic_utterances
+
+RATE = 16000
+FRAME = 480  # 30 ms, the endpointer's frame
+WORDS_PER_SECOND = 2.5
+
+
+class Parser:
+    """The parse stages of VoiceAssistant.process_input, with its parse cache and speculative slot"""
+
+    def __init__(self, nlp):
+        self.nlp = nlp
+        self.cache = ParseCache(512)
+        self.speculative = None
+
+    def _parse(self, utterance):
+        return {"intent": self.nlp.extract_intent(utterance), "entities": self.nlp.extract_entities(utterance)}
+
+    def parse_partial(self, text):
+        utterance = Utterance(text)
+        if self.speculative is None or self.speculative[0] != utterance.normalized:
+            self.speculative = (utterance.normalized, self._parse(utterance))
+
+    def parse(self, text):
+        utterance = Utterance(text)
+        parsed = self.cache.get(utterance.normalized)
+        if parsed is None:
+            if self.speculative and self.speculative[0] == utterance.normalized:
+                parsed = self.speculative[1]
+            else:
+                parsed = self._parse(utterance)
+            self.cache.put(utterance.normalized, parsed)
+        return parsed
+
+    def clear(self):
+        self.cache.clear()
+        self.speculative = None
+
+
+def stand_in_phrases(count):
+    """Synthetic commands with silent audio of a matching length: [(text, frames)]"""
+    phrases = []
+    for text in synthetic_utterances(count, 1000):
+        seconds = len(text.split()) / WORDS_PER_SECOND
+        phrases.append((text, bytes(int(seconds * RATE) * 2)))
+    return phrases
+
+
+def wav_phrases(directory):
+    """The WAV files of a directory: [(name, frames)]"""
+    from modules.wake_word import read_wav
+    phrases = []
+    for path in sorted(glob.glob(os.path.join(directory, "*.wav"))):
+        samples, rate = read_wav(path)
+        if rate != RATE:
+            print(f"Skipping {path}: {rate} Hz, not {RATE}")
+            continue
+        phrases.append((os.path.basename(path), samples.astype('<i2').tobytes()))
+    return phrases
+
+
+def transcribe_whole(backend, frames):
+    """Batch recognition with a streaming backend: all frames at once after the phrase ended"""
+    session = backend.stream(RATE)
+    session.accept(frames)
+    return session.finish()
+
+
+def timed(recognize, parser, scale):
+    """Recognize and parse; returns (total, parse) milliseconds, recognition at full scale"""
+    start = time.perf_counter()
+    text = recognize()
+    recognized = time.perf_counter()
+    if text:
+        parser.parse(text)
+    parsed = time.perf_counter()
+    return (recognized - start) / scale * 1000 + (parsed - recognized) * 1000, (parsed - recognized) * 1000
+
+
+def measure(phrases, make_backends, parser, scale):
+    """Time batch and streaming recognition of every phrase; returns {path: [(total, parse) ms]}"""
+    results = {"batch": [], "streaming": [], "streaming, parsed ahead": []}
+    for name, frames in phrases:
+        batch, streaming = make_backends(name, frames)
+
+        # Batch: the whole phrase is transcribed after it ended, then parsed
+        def recognize_batch():
+            answer = batch(frames)
+            return answer[0] if answer else None
+
+        results["batch"].append(timed(recognize_batch, parser, scale))
+        parser.clear()
+
+        # Streaming: frames are transcribed and partials parsed while the phrase is captured
+        transcriber = StreamingTranscriber(streaming, RATE, on_partial=parser.parse_partial)
+        for offset in range(0, len(frames), FRAME * 2):
+            transcriber.feed(frames[offset:offset + FRAME * 2])
+        final = {}
+
+        def recognize_streaming():
+            final["result"] = transcriber.finish()
+            return final["result"].text if final["result"] else None
+
+        timing = timed(recognize_streaming, parser, scale)
+        result = final["result"]
+        ahead = result is not None and Utterance(transcriber.partial).normalized == Utterance(result.text).normalized
+        results["streaming, parsed ahead" if ahead else "streaming"].append(timing)
+        parser.clear()
+    return results
+
+
+def main():
+    scale = float(sys.argv[sys.argv.index("--scale") + 1]) if "--scale" in sys.argv else 0.2
+
+    with tempfile.TemporaryDirectory() as directory:
+        intents_file = os.path.join(directory, "intents.json")
+        with open(intents_file, "w") as file:
+            json.dump(synthetic_intents(1000), file)
+        parser = Parser(NLPProcessor(intents_file))
+
+        if "--model" in sys.argv and "--fixtures" in sys.argv:
+            if not VOSK_AVAILABLE:
+                print("Vosk is not installed: pip install vosk")
+                return
+            from modules.streaming_recognition import VoskBackend
+            vosk_backend = VoskBackend(sys.argv[sys.argv.index("--model") + 1])
+            phrases = wav_phrases(sys.argv[sys.argv.index("--fixtures") + 1])
+            scale = 1.0
+            results = measure(phrases, lambda name, frames: (lambda audio: transcribe_whole(vosk_backend, audio),
+                                                             vosk_backend), parser, scale)
+            print(f"Vosk on {len(phrases)} recordings")
+        else:
+            phrases = stand_in_phrases(40)
+            results = measure(phrases, lambda text, frames: (
+                lambda audio: StandInBackend("local", text, delay=len(audio) / 2 / RATE * 0.3 * scale).recognize(audio),
+                StandInStreamingBackend("local", text, words_per_second=WORDS_PER_SECOND, final_delay=0.05 * scale)
+            ), parser, scale)
+            print(f"Stand-in recognizers on {len(phrases)} synthetic commands")
+
+    print(f"{'path':26} {'count':>6} {'p50 ms':>8} {'p95 ms':>8} {'parse p50 ms':>13}")
+    for label, timings in results.items():
+        totals = [total for total, _ in timings]
+        parses = [parse for _, parse in timings]
+        print(f"{label:26} {len(timings):6} {percentile(totals, 50):8.1f} {percentile(totals, 95):8.1f} "
+              f"{percentile(parses, 50):13.2f}")
+
+
+if __name__ == "__main__":
+    main()
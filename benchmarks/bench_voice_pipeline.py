@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+Measure the latency of each stage of the voice path by replaying recorded
+turns through VoiceAssistant in place of the microphone:
+
+- wake word: from the end of the wake word to its detection
+- speech-to-text: from the end of the command to its transcript, waiting
+  for the endpointer included
+- NLP: the parse stages of process_input
+- dispatch: from the parse to the first response, running the command
+- text-to-speech: from queuing the response to its first audio
+
+Each turn is a 16-bit WAV file: the wake word, a short pause and a
+command. A .txt file of the same name holds the transcript of the
+command, which a stand-in streaming recognizer reveals as the audio
+arrives, so no network is needed. With --model DIR Vosk transcribes the
+commands instead, and with --race the recognizers set in the preferences
+do. The wake word spotter uses the templates in --templates DIR (by
+default the ones recorded with record_wake_word). Without --fixtures,
+synthetic turns and templates are generated.
+
+Commands are really executed, so record harmless ones. Text-to-speech only
+runs when pyttsx3 is installed. Turns are replayed at --speed times real
+time (default 1); faster replays also shorten the pauses the endpointer
+waits for, so speech-to-text latencies come out lower.
+
+Usage: python benchmarks/bench_voice_pipeline.py [--fixtures DIR] [--templates DIR] [--model DIR | --race] [--speed F]
+"""
+
+import os
+import sys
+import time
+import tempfile
+import threading
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_wake_word import OTHER_SYLLABLES, WAKE_SYLLABLES, background, synthesize_word, write_wav
+from modules.audio_replay import ReplayMicrophone
+from modules.response_queue import REPLY
+from modules.streaming_recognition import StandInStreamingBackend
+from modules.user_preferences import UserPreferences
+from modules.voice_assistant import VoiceAssistant, STT_AVAILABLE
+from modules.wake_word import TEMPLATE_DIR, TemplateSpotter, WakeWordDetector
+from utils.benchmark import percentile
+
+COMMANDS = ["hey", "what time is it", "tell me a joke", "thank you", "help", "calculate 12 times 7"]
+NLP_STAGES = ("lookup", "custom_pattern", "intent", "entities", "command")
+STAGES = ["wake word", "speech-to-text", "NLP", "dispatch", "text-to-speech"]
+
+
+def generate_fixtures(directory, turns=12, seed=7):
+    """Write synthetic turns and wake word templates; returns (fixtures, templates) directories"""
+    rng = np.random.default_rng(seed)
+    fixtures, templates = os.path.join(directory, "turns"), os.path.join(directory, "templates")
+    os.makedirs(fixtures)
+    os.makedirs(templates)
+    for i in range(3):
+        write_wav(os.path.join(templates, f"template_{i}.wav"), synthesize_word(WAKE_SYLLABLES, rng, jitter=0.05))
+
+    for i in range(turns):
+        text = COMMANDS[i % len(COMMANDS)]
+        parts = [background(0.5, rng), synthesize_word(WAKE_SYLLABLES, rng), background(0.6, rng)]
+        for word in text.split():
+            syllables = [OTHER_SYLLABLES[j] for j in rng.choice(len(OTHER_SYLLABLES), size=rng.integers(1, 3))]
+            parts.append(synthesize_word(syllables, rng, jitter=0.2))
+            parts.append(background(rng.uniform(0.06, 0.18), rng))
+        parts.append(background(0.3, rng))
+        name = os.path.join(fixtures, f"turn_{i:02}")
+        write_wav(name + ".wav", np.concatenate(parts))
+        with open(name + ".txt", "w") as file:
+            file.write(text)
+    return fixtures, templates
+
+
+def read_transcript(path):
+    """Get the transcript next to a recording, or None"""
+    name = os.path.splitext(path)[0] + ".txt"
+    if not os.path.exists(name):
+        return None
+    with open(name) as file:
+        return file.read().strip()
+
+
+def wait_for_wake_word(capture, reader, detector, until):
+    """Read the capture until the wake word is heard or the stream reaches position until"""
+    while capture.position() < until and capture.running:
+        samples = reader.read(capture.chunk, timeout=0.5)
+        if samples is not None and detector.feed(samples, reader.position):
+            return True
+    return False
+
+
+def replay(assistant, microphone, detector, stand_in):
+    """Replay every turn; returns ({stage: [ms]}, {outcome: count})"""
+    capture = assistant.capture
+    latencies = {stage: [] for stage in STAGES}
+    outcomes = {"turns": len(microphone.segments), "woken": 0, "transcribed": 0, "correct": 0}
+
+    # Note when the first response of a turn is queued, whichever thread sends it
+    responded = threading.Event()
+    respond = assistant.respond
+
+    def timed_respond(text, priority=REPLY):
+        if text:
+            responded.set()
+        respond(text, priority)
+
+    assistant.respond = timed_respond
+
+    reader = capture.reader()
+    for segment in microphone.segments:
+        detector.reset()
+        if not wait_for_wake_word(capture, reader, detector, segment.end + capture.rate):
+            continue
+        latencies["wake word"].append((time.perf_counter() - microphone.wall_time(detector.wake_end)) * 1000)
+        outcomes["woken"] += 1
+
+        expected = read_transcript(segment.path)
+        if stand_in:
+            assistant.streaming = StandInStreamingBackend("transcript", expected or "")
+        text = assistant.listen(timeout=3, start=detector.wake_end)
+        # Look for the next wake word from here on, however long this turn takes
+        reader = capture.reader()
+        if not text:
+            continue
+        latencies["speech-to-text"].append((time.perf_counter() - microphone.wall_time(segment.speech_end)) * 1000)
+        outcomes["transcribed"] += 1
+        outcomes["correct"] += expected is not None and text.lower().strip() == expected.lower()
+
+        responded.clear()
+        start = time.perf_counter()
+        assistant.process_input(text)
+        last = assistant.get_pipeline_stats()["last"]
+        nlp = sum(last.get(stage, 0.0) for stage in NLP_STAGES)
+        latencies["NLP"].append(nlp)
+        if responded.wait(10):
+            latencies["dispatch"].append((time.perf_counter() - start) * 1000 - nlp)
+
+    assistant.respond = respond
+    return latencies, outcomes
+
+
+def wait_for_speech(assistant, timeout=30):
+    """Wait until the queued responses were spoken; returns their times to first audio in ms"""
+    if not assistant.tts:
+        return []
+    deadline = time.time() + timeout
+    while time.time() < deadline and (len(assistant.response_queue) or assistant.tts.pipeline.jobs):
+        time.sleep(0.1)
+    return list(assistant.tts.pipeline.first_audio_ms)
+
+
+def main():
+    if not STT_AVAILABLE:
+        print("speech_recognition is not installed: pip install SpeechRecognition")
+        return
+    speed = float(sys.argv[sys.argv.index("--speed") + 1]) if "--speed" in sys.argv else 1.0
+
+    with tempfile.TemporaryDirectory() as directory:
+        if "--fixtures" in sys.argv:
+            fixtures = sys.argv[sys.argv.index("--fixtures") + 1]
+            templates = sys.argv[sys.argv.index("--templates") + 1] if "--templates" in sys.argv else TEMPLATE_DIR
+        else:
+            fixtures, templates = generate_fixtures(directory)
+        spotter = TemplateSpotter.from_directory(templates)
+        if not spotter.templates:
+            print(f"No wake word templates in {templates}")
+            return
+
+        # A throwaway profile, so the replayed turns don't count as the user's
+        preferences = UserPreferences(os.path.join(directory, "preferences.json"))
+        preferences.set_preference("startup_greeting", False)
+        preferences.set_preference("watch_intents", False)
+        preferences.set_preference("streaming_stt", "--model" in sys.argv)
+        if "--model" in sys.argv:
+            preferences.set_preference("vosk_model", sys.argv[sys.argv.index("--model") + 1])
+
+        assistant = VoiceAssistant(preferences)
+        if "--model" in sys.argv and not assistant.streaming:
+            print("Vosk or its model is missing")
+            return
+        stand_in = "--model" not in sys.argv and "--race" not in sys.argv
+
+        # The wake word is spotted on the audio the assistant listens to
+        microphone = ReplayMicrophone(fixtures, speed=speed, gap=2.0)
+        assistant.microphone = microphone
+        capture = assistant.open_microphone()
+        detector = WakeWordDetector(spotter, capture.rate, buffer=capture.buffer)
+        assistant.start()
+        start = time.perf_counter()
+        latencies, outcomes = replay(assistant, microphone, detector, stand_in)
+        elapsed = time.perf_counter() - start
+        latencies["text-to-speech"] = wait_for_speech(assistant)
+        assistant.stop()
+        capture.stop()
+
+    recognizer = "Vosk" if "--model" in sys.argv else "the configured recognizers" if "--race" in sys.argv else "transcripts"
+    print(f"{outcomes['turns']} turns from {fixtures} at {speed:g}x in {elapsed:.1f}s, recognized with {recognizer}: "
+          f"{outcomes['woken']} woken, {outcomes['transcribed']} transcribed, {outcomes['correct']} correctly")
+    print(f"{'stage':16} {'count':>6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    for stage, values in latencies.items():
+        if not values:
+            print(f"{stage:16} {0:6} {'-':>8} {'-':>8} {'-':>8} {'-':>8}")
+            continue
+        print(f"{stage:16} {len(values):6} {percentile(values, 50):8.2f} {percentile(values, 95):8.2f} "
+              f"{percentile(values, 99):8.2f} {max(values):8.2f}")
+
+
+if __name__ == "__main__":
+    main()
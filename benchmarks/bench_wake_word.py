@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Measure the local wake word cascade (energy gate, then MFCC template
+matching) on WAV fixtures: CPU time per hour of idle listening, activation
+latency after the wake word ends, detection and false accept rates, and
+how many cloud requests the old per-chunk recognize_google loop would make
+on the same idle audio.
+
+Fixtures are 16-bit mono WAV files in a directory: template_*.wav (the
+wake word, used as templates), wake_*.wav (other recordings of the wake
+word), other_*.wav (other words) and idle_*.wav (background audio). Without
+--fixtures, synthetic fixtures are generated into a temporary directory.
+
+Usage: python benchmarks/bench_wake_word.py [--fixtures DIR] [--threshold N]
+"""
+
+import os
+import sys
+import glob
+import time
+import tempfile
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.wake_word import TemplateSpotter, WakeWordDetector, read_wav, save_wav
+from utils.benchmark import percentile
+
+RATE = 16000
+CHUNK = 1024
+
+# Formants (F1, F2) of the syllables of the synthetic wake word and of other words
+WAKE_SYLLABLES = [(700, 1200), (650, 1750), (500, 2300)]
+OTHER_SYLLABLES = [(300, 870), (400, 2000), (600, 1000), (250, 2250), (750, 1150), (450, 1400)]
+
+
+def synthesize_word(syllables, rng, jitter=0.1):
+    """Voice a sequence of (F1, F2) syllables with random variation in timing and pitch"""
+    f0 = 170 * rng.uniform(1 - jitter / 2, 1 + jitter / 2)
+    parts = []
+    for f1, f2 in syllables:
+        length = int(RATE * 0.16 * rng.uniform(1 - jitter, 1 + jitter))
+        t = np.arange(length) / RATE
+        envelope = np.sin(np.pi * np.arange(length) / length) ** 0.5
+        voice = sum(np.sin(2 * np.pi * f0 * k * t) / k for k in range(1, 8))
+        formants = (np.sin(2 * np.pi * f1 * rng.uniform(0.97, 1.03) * t)
+                    + 0.6 * np.sin(2 * np.pi * f2 * rng.uniform(0.97, 1.03) * t))
+        parts.append(envelope * (0.6 * voice + formants) * 3000)
+        parts.append(np.zeros(int(RATE * 0.03)))
+    return np.concatenate(parts)
+
+
+def background(seconds, rng, level=60):
+    """Low-level noise with a slow drift"""
+    noise = rng.standard_normal(int(RATE * seconds)) * level
+    return noise * (1 + 0.3 * np.sin(np.arange(len(noise)) / RATE * 0.5))
+
+
+def write_wav(path, samples):
+    """Write float samples as a 16-bit mono WAV file"""
+    save_wav(path, np.clip(samples, -32768, 32767), RATE)
+
+
+def generate_fixtures(directory, seed=5):
+    """Write synthetic fixtures"""
+    rng = np.random.default_rng(seed)
+    for i in range(3):
+        write_wav(os.path.join(directory, f"template_{i}.wav"), synthesize_word(WAKE_SYLLABLES, rng, jitter=0.05))
+    for i in range(20):
+        word = synthesize_word(WAKE_SYLLABLES, rng)
+        write_wav(os.path.join(directory, f"wake_{i}.wav"), word + background(len(word) / RATE, rng))
+    for i in range(20):
+        syllables = [OTHER_SYLLABLES[j] for j in rng.choice(len(OTHER_SYLLABLES), size=rng.integers(2, 4))]
+        word = synthesize_word(syllables, rng)
+        write_wav(os.path.join(directory, f"other_{i}.wav"), word + background(len(word) / RATE, rng))
+
+    # Ten minutes of background with another word about every 20 seconds
+    idle = background(600, rng)
+    for start in range(5, 595, 20):
+        syllables = [OTHER_SYLLABLES[j] for j in rng.choice(len(OTHER_SYLLABLES), size=3)]
+        word = synthesize_word(syllables, rng)
+        offset = int((start + rng.uniform(0, 5)) * RATE)
+        idle[offset:offset + len(word)] += word
+    write_wav(os.path.join(directory, "idle_0.wav"), idle)
+
+
+def load(directory, prefix):
+    """Load the fixtures with a name prefix"""
+    return [read_wav(path) for path in sorted(glob.glob(os.path.join(directory, f"{prefix}_*.wav")))]
+
+
+def feed(detector, samples):
+    """Feed samples in microphone-sized frames; returns the stream times (s) and CPU seconds of activations"""
+    activations = []
+    for offset in range(0, len(samples), CHUNK):
+        start = time.process_time()
+        heard = detector.process(samples[offset:offset + CHUNK].astype('<i2').tobytes())
+        if heard:
+            activations.append(((offset + CHUNK) / detector.rate, time.process_time() - start))
+    return activations
+
+
+def main():
+    threshold = float(sys.argv[sys.argv.index("--threshold") + 1]) if "--threshold" in sys.argv else 23.0
+    if "--fixtures" in sys.argv:
+        directory = sys.argv[sys.argv.index("--fixtures") + 1]
+    else:
+        directory = tempfile.mkdtemp(prefix="natasha_wake_")
+        generate_fixtures(directory)
+
+    spotter = TemplateSpotter(load(directory, "template"), threshold)
+    lead_in = background(2, np.random.default_rng(1))
+    tail = background(1, np.random.default_rng(2))
+
+    # Detection and activation latency: the wake word between stretches of background
+    latencies, detected = [], 0
+    for samples, rate in load(directory, "wake"):
+        detector = WakeWordDetector(spotter, rate)
+        activations = feed(detector, np.concatenate((lead_in, samples, tail)))
+        if activations:
+            detected += 1
+            stream_time, cpu = activations[0]
+            latencies.append((stream_time - (len(lead_in) + len(samples)) / rate + cpu) * 1000)
+
+    false_accepts = 0
+    others = load(directory, "other")
+    for samples, rate in others:
+        false_accepts += bool(feed(WakeWordDetector(spotter, rate), np.concatenate((lead_in, samples, tail))))
+
+    wakes = len(load(directory, "wake"))
+    print(f"Fixtures in {directory}, template threshold {threshold}")
+    print(f"  detected {detected}/{wakes} wake words, {false_accepts}/{len(others)} false accepts")
+    print(f"  activation latency after the wake word ends: p50 {percentile(latencies, 50):.0f}ms "
+          f"p95 {percentile(latencies, 95):.0f}ms")
+
+    # Idle listening cost
+    for samples, rate in load(directory, "idle"):
+        seconds = len(samples) / rate
+        detector = WakeWordDetector(spotter, rate)
+        start = time.process_time()
+        activations = feed(detector, samples)
+        cpu = time.process_time() - start
+        stats = detector.stats()
+
+        # The old loop listened for up to 3 s at a time and sent every phrase with a
+        # frame louder than the default energy threshold of 300 to Google
+        frames = samples[:len(samples) // CHUNK * CHUNK].astype(np.float32).reshape(-1, CHUNK)
+        loud = np.sqrt(np.mean(frames ** 2, axis=1)) > 300
+        per_window = 3 * rate // CHUNK
+        cloud = sum(1 for i in range(0, len(loud), per_window) if loud[i:i + per_window].any())
+        hours = seconds / 3600
+        print(f"  idle {seconds:.0f}s: {cpu / hours:.1f} CPU seconds per hour "
+              f"({cpu / seconds * 100:.2f}% of a core), {stats['segments']} segments checked, "
+              f"{len(activations)} false activations")
+        print(f"  cloud requests per hour: cascade 0, old loop {cloud / hours:.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,35 @@
+import sys
+import argparse
+
 from modules.command_processor import CommandProcessor
 
+def parse_arguments():
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description="Classify and route commands")
+    parser.add_argument("--batch", metavar="FILE", nargs="?", const="-",
+                        help="Process the lines of FILE (default: stdin) and write JSON lines to stdout, in input order")
+    parser.add_argument("--workers", type=int, help="Worker processes for --batch (default: one per core)")
+    parser.add_argument("--chunk-size", type=int, default=256, help="Lines sent to a worker at a time")
+    return parser.parse_args()
+
+def run_batch(path, workers=None, chunk_size=256):
+    """Process every line of a file or stdin on a process pool"""
+    from modules.command_batch import process_lines
+    
+    source = sys.stdin if path == "-" else open(path, encoding="utf-8")
+    try:
+        for record in process_lines(source, workers, chunk_size):
+            sys.stdout.write(record + "\n")
+    finally:
+        if source is not sys.stdin:
+            source.close()
+
 def main():
+    args = parse_arguments()
+    if args.batch:
+        run_batch(args.batch, args.workers, args.chunk_size)
+        return
+    
     processor = CommandProcessor()
     print("Ready to process commands. Type 'exit' to quit.")
     
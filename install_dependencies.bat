@@ -2,6 +2,9 @@
 echo Installing Natasha Assistant Dependencies...
 pip install -r requirements.txt
 echo.
+echo Preparing the speech cache...
+python main.py --prewarm-tts
+echo.
 echo Installation complete. You can now run Natasha using:
 echo python app.py
 echo.
@@ -7,6 +7,8 @@ A modular and extensible voice assistant framework
 import os
 import sys
 import argparse
+import tempfile
+import contextlib
 from modules.voice_assistant import VoiceAssistant
 
 def setup_environment():
@@ -29,6 +31,14 @@ def parse_arguments():
     parser.add_argument("--console", action="store_true", help="Run in console mode")
     parser.add_argument("--setup", action="store_true", help="Run initial setup")
     parser.add_argument("--debug", action="store_true", help="Enable debug logging")
+    parser.add_argument("--build-cache", action="store_true", help="Prebuild the routing tables for faster startup")
+    parser.add_argument("--prewarm-tts", action="store_true", help="Synthesize the fixed responses into the speech cache")
+    parser.add_argument("--replay", metavar="FILE", help="Time a transcript of utterances (JSONL or one per line) and exit")
+    parser.add_argument("--rate", type=float, help="Utterances per second for --replay (default: as fast as possible)")
+    parser.add_argument("--serve", action="store_true", help="Serve many users over HTTP and WebSocket instead of the console")
+    parser.add_argument("--host", default="127.0.0.1", help="Address for --serve")
+    parser.add_argument("--port", type=int, default=8080, help="Port for --serve")
+    parser.add_argument("--workers", type=int, default=8, help="Worker threads for --serve")
     return parser.parse_args()
 
 def run_setup():
@@ -72,6 +82,49 @@ def run_setup():
     
     print("\nSetup complete! You can run 'python main.py' to start your assistant.")
 
+def run_replay(path, rate=None):
+    """Push the utterances of a transcript through the assistant and report throughput and latency"""
+    from modules.transcript_replay import TranscriptReplay, build_replay_assistant, read_utterances
+    
+    utterances = read_utterances(path)
+    if not utterances:
+        print(f"No utterances in {path}")
+        return
+    
+    with tempfile.TemporaryDirectory() as directory:
+        assistant = build_replay_assistant(directory)
+        print(f"Replaying {len(utterances)} utterances from {path} " +
+              (f"at {rate:g} per second" if rate else "as fast as possible"))
+        # The assistant prints every turn; keep the report readable
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            stats = TranscriptReplay(assistant, rate).run(utterances)
+        assistant.stop()
+    
+    print(f"Answered {stats['answered']}/{stats['utterances']} in {stats['seconds']:.2f}s: "
+          f"{stats['per_second']:.1f} utterances per second")
+    print(f"{'intent':20} {'count':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for intent, summary in list(stats['intents'].items()) + [("all", stats['all'])]:
+        print(f"{intent:20} {summary['count']:7} {summary['p50_ms']:9.2f} {summary['p95_ms']:9.2f} {summary['p99_ms']:9.2f}")
+
+def run_server(host, port, workers):
+    """Serve text sessions over HTTP until interrupted"""
+    from modules.web_server import FLASK_AVAILABLE, SOCK_AVAILABLE, make_http_server
+    from modules.session_manager import build_session_manager
+    
+    if not FLASK_AVAILABLE:
+        print("The server needs Flask: pip install flask")
+        return
+    
+    manager = build_session_manager(workers=workers, max_pending=workers * 8)
+    server = make_http_server(manager, host, port)
+    print(f"Serving Natasha on http://{host}:{port} with {workers} workers" +
+          ("" if SOCK_AVAILABLE else " (install flask-sock for WebSocket sessions)"))
+    try:
+        server.serve_forever()
+    finally:
+        manager.shutdown()
+        manager.assistant.stop()
+
 def main():
     """Main function to run the assistant"""
     # Setup environment
@@ -85,9 +138,39 @@ def main():
         run_setup()
         return
     
+    # Build the routing cache if requested
+    if args.build_cache:
+        from modules.routing_cache import build_routing_cache
+        result = build_routing_cache()
+        print(f"Routing cache written to {result['cache_file']}")
+        print(f"Cold startup (compile): {result['cold_seconds'] * 1000:.1f}ms")
+        if result['loaded']:
+            print(f"Warm startup (cache):   {result['warm_seconds'] * 1000:.1f}ms")
+        else:
+            print("The routing cache written can't be loaded; startup will compile the tables")
+        return
+    
+    # Time a transcript if requested
+    if args.replay:
+        run_replay(args.replay, args.rate)
+        return
+    
+    # Serve many users if requested
+    if args.serve:
+        run_server(args.host, args.port, args.workers)
+        return
+    
     # Initialize voice assistant
     assistant = VoiceAssistant()
     
+    # Fill the speech cache if requested
+    if args.prewarm_tts:
+        if not assistant.tts or not assistant.tts.cache:
+            print("The speech cache needs text-to-speech and an audio player (winsound or simpleaudio).")
+            return
+        print(f"Rendered {assistant.prewarm_speech()} sentences into the speech cache")
+        return
+    
     # Override preferences with command-line arguments
     if args.no_tts:
         assistant.preferences.set_preference("use_tts", False)
@@ -0,0 +1,52 @@
+import numpy as np
+
+
+class RingBuffer:
+    """Preallocated buffer holding the most recent 16-bit samples of a stream
+
+    Samples are addressed by their absolute position in the stream, the
+    number of samples written before them, so a reader can remember where
+    a stretch of audio started and read it back later while it is still
+    in the buffer.
+
+    Every sample is written twice, at its offset and one buffer length
+    later, so any stretch still in the buffer is contiguous in memory and
+    view() can return it without copying. A view stays valid until the
+    writer wraps around onto it.
+    """
+
+    def __init__(self, seconds, rate):
+        """Initialize the buffer"""
+        self.rate = rate
+        self.size = int(seconds * rate)
+        self.data = np.zeros(2 * self.size, dtype=np.int16)
+        self.written = 0
+
+    def write(self, samples):
+        """Append samples, overwriting the oldest ones"""
+        skipped = max(0, len(samples) - self.size)
+        samples = samples[skipped:]
+        start = (self.written + skipped) % self.size
+        first = min(len(samples), self.size - start)
+        for offset in (0, self.size):
+            self.data[offset + start:offset + start + first] = samples[:first]
+            self.data[offset:offset + len(samples) - first] = samples[first:]
+        self.written += skipped + len(samples)
+
+    def oldest(self):
+        """Get the position of the oldest sample still in the buffer"""
+        return max(0, self.written - self.size)
+
+    def view(self, start, end=None):
+        """Get the samples from position start up to end (default: the newest) without copying"""
+        end = self.written if end is None else min(end, self.written)
+        start = max(start, self.oldest())
+        if start >= end:
+            return self.data[:0]
+
+        offset = start % self.size
+        return self.data[offset:offset + end - start]
+
+    def read(self, start, end=None):
+        """Get a copy of the samples from position start up to end (default: the newest)"""
+        return self.view(start, end).copy()
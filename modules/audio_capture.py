@@ -0,0 +1,177 @@
+import threading
+
+import numpy as np
+
+from modules.audio_buffer import RingBuffer
+
+try:
+    import speech_recognition as sr
+    AudioSource = sr.AudioSource
+    SR_AVAILABLE = True
+except ImportError:
+    AudioSource = object
+    SR_AVAILABLE = False
+
+_capture = None
+_capture_lock = threading.Lock()
+
+
+class AudioCapture:
+    """Keep the microphone open and record it into a ring buffer on one thread
+
+    Opening the microphone for every turn costs time and drops the audio
+    in between, e.g. what the user says right after the wake word. The
+    capture thread holds the stream open and writes every frame into a
+    RingBuffer; consumers read from it with a CaptureReader, or through a
+    CaptureSource wherever speech_recognition expects a microphone.
+    """
+
+    def __init__(self, microphone, seconds=30):
+        """Initialize the capture; start() opens the microphone"""
+        self.microphone = microphone
+        self.rate = microphone.SAMPLE_RATE
+        self.chunk = microphone.CHUNK
+        self.buffer = RingBuffer(seconds, self.rate)
+        self.lock = threading.Condition()
+        self.running = False
+        self.thread = None
+
+    def start(self):
+        """Start the capture thread if it isn't running"""
+        with self.lock:
+            if self.running:
+                return
+            self.running = True
+        self.thread = threading.Thread(target=self._capture_loop, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """Stop capturing and close the microphone"""
+        with self.lock:
+            self.running = False
+            self.lock.notify_all()
+        if self.thread and self.thread is not threading.current_thread():
+            self.thread.join(timeout=1.0)
+
+    def _capture_loop(self):
+        """Read microphone frames into the buffer until stopped"""
+        try:
+            with self.microphone as source:
+                if source.SAMPLE_WIDTH != 2:
+                    raise ValueError("Audio capture needs 16-bit samples")
+                while self.running:
+                    samples = np.frombuffer(source.stream.read(source.CHUNK), dtype='<i2')
+                    with self.lock:
+                        self.buffer.write(samples)
+                        self.lock.notify_all()
+        except Exception as e:
+            print(f"Error capturing audio: {e}")
+        finally:
+            with self.lock:
+                self.running = False
+                self.lock.notify_all()
+
+    def position(self):
+        """Get the stream position of the newest sample"""
+        return self.buffer.written
+
+    def wait(self, position, timeout=None):
+        """Wait until there are samples after position; returns the newest position"""
+        with self.lock:
+            self.lock.wait_for(lambda: self.buffer.written > position or not self.running, timeout)
+            return self.buffer.written
+
+    def reader(self, pre_roll_ms=0, start=None):
+        """Get a reader starting at position start, or pre_roll_ms before now"""
+        if start is None:
+            start = self.position() - int(self.rate * pre_roll_ms / 1000)
+        return CaptureReader(self, start)
+
+
+class CaptureReader:
+    """A cursor into an AudioCapture that hands out views of new audio without copying"""
+
+    def __init__(self, capture, start):
+        """Initialize the reader"""
+        self.capture = capture
+        self.position = max(start, capture.buffer.oldest())
+        self.overruns = 0
+
+    def read(self, count, timeout=None):
+        """Get a view of up to count samples after the cursor, waiting for them
+
+        Returns None on timeout or when the capture stopped. A reader that
+        fell a whole buffer behind skips to the oldest audio still there.
+        """
+        written = self.capture.wait(self.position, timeout)
+        oldest = self.capture.buffer.oldest()
+        if self.position < oldest:
+            self.overruns += 1
+            self.position = oldest
+        if written <= self.position:
+            return None
+
+        end = min(written, self.position + count)
+        samples = self.capture.buffer.view(self.position, end)
+        self.position = end
+        return samples
+
+
+class CaptureStream:
+    """The stream of a CaptureSource: reads exactly the number of frames asked for"""
+
+    def __init__(self, reader):
+        """Initialize the stream"""
+        self.reader = reader
+
+    def read(self, size):
+        """Get size frames of 16-bit audio as bytes, waiting for them"""
+        parts = []
+        while size > 0:
+            samples = self.reader.read(size, timeout=1.0)
+            if samples is None:
+                if not self.reader.capture.running:
+                    raise OSError("Audio capture stopped")
+                continue
+            parts.append(samples.tobytes())
+            size -= len(samples)
+        return b"".join(parts)
+
+
+class CaptureSource(AudioSource):
+    """A speech_recognition audio source reading from an AudioCapture
+
+    Usable with Recognizer.listen() and adjust_for_ambient_noise() like a
+    Microphone, but entering it doesn't open anything, and it can start
+    in the past: with pre_roll_ms the first syllable said just before
+    listening started is still heard.
+    """
+
+    def __init__(self, capture, pre_roll_ms=0, start=None):
+        """Initialize the source"""
+        self.capture = capture
+        self.SAMPLE_RATE = capture.rate
+        self.SAMPLE_WIDTH = 2
+        self.CHUNK = capture.chunk
+        self.reader = capture.reader(pre_roll_ms, start)
+        self.stream = CaptureStream(self.reader)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        pass
+
+
+def get_audio_capture(microphone=None, seconds=30):
+    """Get the shared AudioCapture, starting it on first use
+
+    The microphone (default: the system default) only applies to the call
+    that creates it.
+    """
+    global _capture
+    with _capture_lock:
+        if _capture is None:
+            _capture = AudioCapture(microphone or sr.Microphone(), seconds)
+        _capture.start()
+        return _capture
@@ -0,0 +1,175 @@
+import os
+import glob
+import time
+import threading
+
+import numpy as np
+
+from modules.wake_word import read_wav
+
+try:
+    import speech_recognition as sr
+    AudioSource = sr.AudioSource
+except ImportError:
+    AudioSource = object
+
+
+def wav_paths(path):
+    """Get the WAV files of path: the file itself, or the ones in a directory in name order"""
+    if os.path.isdir(path):
+        return sorted(glob.glob(os.path.join(path, "*.wav")))
+    return [path]
+
+
+def speech_span(samples, rate, ratio=0.1):
+    """Get where speech starts and ends in a recording, in 10 ms frames, as sample offsets"""
+    hop = max(1, rate // 100)
+    frames = len(samples) // hop
+    if frames < 1:
+        return 0, len(samples)
+    energy = np.sqrt(np.mean(samples[:frames * hop].astype(np.float32).reshape(frames, hop) ** 2, axis=1))
+    loud = np.flatnonzero(energy > energy.max() * ratio)
+    if not len(loud):
+        return 0, 0
+    return int(loud[0] * hop), int((loud[-1] + 1) * hop)
+
+
+def resample(samples, rate, target):
+    """Resample 16-bit samples to the target rate by linear interpolation"""
+    if rate == target or not len(samples):
+        return samples
+    count = int(round(len(samples) * target / rate))
+    positions = np.arange(count) * rate / target
+    return np.interp(positions, np.arange(len(samples)), samples.astype(np.float32)).astype(np.int16)
+
+
+class ReplaySegment:
+    """One file in a replay, with its stream positions"""
+
+    def __init__(self, path, start, end, speech_start, speech_end):
+        """Initialize the segment"""
+        self.path = path
+        self.start = start
+        self.end = end
+        self.speech_start = speech_start
+        self.speech_end = speech_end
+
+    def __repr__(self):
+        return f"ReplaySegment({os.path.basename(self.path)!r}, {self.start}, {self.end})"
+
+
+class ReplayStream:
+    """The stream of a ReplayMicrophone: hands out the recordings at the replay speed"""
+
+    def __init__(self, microphone):
+        """Initialize the stream"""
+        self.microphone = microphone
+
+    def read(self, size):
+        """Get size frames of 16-bit audio as bytes, waiting until they would have been recorded"""
+        return self.microphone._read(size)
+
+
+class ReplayMicrophone(AudioSource):
+    """Play WAV files into the assistant in place of a microphone
+
+    Usable wherever a speech_recognition Microphone is, e.g. as the
+    microphone of an AudioCapture. The files are played one after the
+    other with gap seconds of silence before each, then silence for as
+    long as the stream is read (or the files again, with loop). Frames are
+    handed out at speed times real time; pass 0 to read them as fast as
+    they are asked for. All files are converted to the sample rate of the
+    first one (or rate) and to mono.
+
+    segments lists where each file starts and ends in the stream and
+    where its speech starts and ends, and wall_time() tells when a
+    stream position was read, so latencies can be measured against the
+    moment a speaker would have stopped talking. finished is set once
+    the last file has been read.
+    """
+
+    def __init__(self, paths, speed=1.0, gap=1.0, rate=None, chunk=1024, loop=False):
+        """Load the recordings"""
+        if isinstance(paths, str):
+            paths = wav_paths(paths)
+        if not paths:
+            raise ValueError("No WAV files to replay")
+        self.SAMPLE_WIDTH = 2
+        self.CHUNK = chunk
+        self.speed = speed
+        self.loop = loop
+        self.stream = None
+        self.segments = []
+
+        parts = []
+        position = 0
+        for path in paths:
+            samples, file_rate = read_wav(path)
+            if rate is None:
+                rate = file_rate
+            samples = resample(samples, file_rate, rate)
+            silence = np.zeros(int(rate * gap), dtype=np.int16)
+            start = position + len(silence)
+            speech_start, speech_end = speech_span(samples, rate)
+            self.segments.append(ReplaySegment(path, start, start + len(samples),
+                                               start + speech_start, start + speech_end))
+            parts.extend((silence, samples))
+            position = start + len(samples)
+        self.SAMPLE_RATE = rate
+        self.samples = np.concatenate(parts)
+
+        self.position = 0
+        self.started = None
+        self.lock = threading.Lock()
+        self.finished = threading.Event()
+
+    def __enter__(self):
+        self.stream = ReplayStream(self)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stream = None
+
+    def _read(self, size):
+        """Read the next size frames, pacing the replay"""
+        with self.lock:
+            if self.started is None:
+                self.started = time.perf_counter()
+            offset = self.position % len(self.samples) if self.loop else self.position
+            part = self.samples[offset:offset + size]
+            if self.loop and len(part) < size:
+                part = np.concatenate((part, self.samples[:size - len(part)]))
+            elif len(part) < size:
+                part = np.concatenate((part, np.zeros(size - len(part), dtype=np.int16)))
+            self.position += size
+            if self.position >= len(self.samples):
+                self.finished.set()
+            due = self.wall_time(self.position)
+
+        # Hand the frames out no sooner than a microphone would have
+        delay = due - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        return part.astype('<i2').tobytes()
+
+    def wall_time(self, position):
+        """Get the perf_counter() time at which a stream position was (or will be) read"""
+        if self.started is None or not self.speed:
+            return time.perf_counter()
+        return self.started + position / self.SAMPLE_RATE / self.speed
+
+    def segment_at(self, position):
+        """Get the segment a stream position falls in, or the last one before it"""
+        if self.loop:
+            position %= len(self.samples)
+        found = None
+        for segment in self.segments:
+            if segment.start > position:
+                break
+            found = segment
+        return found
+
+    @property
+    def duration(self):
+        """The length of one pass over the recordings in seconds"""
+        return len(self.samples) / self.SAMPLE_RATE
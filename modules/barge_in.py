@@ -0,0 +1,115 @@
+import math
+import time
+from array import array
+from collections import deque
+
+from utils.benchmark import percentile
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+
+def frame_energy(frame):
+    """Get the RMS energy of a frame of 16-bit little-endian PCM audio"""
+    if not frame:
+        return 0.0
+    if NUMPY_AVAILABLE:
+        samples = np.frombuffer(frame, dtype='<i2').astype(np.float32)
+        return float(np.sqrt(np.mean(samples * samples)))
+
+    samples = array('h', frame[:len(frame) // 2 * 2])
+    return math.sqrt(sum(sample * sample for sample in samples) / len(samples))
+
+
+class BargeInMonitor:
+    """Listen for the user talking over the assistant and stop its speech
+
+    While speech plays, monitor() reads microphone frames and compares
+    their energy with a gate. The gate is the higher of energy_threshold and
+    echo_ratio times the echo level, the energy the microphone picks up
+    from the speakers, which is measured over the first calibration_ms of
+    playback and then tracked on frames below the gate. When the energy
+    stays above the gate for trigger_ms the speech is stopped and the
+    phrase is recorded, starting pre_roll_ms before the trigger, until
+    silence_ms of quiet.
+    """
+
+    def __init__(self, energy_threshold=300, echo_ratio=2.0, trigger_ms=60, calibration_ms=300,
+                 pre_roll_ms=300, silence_ms=800, phrase_limit=10):
+        """Initialize the monitor"""
+        self.energy_threshold = energy_threshold
+        self.echo_ratio = echo_ratio
+        self.trigger_ms = trigger_ms
+        self.calibration_ms = calibration_ms
+        self.pre_roll_ms = pre_roll_ms
+        self.silence_ms = silence_ms
+        self.phrase_limit = phrase_limit
+        self.triggers = 0
+        self.reaction_ms = deque(maxlen=100)  # from the first loud frame to speech stopped
+
+    def monitor(self, source, job, stop_speech):
+        """Watch the microphone while a speech job plays
+
+        source is an open speech_recognition audio source of 16-bit audio
+        (anything with stream, CHUNK and SAMPLE_RATE). Returns the PCM
+        frames of the phrase the user said over the speech, or None if the
+        speech ended without interruption.
+        """
+        frame_ms = source.CHUNK / source.SAMPLE_RATE * 1000
+        pre_roll = deque(maxlen=max(1, int(self.pre_roll_ms / frame_ms)))
+        echo_level = 0.0
+        elapsed = 0.0
+        loud_ms = 0.0
+        onset = None
+
+        while not job.done.is_set():
+            frame = source.stream.read(source.CHUNK)
+            energy = frame_energy(frame)
+            pre_roll.append(frame)
+            elapsed += frame_ms
+
+            if elapsed <= self.calibration_ms:
+                echo_level = max(echo_level, energy)
+                continue
+
+            gate = max(self.energy_threshold, echo_level * self.echo_ratio)
+            if energy <= gate:
+                echo_level = 0.9 * echo_level + 0.1 * energy
+                loud_ms, onset = 0.0, None
+                continue
+
+            onset = onset or time.perf_counter()
+            loud_ms += frame_ms
+            if loud_ms >= self.trigger_ms:
+                stop_speech()
+                self.triggers += 1
+                self.reaction_ms.append((time.perf_counter() - onset) * 1000)
+                return b"".join(pre_roll) + self._record_phrase(source, frame_ms)
+
+        return None
+
+    def _record_phrase(self, source, frame_ms):
+        """Record the rest of the phrase until silence_ms of quiet or phrase_limit seconds"""
+        frames = []
+        quiet_ms = 0.0
+        limit_ms = self.phrase_limit * 1000
+        while quiet_ms < self.silence_ms and len(frames) * frame_ms < limit_ms:
+            frame = source.stream.read(source.CHUNK)
+            frames.append(frame)
+            if frame_energy(frame) > self.energy_threshold:
+                quiet_ms = 0.0
+            else:
+                quiet_ms += frame_ms
+        return b"".join(frames)
+
+    def stats(self):
+        """Get how often the user interrupted and how fast speech stopped"""
+        reactions = list(self.reaction_ms)
+        return {
+            "triggers": self.triggers,
+            "reaction_p50_ms": percentile(reactions, 50),
+            "reaction_max_ms": max(reactions, default=0.0)
+        }
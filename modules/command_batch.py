@@ -0,0 +1,62 @@
+import os
+import json
+import itertools
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from modules.command_processor import CommandProcessor
+
+_processor = None
+
+
+def _start_worker():
+    """Give a worker process its own CommandProcessor"""
+    global _processor
+    _processor = CommandProcessor()
+
+
+def _process_chunk(lines):
+    """Process a chunk of lines in a worker; returns their JSONL records"""
+    return [result_record(line, _processor.process(line)) for line in lines]
+
+
+def result_record(line, result):
+    """Format the result of CommandProcessor.process for one line as a JSON line"""
+    record = {"input": line}
+    if isinstance(result, tuple):
+        command, args = result
+        record.update(command=command, args=args)
+    else:
+        record["response"] = result
+    return json.dumps(record, default=str)
+
+
+def process_lines(lines, workers=None, chunk_size=256, window=None):
+    """Classify and route lines, yielding one JSON line per input line, in input order
+
+    lines can be any iterable, e.g. a file, and is read as it is consumed.
+    Lines are sent in chunks of chunk_size to a pool of worker processes,
+    each with its own CommandProcessor; at most window chunks (by default
+    two per worker) are in flight at once, so memory use doesn't depend on
+    the length of the input. With one worker lines are processed in this
+    process.
+    """
+    workers = workers or os.cpu_count() or 1
+    lines = (line.lower().strip() for line in lines)
+    if workers == 1:
+        processor = CommandProcessor()
+        for line in lines:
+            yield result_record(line, processor.process(line))
+        return
+
+    window = window or 2 * workers
+    chunks = iter(lambda: list(itertools.islice(lines, chunk_size)), [])
+    with ProcessPoolExecutor(max_workers=workers, initializer=_start_worker) as pool:
+        pending = deque()
+        for chunk in chunks:
+            # Hand out the oldest results before taking on more work
+            if len(pending) >= window:
+                yield from pending.popleft().result()
+            pending.append(pool.submit(_process_chunk, chunk))
+        while pending:
+            yield from pending.popleft().result()
@@ -11,21 +11,46 @@ import requests
 import math
 from urllib.parse import quote_plus
 
+from modules.command_runner import CommandRunner
+from modules.response_queue import ALERT, CHATTER
+
 class CommandExecutor:
     """Execute commands based on user input"""
     
+    # Commands that are quick enough to run on the caller's thread
+    INLINE_COMMANDS = {"help", "get_time", "joke", "dice", "math"}
+    
     def __init__(self, assistant):
         """Initialize command executor"""
         self.assistant = assistant
         self.reminders = []
         self.timers = []
-        self.custom_patterns = self._load_custom_patterns()
+        self.reminders_changed = threading.Event()
+        
+        # The respond function and preferences of the input each thread is
+        # handling, when they aren't the assistant's own (a server session)
+        self.caller = threading.local()
+        
+        # Reuse the custom pattern table from the routing cache if it is up to date
+        routing_cache = getattr(assistant, "routing_cache", None)
+        self.custom_patterns = (routing_cache and routing_cache.section("custom_patterns")) or self._load_custom_patterns()
+        
+        # Run slow commands on worker threads so they can't block the assistant
+        preferences = assistant.preferences
+        self.runner = CommandRunner(
+            max_workers=preferences.get_preference("command_workers", 4),
+            deadline=preferences.get_preference("command_deadline", 5.0),
+            deadlines=preferences.get_preference("command_deadlines", {}),
+            inline_commands=self.INLINE_COMMANDS,
+            on_deadline=self._command_overdue
+        )
         
         # Start background timer for checking reminders
         self.reminder_thread = threading.Thread(target=self._check_reminders_loop, daemon=True)
         self.reminder_thread.start()
     
-    def _load_custom_patterns(self):
+    @staticmethod
+    def _load_custom_patterns():
         """Load custom patterns for regex matching"""
         # These are regex patterns that can directly trigger actions without NLP
         patterns = [
@@ -50,6 +75,10 @@ class CommandExecutor:
             {
                 "pattern": r"\brestart\b",
                 "action": "self._restart"
+            },
+            {
+                "pattern": r"\b(cancel that|never ?mind)\b",
+                "action": "self._cancel_commands"
             }
         ]
         
@@ -59,15 +88,27 @@ class CommandExecutor:
         
         return patterns
     
+    def match_custom_pattern(self, text):
+        """Find the first custom pattern that matches text"""
+        for pattern in self.custom_patterns:
+            if pattern["compiled"].search(str(text)):
+                return pattern
+        return None
+    
+    def run_custom_pattern(self, pattern):
+        """Run the action of a matched custom pattern"""
+        action_name = pattern["action"]
+        # Call the corresponding method
+        if action_name.startswith("self."):
+            method = getattr(self, action_name[5:])
+            return method()
+        return None
+    
     def handle_custom_pattern(self, text):
         """Handle custom regex patterns"""
-        for pattern in self.custom_patterns:
-            if pattern["compiled"].search(text):
-                action_name = pattern["action"]
-                # Call the corresponding method
-                if action_name.startswith("self."):
-                    method = getattr(self, action_name[5:])
-                    return method()
+        pattern = self.match_custom_pattern(text)
+        if pattern:
+            return self.run_custom_pattern(pattern)
         return None
     
     def execute_command(self, command, args):
@@ -83,13 +124,86 @@ class CommandExecutor:
         else:
             return f"Unknown command: {command}"
     
+    def set_caller(self, respond=None, preferences=None):
+        """Set the respond function and preferences of the input handled on this thread
+        
+        Commands run for it answer "still working" notices, reminders and
+        timers through respond, and use the assistant name of preferences.
+        None means the assistant's own.
+        """
+        self.caller.respond = respond
+        self.caller.preferences = preferences
+    
+    def _caller(self):
+        """Get the (respond, preferences) set for this thread"""
+        return getattr(self.caller, "respond", None), getattr(self.caller, "preferences", None)
+    
+    def _name(self):
+        """Get the assistant name of the caller's preferences"""
+        preferences = self._caller()[1]
+        return preferences.get_preference("assistant_name", self.assistant.name) if preferences else self.assistant.name
+    
+    def dispatch_command(self, command, args, callback):
+        """Execute a command on the command runner and pass its response to callback
+        
+        Quick commands run inline; the others run on a worker thread and
+        get a "still working" reply if they take longer than their deadline.
+        Returns the CommandJob of a command running on a worker, else None.
+        """
+        respond, preferences = self._caller()
+        
+        def run():
+            # A worker thread handles the command for the same caller
+            previous = self._caller()
+            self.set_caller(respond, preferences)
+            try:
+                return self.execute_command(command, args)
+            finally:
+                self.set_caller(*previous)
+        
+        return self.runner.run(command, run, callback, respond=respond)
+    
+    def _command_overdue(self, job):
+        """Tell the user who asked that a command is taking longer than its deadline"""
+        (job.respond or self.assistant.respond)("Still working on that, give me a moment.", CHATTER)
+    
+    def _cancel_commands(self):
+        """Cancel the commands that are still running"""
+        if self.runner.cancel():
+            return "Okay, I've cancelled that."
+        return "There's nothing to cancel."
+    
+    def _add_reminder(self, message, delay):
+        """Schedule a message to be announced to the caller after delay seconds"""
+        self.reminders.append({"time": time.time() + delay, "message": message, "respond": self._caller()[0]})
+        self.reminders_changed.set()
+    
+    def _check_reminders_loop(self):
+        """Announce reminders and timers as they come due"""
+        while True:
+            self.reminders_changed.clear()
+            now = time.time()
+            for reminder in self.reminders[:]:
+                if now >= reminder["time"]:
+                    self.reminders.remove(reminder)
+                    # Alerts interrupt whatever is being said
+                    respond = reminder.get("respond") or self.assistant.respond
+                    try:
+                        respond(reminder["message"], ALERT)
+                    except Exception as e:
+                        print(f"Error announcing reminder: {e}")
+            
+            # Sleep until the next reminder is due or a new one is set
+            next_time = min((reminder["time"] for reminder in self.reminders), default=None)
+            self.reminders_changed.wait(None if next_time is None else max(0, next_time - time.time()))
+    
     def _respond_with_name(self):
         """Respond with assistant name"""
-        return f"My name is {self.assistant.name}."
+        return f"My name is {self._name()}."
     
     def _respond_with_identity(self):
         """Respond with assistant identity"""
-        return f"I am {self.assistant.name}, your voice assistant. I'm here to help you with various tasks."
+        return f"I am {self._name()}, your voice assistant. I'm here to help you with various tasks."
     
     def _respond_with_status(self):
         """Respond with assistant status"""
@@ -114,7 +228,7 @@ class CommandExecutor:
     def _cmd_help(self, args):
         """Show help about available commands"""
         help_text = (
-            f"Hi! I'm {self.assistant.name}, your voice assistant. Here are things I can help you with:\n\n"
+            f"Hi! I'm {self._name()}, your voice assistant. Here are things I can help you with:\n\n"
             "- Weather information: 'What's the weather like?'\n"
             "- Time and date: 'What time is it?'\n"
             "- Reminders: 'Remind me to call John in 2 hours'\n"
@@ -129,6 +243,31 @@ class CommandExecutor:
         )
         return help_text
     
+    def _cmd_reminder(self, args):
+        """Set a reminder from a (task, hours) tuple"""
+        if not args:
+            return "What should I remind you about, and when? Try 'Remind me to call John in 2 hours'."
+        task, hours = args
+        self._add_reminder(f"Reminder: {task}", hours * 3600)
+        return f"Okay, I'll remind you to {task} in {self._format_delay(hours * 60)}."
+    
+    def _cmd_timer(self, minutes):
+        """Set a timer for a number of minutes"""
+        minutes = minutes or 5
+        self._add_reminder(f"Your {self._format_delay(minutes)} timer is up!", minutes * 60)
+        return f"Timer set for {self._format_delay(minutes)}."
+    
+    @staticmethod
+    def _format_delay(minutes):
+        """Describe a number of minutes in words"""
+        if minutes < 1:
+            return f"{round(minutes * 60)} seconds"
+        if minutes >= 60 and minutes % 60 == 0:
+            hours = int(minutes // 60)
+            return f"{hours} hour" if hours == 1 else f"{hours} hours"
+        minutes = round(minutes, 1) if minutes % 1 else int(minutes)
+        return f"{minutes} minute" if minutes == 1 else f"{minutes} minutes"
+    
     def _cmd_weather(self, location):
         """Get weather information"""
         if not location or location == 'local':
@@ -1,8 +1,10 @@
 import webbrowser
 import re
-import nltk
-from nltk.tokenize import word_tokenize
-from nltk.corpus import stopwords
+
+from modules.command_router import CommandRouter
+from modules.utterance import as_utterance
+
+EXIT_RE = re.compile(r'(?i)exit|quit|goodbye|bye')
 
 class CommandProcessor:
     """Processes user input and identifies commands and arguments"""
@@ -21,6 +23,10 @@ class CommandProcessor:
             r'(?i)who\s+are\s+you': ('introduce', None),
             r'(?i)help': ('help', None),
         }
+        
+        # Compile the patterns into a routing table once
+        self.router = CommandRouter(self.commands)
+        self.handlers = list(self.commands.values())
 
     def process(self, text):
         """
@@ -30,26 +36,29 @@ class CommandProcessor:
         - String response for direct answers
         - Tuple (command, args) for actions to be executed
         """
-        if not text:
+        utterance = as_utterance(text)
+        if not utterance:
             return "I didn't hear anything."
         
         # Check for exit command
-        if re.search(r'(?i)exit|quit|goodbye|bye', text):
+        if EXIT_RE.search(utterance.text):
             return "Goodbye! Have a nice day."
         
         # Check for commands
-        for pattern, (command, arg_extractor) in self.commands.items():
-            match = re.search(pattern, text)
-            if match:
-                # Extract arguments if needed
-                args = None
-                if arg_extractor:
-                    if callable(arg_extractor):
-                        args = arg_extractor(match)
-                    else:
-                        args = arg_extractor
-                
-                return (command, args)
+        routed = self.router.match(utterance)
+        if routed:
+            index, match = routed
+            command, arg_extractor = self.handlers[index]
+            
+            # Extract arguments if needed
+            args = None
+            if arg_extractor:
+                if callable(arg_extractor):
+                    args = arg_extractor(match)
+                else:
+                    args = arg_extractor
+            
+            return (command, args)
         
         # If no command is recognized, return a fallback message
         return "I'm not sure how to help with that. Try asking for help."
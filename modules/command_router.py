@@ -0,0 +1,73 @@
+import re
+
+from modules.utterance import WORD_RE, Utterance
+
+try:
+    from re import _parser as sre_parse
+except ImportError:  # Python < 3.11
+    import sre_parse
+
+
+def leading_word(pattern):
+    """Get the literal word every match of a regex starts with, lowercased like Utterance.words, or None"""
+    word = ""
+    for op, av in sre_parse.parse(pattern):
+        if op is not sre_parse.LITERAL or not WORD_RE.fullmatch(chr(av)):
+            break
+        word += chr(av)
+    return word.lower() or None
+
+
+class CommandRouter:
+    """Dispatch text to the first of a list of command regexes that matches it
+
+    Each regex is compiled once and filed under the literal word its matches
+    start with (e.g. "roll" for ``roll\\s+(?:a\\s+)?dice``). A text is only
+    searched with the regexes whose word occurs in it, anywhere inside a
+    token just like ``re.search`` would find it, plus the ones without a
+    leading word. Candidates are tried in list order, so the result is the
+    same as searching every regex in turn, and adding a command only costs
+    the lookups for texts that contain its word.
+    """
+
+    def __init__(self, patterns):
+        """Compile and index the patterns, in matching order"""
+        self.patterns = list(patterns)
+        self.regexes = []
+        self.buckets = {}  # leading word -> [pattern index]
+        self.always = []   # patterns without a leading word
+
+        for index, pattern in enumerate(self.patterns):
+            self.regexes.append(re.compile(pattern))
+            word = leading_word(pattern)
+            if word:
+                self.buckets.setdefault(word, []).append(index)
+            else:
+                self.always.append(index)
+
+        self.lengths = sorted({len(word) for word in self.buckets})
+        self.first_chars = {word[0] for word in self.buckets}
+
+    def candidates(self, text):
+        """Get the indexes of the patterns that can match text, in order"""
+        found = set(self.always)
+        words = text.words if isinstance(text, Utterance) else WORD_RE.findall(text.lower())
+
+        for token in words:
+            for offset, char in enumerate(token):
+                if char not in self.first_chars:
+                    continue
+                for length in self.lengths:
+                    if offset + length > len(token):
+                        break
+                    found.update(self.buckets.get(token[offset:offset + length], ()))
+
+        return sorted(found)
+
+    def match(self, text):
+        """Get (index, match) for the first pattern that matches text, or None"""
+        for index in self.candidates(text):
+            match = self.regexes[index].search(str(text))
+            if match:
+                return index, match
+        return None
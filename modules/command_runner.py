@@ -0,0 +1,158 @@
+import time
+import itertools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class CommandJob:
+    """One command running on a CommandRunner"""
+
+    def __init__(self, job_id, command, deadline, respond=None):
+        """Initialize the job"""
+        self.id = job_id
+        self.command = command
+        self.deadline = deadline  # time.monotonic() value
+        self.respond = respond  # where on_deadline tells the user, None for the default
+        self.future = None
+        self.overdue = False
+        self.cancelled = threading.Event()
+
+    def done(self):
+        """Check whether the command has finished or was cancelled"""
+        return self.future.done()
+
+    def cancel(self):
+        """Cancel the command
+
+        A command that hasn't started yet is dropped from the pool. Threads
+        can't be stopped, so a command that is already running finishes in
+        the background but its result is discarded.
+        """
+        self.cancelled.set()
+        self.future.cancel()
+
+
+class CommandRunner:
+    """Run commands on a bounded worker pool with per-command deadlines
+
+    Every command gets a deadline; when it is still running at its deadline
+    on_deadline(job) is called once, e.g. to tell the user it is still
+    working. The result is passed to the callback given to run() when the
+    command finishes. Commands listed in inline_commands skip the pool and
+    run on the caller's thread.
+    """
+
+    def __init__(self, max_workers=4, deadline=5.0, deadlines=None, inline_commands=(), on_deadline=None):
+        """Initialize the runner"""
+        self.deadline = deadline
+        self.deadlines = dict(deadlines or {})  # command -> deadline in seconds
+        self.inline_commands = set(inline_commands)
+        self.on_deadline = on_deadline
+        self.pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="command")
+        self.jobs = {}
+        self.lock = threading.Condition()
+        self.ids = itertools.count(1)
+        self.watch_thread = None
+        self.running = True
+        self.counts = {"inline": 0, "submitted": 0, "completed": 0, "overdue": 0, "cancelled": 0}
+
+    def run(self, command, func, callback, respond=None):
+        """Run func() for a command and pass its result to callback
+
+        respond is kept on the job for on_deadline. Returns the CommandJob
+        of a command that runs on the pool, or None for an inline command,
+        which has already called callback.
+        """
+        if command in self.inline_commands:
+            self.counts["inline"] += 1
+            callback(func())
+            return None
+
+        job = CommandJob(next(self.ids), command, time.monotonic() + self.deadlines.get(command, self.deadline), respond)
+        with self.lock:
+            if not self.running:
+                return None
+            self.jobs[job.id] = job
+            self.counts["submitted"] += 1
+            job.future = self.pool.submit(func)
+            self._start_watching()
+            self.lock.notify()
+
+        job.future.add_done_callback(lambda future: self._finish(job, callback))
+        return job
+
+    def _finish(self, job, callback):
+        """Deliver the result of a finished command"""
+        with self.lock:
+            self.jobs.pop(job.id, None)
+            if job.cancelled.is_set() or job.future.cancelled():
+                self.counts["cancelled"] += 1
+                return
+            self.counts["completed"] += 1
+
+        try:
+            result = job.future.result()
+        except Exception as e:
+            result = f"Error executing command {job.command}: {str(e)}"
+
+        try:
+            callback(result)
+        except Exception as e:
+            print(f"Error delivering result of {job.command}: {e}")
+
+    def _start_watching(self):
+        """Start the deadline thread if it isn't running (called with the lock held)"""
+        if self.watch_thread is None:
+            self.watch_thread = threading.Thread(target=self._watch_deadlines, daemon=True)
+            self.watch_thread.start()
+
+    def _watch_deadlines(self):
+        """Call on_deadline for every command still running at its deadline"""
+        while True:
+            with self.lock:
+                while self.running:
+                    now = time.monotonic()
+                    waiting = [job for job in self.jobs.values() if not job.overdue and not job.cancelled.is_set()]
+                    overdue = [job for job in waiting if job.deadline <= now]
+                    if overdue:
+                        break
+                    next_deadline = min((job.deadline for job in waiting), default=None)
+                    self.lock.wait(None if next_deadline is None else next_deadline - now)
+
+                if not self.running:
+                    return
+                for job in overdue:
+                    job.overdue = True
+                    self.counts["overdue"] += 1
+
+            for job in overdue:
+                if self.on_deadline and not job.cancelled.is_set():
+                    try:
+                        self.on_deadline(job)
+                    except Exception as e:
+                        print(f"Error handling deadline of {job.command}: {e}")
+
+    def cancel(self, job_id=None):
+        """Cancel one command, or all running commands; returns how many were cancelled"""
+        with self.lock:
+            if job_id is None:
+                jobs = [job for job in self.jobs.values() if not job.cancelled.is_set()]
+            else:
+                jobs = [self.jobs[job_id]] if job_id in self.jobs else []
+
+        for job in jobs:
+            job.cancel()
+        return len(jobs)
+
+    def stats(self):
+        """Get runner statistics"""
+        with self.lock:
+            return dict(self.counts, running=len(self.jobs))
+
+    def shutdown(self):
+        """Cancel all commands and stop the workers"""
+        with self.lock:
+            self.running = False
+            self.lock.notify_all()
+        self.cancel()
+        self.pool.shutdown(wait=False)
@@ -3,6 +3,8 @@ import pytz
 import json
 import requests
 
+from modules.noise_floor import noise_level
+
 class ContextManager:
     def __init__(self):
         self.context = {
@@ -47,8 +49,8 @@ class ContextManager:
         }
 
     def _detect_noise_level(self):
-        # Implement actual noise detection here
-        return "normal"
+        # Measured by the noise floor estimator while the microphone is open
+        return noise_level() or "normal"
 
     def _detect_lighting(self):
         # Implement actual light detection here
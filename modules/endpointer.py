@@ -0,0 +1,177 @@
+from collections import deque
+
+import numpy as np
+
+from utils.benchmark import percentile
+
+COMMAND = "command"
+DICTATION = "dictation"
+
+# Command types whose argument is free text, which people say with longer pauses
+DICTATION_COMMANDS = {"web_search", "learn_fact", "set_reminder", "reminder", "schedule", "analyze_text", "summarize"}
+
+# Which of the speaker's pauses the quiet ending a phrase must outlast: most of
+# them in commands, all of them in dictation, where a pause to think is no end
+PAUSE_PERCENTILES = {COMMAND: 90, DICTATION: 100}
+
+_windows = {}
+
+
+def intent_class(command_type):
+    """Get the endpointing class of a command type"""
+    return DICTATION if command_type in DICTATION_COMMANDS else COMMAND
+
+
+def frame_features(samples, rate):
+    """Get the RMS energy of a frame of samples and the share of its energy in the speech band (250-4000 Hz)"""
+    if not len(samples):
+        return 0.0, 0.0
+    x = samples.astype(np.float32)
+    energy = float(np.sqrt(np.mean(x * x)))
+
+    if len(x) not in _windows:
+        freqs = np.fft.rfftfreq(len(x), 1.0 / rate)
+        _windows[len(x)] = (np.hanning(len(x)).astype(np.float32), (freqs >= 250) & (freqs <= 4000))
+    window, band = _windows[len(x)]
+    spectrum = np.abs(np.fft.rfft(x * window)) ** 2
+    total = float(spectrum.sum())
+    return energy, float(spectrum[band].sum()) / total if total else 0.0
+
+
+class Endpointer:
+    """Decide when the user has finished speaking, from frame energy and spectrum
+
+    Speech starts after start_ms of frames louder than energy_threshold
+    with most of their energy in the speech band, so hum and hiss don't
+    start a phrase. It ends after a stretch of quiet that adapts to the
+    speaker: a little longer than the pauses they make inside their
+    utterances (see PAUSE_PERCENTILES), separately for short commands and
+    for dictation, which people say with longer pauses. A
+    phrase counts as dictation when the caller says so, or once it runs
+    longer than the speaker's commands usually do (dictation_after_ms
+    until enough commands were heard). Without enough history the quiet
+    needed is silence_ms of the class.
+    """
+
+    def __init__(self, rate, frame_ms=30, energy_threshold=300, speech_band=0.5, start_ms=60, pre_roll_ms=300,
+                 silence_ms=None, min_silence_ms=None, max_silence_ms=1500, pause_margin=1.3,
+                 phrase_limits=None, dictation_after_ms=1500, history=50):
+        """Initialize the endpointer"""
+        self.rate = rate
+        self.frame = int(rate * frame_ms / 1000)
+        self.frame_ms = self.frame / rate * 1000
+        self.energy_threshold = energy_threshold
+        self.speech_band = speech_band
+        self.start_ms = start_ms
+        self.pre_roll_ms = pre_roll_ms
+        self.silence_ms = silence_ms or {COMMAND: 600, DICTATION: 1000}
+        self.min_silence_ms = min_silence_ms or {COMMAND: 300, DICTATION: 800}
+        self.max_silence_ms = max_silence_ms
+        self.pause_margin = pause_margin
+        self.phrase_limits = phrase_limits or {COMMAND: 10, DICTATION: 30}
+        self.dictation_after_ms = dictation_after_ms
+        self.pauses = {COMMAND: deque(maxlen=history), DICTATION: deque(maxlen=history)}
+        self.command_lengths = deque(maxlen=history)  # ms of speech in each command
+        self.last = None  # (class, pauses, ms of speech) of the last phrase
+        self.phrases = 0
+        self.cut_off = 0
+
+    def trailing_silence(self, intent):
+        """Get how many ms of quiet end a phrase of an intent class"""
+        pauses = self.pauses.get(intent)
+        if not pauses or len(pauses) < 5:
+            return self.silence_ms.get(intent, self.silence_ms[COMMAND])
+        silence = percentile(list(pauses), PAUSE_PERCENTILES.get(intent, 90)) * self.pause_margin
+        return min(self.max_silence_ms, max(self.min_silence_ms.get(intent, 0), silence))
+
+    def dictation_after(self):
+        """Get after how many ms of speech a phrase counts as dictation"""
+        if len(self.command_lengths) < 5:
+            return self.dictation_after_ms
+        return percentile(list(self.command_lengths), 90) * 1.2
+
+    def capture(self, source, timeout=5, intent=None, on_audio=None):
+        """Read from an audio source until a phrase is complete
+
+        source is a speech_recognition audio source of 16-bit audio
+        (anything with stream and SAMPLE_RATE). Returns the PCM frames of
+        the phrase, or None when nobody spoke for timeout seconds. Each
+        frame of the phrase is also passed to on_audio as it is read, e.g.
+        to a streaming recognizer.
+        """
+        frame_bytes = self.frame * 2
+        pre_roll = deque(maxlen=max(1, int(self.pre_roll_ms / self.frame_ms)))
+        waited_ms = onset_ms = 0.0
+        while True:
+            frame = source.stream.read(self.frame)
+            energy, band = frame_features(np.frombuffer(frame[:frame_bytes], dtype='<i2'), self.rate)
+            pre_roll.append(frame)
+            waited_ms += self.frame_ms
+            onset_ms = onset_ms + self.frame_ms if energy > self.energy_threshold and band >= self.speech_band else 0.0
+            if onset_ms >= self.start_ms:
+                break
+            if timeout is not None and waited_ms >= timeout * 1000:
+                return None
+
+        frames = list(pre_roll)
+        if on_audio:
+            for frame in frames:
+                on_audio(frame)
+        pauses = []
+        speech_ms = onset_ms
+        quiet_ms = 0.0
+        dictation_after = self.dictation_after()
+        while True:
+            frame = source.stream.read(self.frame)
+            frames.append(frame)
+            if on_audio:
+                on_audio(frame)
+            energy, _ = frame_features(np.frombuffer(frame[:frame_bytes], dtype='<i2'), self.rate)
+            if energy > self.energy_threshold:
+                if quiet_ms >= 2 * self.frame_ms:
+                    pauses.append(quiet_ms)
+                quiet_ms = 0.0
+                speech_ms += self.frame_ms
+            else:
+                quiet_ms += self.frame_ms
+
+            phrase_class = intent or (DICTATION if speech_ms >= dictation_after else COMMAND)
+            if quiet_ms >= self.trailing_silence(phrase_class):
+                break
+            if len(frames) * self.frame_ms >= self.phrase_limits.get(phrase_class, 10) * 1000:
+                self.cut_off += 1
+                break
+
+        self.phrases += 1
+        self.last = (phrase_class, pauses, speech_ms)
+        self._file(phrase_class, pauses, speech_ms)
+        return b"".join(frames)
+
+    def _file(self, phrase_class, pauses, speech_ms):
+        """Add a phrase to the history of its class"""
+        self.pauses[phrase_class].extend(pauses)
+        if phrase_class == COMMAND:
+            self.command_lengths.append(speech_ms)
+
+    def learn(self, intent):
+        """File the last phrase under the class it turned out to be, once it was recognized"""
+        if self.last is None or intent == self.last[0] or intent not in self.pauses:
+            return
+        phrase_class, pauses, speech_ms = self.last
+        for pause in pauses:
+            if pause in self.pauses[phrase_class]:
+                self.pauses[phrase_class].remove(pause)
+        if phrase_class == COMMAND and speech_ms in self.command_lengths:
+            self.command_lengths.remove(speech_ms)
+        self.last = (intent, pauses, speech_ms)
+        self._file(intent, pauses, speech_ms)
+
+    def stats(self):
+        """Get how many phrases were captured and the quiet that currently ends each class"""
+        return {
+            "phrases": self.phrases,
+            "cut_off": self.cut_off,
+            "command_silence_ms": self.trailing_silence(COMMAND),
+            "dictation_after_ms": self.dictation_after(),
+            "dictation_silence_ms": self.trailing_silence(DICTATION)
+        }
@@ -0,0 +1,179 @@
+import re
+
+from modules.utterance import WORD_RE, tokenize, as_utterance
+
+try:
+    from re import _parser as sre_parse
+except ImportError:  # Python < 3.11
+    import sre_parse
+
+# Stands in for \b while expanding literal prefixes; it is not a word character
+_BOUNDARY = "\x00"
+_MAX_PREFIXES = 64
+
+
+def _expand(items):
+    """Expand parsed regex items into the set of literal prefixes they start with
+
+    Returns (prefixes, complete); complete is False when expansion stopped at
+    an item that isn't a literal, a set of literals, a group, an alternation or \\b.
+    """
+    prefixes = {""}
+
+    for op, av in items:
+        if op is sre_parse.LITERAL:
+            prefixes = {prefix + chr(av).lower() for prefix in prefixes}
+        elif op is sre_parse.AT and av is sre_parse.AT_BOUNDARY:
+            prefixes = {prefix + _BOUNDARY for prefix in prefixes}
+        elif op is sre_parse.IN and all(member_op is sre_parse.LITERAL for member_op, _ in av):
+            prefixes = {prefix + chr(code).lower() for prefix in prefixes for _, code in av}
+        elif op is sre_parse.SUBPATTERN or op is sre_parse.BRANCH:
+            branches = [av[3]] if op is sre_parse.SUBPATTERN else av[1]
+            tails = set()
+            complete = True
+            for branch in branches:
+                branch_prefixes, branch_complete = _expand(branch)
+                tails |= branch_prefixes
+                complete = complete and branch_complete
+            prefixes = {prefix + tail for prefix in prefixes for tail in tails}
+            if not complete:
+                return prefixes, False
+        else:
+            return prefixes, False
+
+        if len(prefixes) > _MAX_PREFIXES:
+            return set(), False
+
+    return prefixes, True
+
+
+def _starts_with_number(items):
+    """Check whether a pattern starts with \\b followed by one or more digits"""
+    if not items or items[0] != (sre_parse.AT, sre_parse.AT_BOUNDARY):
+        return False
+
+    items = items[1:]
+    while items and items[0][0] is sre_parse.SUBPATTERN:
+        items = list(items[0][1][3])
+
+    if not items or items[0][0] not in (sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT):
+        return False
+    minimum, _, body = items[0][1]
+    return minimum >= 1 and list(body) == [(sre_parse.IN, [(sre_parse.CATEGORY, sre_parse.CATEGORY_DIGIT)])]
+
+
+def first_words(regex):
+    """Get the exact words a regex match can start with
+
+    Only patterns that start with \\b and a literal word followed by a
+    non-word character (e.g. ``\\b(min|minutes)\\b`` or ``\\bin ...``) can be
+    indexed by word; returns None for anything else.
+    """
+    prefixes, _ = _expand(list(sre_parse.parse(regex, re.IGNORECASE)))
+    words = set()
+
+    for prefix in prefixes:
+        if not prefix.startswith(_BOUNDARY):
+            return None
+        word = WORD_RE.match(prefix.lstrip(_BOUNDARY))
+        if not word or word.end() == len(prefix.lstrip(_BOUNDARY)):
+            return None
+        words.add(word.group())
+
+    return words or None
+
+
+class EntityScanner:
+    """Extract entities of every type from a single scan over the tokens of a text
+
+    Each entity regex is indexed by the words it can start with (or flagged
+    as starting with a number), so the text is tokenized once and a regex is
+    only tried, anchored, at tokens where it can match. Patterns that can't
+    be indexed that way are searched on their own. The results are the same
+    as running ``finditer`` for every pattern.
+    """
+
+    def __init__(self, entities=None):
+        """Initialize the scanner from the "entities" list of intents.json"""
+        self.patterns = []   # (entity type, compiled regex, default value, group)
+        self.by_word = {}    # word -> [pattern index]
+        self.by_number = []  # patterns that start with a number
+        self.unindexed = []  # patterns searched on their own
+
+        for entity in entities or []:
+            for pattern in entity["patterns"]:
+                regex = re.compile(pattern["regex"], re.IGNORECASE)
+                group = pattern.get("group", 0)
+
+                # A missing group raised IndexError for every match before
+                if group not in regex.groupindex and not (isinstance(group, int) and group <= regex.groups):
+                    continue
+
+                index = len(self.patterns)
+                self.patterns.append((entity["tag"], regex, pattern.get("value"), group))
+
+                words = first_words(pattern["regex"])
+                if words:
+                    for word in words:
+                        self.by_word.setdefault(word, []).append(index)
+                elif _starts_with_number(list(sre_parse.parse(pattern["regex"], re.IGNORECASE))):
+                    self.by_number.append(index)
+                else:
+                    self.unindexed.append(index)
+
+    def _record(self, found, index, match):
+        """Store the entity for a match of the pattern at index"""
+        entity_type, _, default_value, group = self.patterns[index]
+        value = default_value or match.group(group)
+
+        # For numbers, convert to integer if possible
+        if entity_type == "number":
+            try:
+                value = int(value)
+            except ValueError:
+                pass
+
+        found.setdefault(index, []).append({
+            "value": value,
+            "start": match.start(group),
+            "end": match.end(group)
+        })
+
+    def extract(self, text):
+        """Extract {type: [{value, start, end}]} for the entity types found in text"""
+        utterance = as_utterance(text)
+        text = utterance.text
+        if not text or not self.patterns:
+            return {}
+
+        # The regexes run on the original text, so the tokens must share its offsets
+        tokens = utterance.tokens if utterance.aligned else [
+            (word.lower(), start, end) for word, start, end in tokenize(text)
+        ]
+
+        found = {}
+        resume_at = [0] * len(self.patterns)
+
+        for word, start, _ in tokens:
+            candidates = self.by_word.get(word, [])
+            if self.by_number and word[0].isdigit():
+                candidates = candidates + self.by_number
+
+            for index in candidates:
+                if start < resume_at[index]:
+                    continue
+                match = self.patterns[index][1].match(text, start)
+                if match:
+                    resume_at[index] = match.end() if match.end() > start else start + 1
+                    self._record(found, index, match)
+
+        for index in self.unindexed:
+            for match in self.patterns[index][1].finditer(text):
+                self._record(found, index, match)
+
+        # Group records by type, in pattern order like the per-pattern loop
+        entities = {}
+        for index in sorted(found):
+            entities.setdefault(self.patterns[index][0], []).extend(found[index])
+
+        return entities
@@ -0,0 +1,211 @@
+import zlib
+from collections import Counter
+
+from modules.utterance import WORD_RE, Utterance
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    print("numpy not available, similarity intent fallback will be disabled")
+    NUMPY_AVAILABLE = False
+
+
+def char_ngrams(text, n=3):
+    """Get the character n-grams of the normalized, space-padded text"""
+    words = text.words if isinstance(text, Utterance) else WORD_RE.findall(text.lower())
+    padded = " " + " ".join(words) + " "
+    return [padded[i:i + n] for i in range(len(padded) - n + 1)]
+
+
+class SimilarityClassifier:
+    """Fallback intent classifier based on character n-gram similarity
+
+    Every pattern in intents.json becomes a hashed, L2-normalized character
+    n-gram vector. Only the nonzero entries are kept, as (feature, column,
+    weight) arrays in intent order, so the patterns of each intent are one
+    contiguous block, plus a copy of the entries sorted by feature. An
+    utterance is scored against every pattern by adding up the entries of
+    its own features; the score of an intent is the cosine similarity of
+    its closest pattern.
+
+    Results carry "source": "similarity", as their confidence is a cosine
+    and not the fraction of patterns matched that IntentMatcher reports.
+    The default threshold keeps small talk ("how is it going", "what's up")
+    that no pattern matches unknown while misspelled commands still match.
+    """
+
+    def __init__(self, intents=None, n_features=1024, ngram=3, threshold=0.75):
+        """Initialize the classifier from a list of intents"""
+        self.n_features = n_features
+        self.ngram = ngram
+        self.threshold = threshold
+        # Small feature indices sort in linear time
+        self.feature_dtype = np.uint16 if n_features <= 1 << 16 else np.int32
+        self.fit(intents or [])
+
+    def _hash(self, gram):
+        """Map an n-gram to a feature index, stable across processes"""
+        return zlib.crc32(gram.encode("utf-8")) % self.n_features
+
+    def _sparse_vector(self, text):
+        """Get the (feature indices, weights) of a normalized text vector"""
+        counts = Counter(self._hash(gram) for gram in char_ngrams(text, self.ngram))
+        if not counts:
+            return None, None
+
+        indices = np.fromiter(counts.keys(), dtype=np.intp, count=len(counts))
+        weights = 1.0 + np.log(np.fromiter(counts.values(), dtype=np.float32, count=len(counts)))
+        weights /= np.linalg.norm(weights)
+        return indices, weights
+
+    def _block(self, patterns):
+        """Get the (features, columns, weights) entries of one intent's patterns, columns from 0"""
+        vectors = [self._sparse_vector(pattern) for pattern in patterns]
+        vectors = [vector for vector in vectors if vector[0] is not None]
+        if not vectors:
+            return None
+
+        features = np.concatenate([indices for indices, _ in vectors]).astype(self.feature_dtype)
+        columns = np.repeat(np.arange(len(vectors), dtype=np.int32), [len(indices) for indices, _ in vectors])
+        weights = np.concatenate([weights for _, weights in vectors])
+        return features, columns, weights
+
+    def fit(self, intents, previous=None):
+        """Build the pattern entries from a list of intents
+
+        Entries of intents whose patterns are unchanged since the previous
+        classifier are copied from it instead of being vectorized again;
+        only the feature index is rebuilt over all of them.
+        """
+        self.tags = []
+        self.patterns = {}  # tag -> patterns, to detect changes on the next fit
+        offsets = []        # first column of every intent
+        entry_offsets = []  # first entry of every intent
+        blocks = []         # new blocks, or [start, end, column shift] entry ranges of previous
+        column_count = 0
+        entry_count = 0
+        if previous is not None:
+            previous_offsets = previous.offsets.tolist() + [previous.column_count]
+            previous_entries = previous.entry_offsets.tolist() + [len(previous.features)]
+
+        for intent in intents:
+            tag = intent["tag"]
+            patterns = list(intent["patterns"])
+
+            if previous is not None and previous.patterns.get(tag) == patterns:
+                index = previous.tag_index[tag]
+                start, end = previous_entries[index], previous_entries[index + 1]
+                width = previous_offsets[index + 1] - previous_offsets[index]
+                shift = column_count - previous_offsets[index]
+
+                # Runs of unchanged intents are copied as one slice
+                if blocks and isinstance(blocks[-1], list) and blocks[-1][1] == start and blocks[-1][2] == shift:
+                    blocks[-1][1] = end
+                else:
+                    blocks.append([start, end, shift])
+            else:
+                block = self._block(patterns)
+                if block is None:
+                    continue
+                features, columns, weights = block
+                blocks.append((features, columns + column_count, weights))
+                start, end = 0, len(features)
+                width = int(columns[-1]) + 1
+
+            self.tags.append(tag)
+            self.patterns[tag] = patterns
+            offsets.append(column_count)
+            entry_offsets.append(entry_count)
+            column_count += width
+            entry_count += end - start
+
+        parts = []
+        for block in blocks:
+            if isinstance(block, list):
+                start, end, shift = block
+                block = (previous.features[start:end], previous.columns[start:end] + shift, previous.weights[start:end])
+            parts.append(block)
+
+        self.tag_index = {tag: index for index, tag in enumerate(self.tags)}
+        self.offsets = np.array(offsets, dtype=np.intp)
+        self.entry_offsets = np.array(entry_offsets, dtype=np.intp)
+        self.column_count = column_count
+        self.features = np.concatenate([part[0] for part in parts]) if parts else np.zeros(0, self.feature_dtype)
+        self.columns = np.concatenate([part[1] for part in parts]) if parts else np.zeros(0, np.int32)
+        self.weights = np.concatenate([part[2] for part in parts]) if parts else np.zeros(0, np.float32)
+        self._index()
+
+    def _index(self):
+        """Sort the entries by feature, with indptr[f]:indptr[f + 1] the entries of feature f"""
+        order = np.argsort(self.features, kind="stable")
+        self.index_columns = self.columns[order]
+        self.index_weights = self.weights[order]
+        self.indptr = np.zeros(self.n_features + 1, dtype=np.intp)
+        np.cumsum(np.bincount(self.features, minlength=self.n_features), out=self.indptr[1:])
+
+    def updated(self, intents):
+        """Get a new classifier for intents, reusing the entries of unchanged intents"""
+        classifier = SimilarityClassifier(n_features=self.n_features, ngram=self.ngram, threshold=self.threshold)
+        classifier.fit(intents, previous=self)
+        return classifier
+
+    def _pattern_scores(self, indices, weights):
+        """Score a query vector against every pattern, visiting only the entries of its features"""
+        starts = self.indptr[indices]
+        lengths = self.indptr[indices + 1] - starts
+        # The positions of all entries of the query features, one run per feature
+        ends = np.cumsum(lengths)
+        positions = np.arange(ends[-1]) + np.repeat(starts - ends + lengths, lengths)
+
+        values = self.index_weights[positions] * np.repeat(weights, lengths)
+        return np.bincount(self.index_columns[positions], values, minlength=self.column_count)
+
+    def dense_matrix(self):
+        """Get the patterns as the columns of a dense (n_features x n_patterns) matrix"""
+        matrix = np.zeros((self.n_features, self.column_count), dtype=np.float32)
+        matrix[self.features, self.columns] = self.weights
+        return matrix
+
+    def _best_per_intent(self, pattern_scores):
+        """Reduce pattern scores (last axis) to the best score per intent"""
+        return np.maximum.reduceat(pattern_scores, self.offsets, axis=-1)
+
+    def _result(self, intent_scores):
+        """Turn a vector of intent scores into an extract_intent style result"""
+        best = int(np.argmax(intent_scores))
+        confidence = float(intent_scores[best])
+        if confidence < self.threshold:
+            return {"intent": "unknown", "confidence": 0}
+        return {"intent": self.tags[best], "confidence": confidence, "source": "similarity"}
+
+    def classify(self, text):
+        """Get the most similar intent for text"""
+        indices, weights = self._sparse_vector(text or "")
+        if indices is None or not self.tags:
+            return {"intent": "unknown", "confidence": 0}
+
+        return self._result(self._best_per_intent(self._pattern_scores(indices, weights)))
+
+    def classify_batch(self, texts, batch_size=256):
+        """Classify many texts, one matrix product per batch of texts
+
+        The dense pattern matrix is built for the duration of the call.
+        """
+        results = []
+        if not self.tags:
+            return [{"intent": "unknown", "confidence": 0} for _ in texts]
+
+        matrix = self.dense_matrix()
+        for start in range(0, len(texts), batch_size):
+            batch = texts[start:start + batch_size]
+            queries = np.zeros((len(batch), self.n_features), dtype=np.float32)
+            for row, text in enumerate(batch):
+                indices, weights = self._sparse_vector(text or "")
+                if indices is not None:
+                    queries[row, indices] = weights
+
+            intent_scores = self._best_per_intent(queries @ matrix)
+            results.extend(self._result(row) for row in intent_scores)
+
+        return results
@@ -0,0 +1,174 @@
+import re
+from collections import defaultdict
+
+from modules.utterance import WORD_RE, tokenize, as_utterance
+
+# Characters that give a pattern regex meaning instead of plain text
+REGEX_SYNTAX = set(".^$*+?{}[]\\|()")
+
+
+def literal_path(literal):
+    """Split a plain-text pattern into trie keys
+
+    The first key is the first word, every following key is the separator
+    before a word plus that word, e.g. "what's up" -> ["what", ("'", "s"), (" ", "up")].
+    Returns None if the pattern can't be matched on token boundaries.
+    """
+    tokens = tokenize(literal)
+    if not tokens or tokens[0][1] != 0 or tokens[-1][2] != len(literal):
+        return None
+
+    path = [tokens[0][0]]
+    for (_, _, previous_end), (word, start, _) in zip(tokens, tokens[1:]):
+        path.append((literal[previous_end:start], word))
+    return path
+
+
+class IntentMatcher:
+    """Single-pass matcher for intent patterns
+
+    Every pattern from intents.json is matched as ``\\b{pattern}\\b`` (case
+    insensitive). Plain-text patterns are stored in a word-level trie, so an
+    utterance is tokenized once and the trie is walked from each token; the
+    cost depends on the utterance length, not on the number of patterns.
+    Patterns containing regex syntax are kept as compiled regexes.
+
+    copy() returns a matcher that shares the trie with this one; changing the
+    copy only copies the nodes it touches, so a matcher that is in use is
+    never modified.
+    """
+
+    def __init__(self, intents=None):
+        """Initialize the matcher, optionally from a list of intents"""
+        self.order = {}           # tag -> position, used to break ties
+        self.pattern_counts = {}  # tag -> number of patterns
+        self.trie = {}            # first word -> node
+        self.irregular = {}       # tag -> [compiled regex] for non-literal patterns
+        self.paths = {}           # tag -> [trie path] for removal
+        self._next_id = 0
+        self._owned = set()       # ids of nodes this matcher may modify in place
+
+        for intent in intents or []:
+            self.add_intent(intent["tag"], intent["patterns"])
+
+    def __getstate__(self):
+        """Pickle without node ownership, which doesn't survive unpickling"""
+        state = self.__dict__.copy()
+        state["_owned"] = set()
+        return state
+
+    def copy(self):
+        """Get a copy that can be changed without affecting this matcher"""
+        matcher = IntentMatcher()
+        matcher.order = dict(self.order)
+        matcher.pattern_counts = dict(self.pattern_counts)
+        matcher.trie = dict(self.trie)
+        matcher.irregular = dict(self.irregular)
+        matcher.paths = dict(self.paths)
+        matcher._next_id = self._next_id
+        return matcher
+
+    def _writable_child(self, children, key):
+        """Get a node this matcher owns, copying a shared one first"""
+        node = children.get(key)
+        if node is None or id(node) not in self._owned:
+            node = {"ids": list(node["ids"]), "next": dict(node["next"])} if node else {"ids": [], "next": {}}
+            children[key] = node
+            self._owned.add(id(node))
+        return node
+
+    def add_intent(self, tag, patterns):
+        """Add or replace the patterns for an intent"""
+        if tag in self.pattern_counts:
+            self.remove_intent(tag, keep_order=True)
+        else:
+            self.order[tag] = len(self.order)
+
+        self.pattern_counts[tag] = len(patterns)
+        self.paths[tag] = []
+
+        for pattern in patterns:
+            literal = pattern.lower()
+            path = None if REGEX_SYNTAX.intersection(literal) else literal_path(literal)
+            if path is None:
+                regex = re.compile(f"\\b{pattern}\\b", re.IGNORECASE)
+                self.irregular.setdefault(tag, []).append(regex)
+                continue
+
+            node = self._writable_child(self.trie, path[0])
+            for key in path[1:]:
+                node = self._writable_child(node["next"], key)
+
+            node["ids"].append((self._next_id, tag))
+            self._next_id += 1
+            self.paths[tag].append(path)
+
+    def remove_intent(self, tag, keep_order=False):
+        """Remove all patterns of an intent"""
+        if tag not in self.pattern_counts:
+            return
+
+        del self.pattern_counts[tag]
+        self.irregular.pop(tag, None)
+
+        for path in self.paths.pop(tag):
+            node = self._writable_child(self.trie, path[0])
+            for key in path[1:]:
+                node = self._writable_child(node["next"], key)
+            node["ids"] = [entry for entry in node["ids"] if entry[1] != tag]
+
+        if not keep_order:
+            del self.order[tag]
+
+    def set_order(self, tags):
+        """Break ties in the order of tags, e.g. the order of the intents file"""
+        self.order = {tag: position for position, tag in enumerate(dict.fromkeys(tags))}
+
+    def match_counts(self, text):
+        """Count the matching patterns of every intent in one scan of text"""
+        utterance = as_utterance(text)
+        lower = utterance.lower
+        tokens = utterance.tokens
+        counts = defaultdict(int)
+        seen = set()
+
+        for i, (word, _, end) in enumerate(tokens):
+            node = self.trie.get(word)
+            j = i
+            while node:
+                for pattern_id, tag in node["ids"]:
+                    if pattern_id not in seen:
+                        seen.add(pattern_id)
+                        counts[tag] += 1
+
+                j += 1
+                if j == len(tokens) or not node["next"]:
+                    break
+                next_word, start, next_end = tokens[j]
+                node = node["next"].get((lower[end:start], next_word))
+                end = next_end
+
+        for tag, regexes in self.irregular.items():
+            for regex in regexes:
+                if regex.search(lower):
+                    counts[tag] += 1
+
+        return counts
+
+    def scores(self, text):
+        """Get the confidence of every matching intent, in intent order"""
+        counts = self.match_counts(text)
+        return {
+            tag: counts[tag] / max(1, self.pattern_counts[tag])
+            for tag in sorted(counts, key=self.order.__getitem__)
+        }
+
+    def best_match(self, text):
+        """Get the intent with the highest confidence"""
+        best_match = {"intent": "unknown", "confidence": 0}
+
+        for tag, confidence in self.scores(text).items():
+            if confidence > best_match["confidence"]:
+                best_match = {"intent": tag, "confidence": confidence}
+
+        return best_match
@@ -1,21 +1,80 @@
-import re
 import json
 import os
 import random
-from collections import defaultdict
+import hashlib
+import threading
+import time
+
+from modules.intent_matcher import IntentMatcher
+from modules.intent_classifier import SimilarityClassifier, NUMPY_AVAILABLE
+from modules.entity_scanner import EntityScanner
+from modules.utterance import as_utterance
+
+class CompiledIntents:
+    """One consistent set of compiled intent and entity tables
+    
+    NLPProcessor never modifies an instance once it is in use; a reload
+    builds a new one and swaps it in with a single assignment, so a caller
+    holding an instance always sees tables built from the same intents.
+    """
+    
+    def __init__(self, intents, intent_matcher, fallback_classifier, entity_scanner):
+        """Initialize the compiled tables"""
+        self.intents = intents
+        self.intent_matcher = intent_matcher
+        self.fallback_classifier = fallback_classifier
+        self.entity_scanner = entity_scanner
+    
+    def extract_intent(self, text):
+        """Extract intent from text or an Utterance"""
+        utterance = as_utterance(text)
+        if not utterance:
+            return {"intent": "unknown", "confidence": 0}
+            
+        best_match = self.intent_matcher.best_match(utterance)
+        
+        # Fall back to the most similar pattern if nothing matched exactly
+        if best_match["intent"] == "unknown" and self.fallback_classifier:
+            best_match = self.fallback_classifier.classify(utterance)
+        
+        return best_match
+    
+    def extract_entities(self, text):
+        """Extract entities from text or an Utterance"""
+        if not text:
+            return {}
+            
+        return self.entity_scanner.extract(text)
 
 class NLPProcessor:
     """Natural Language Processing module for intent and entity extraction"""
     
-    def __init__(self):
+    def __init__(self, intents_file=None, routing_cache=None):
         """Initialize the NLP processor"""
-        self.intents_file = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'config', 'intents.json')
+        self.intents_file = intents_file or os.path.join(os.path.dirname(os.path.dirname(__file__)), 'config', 'intents.json')
         
         # Ensure directory exists
         os.makedirs(os.path.dirname(self.intents_file), exist_ok=True)
         
+        # Callbacks notified whenever the patterns are recompiled
+        self.reload_listeners = []
+        self.reload_lock = threading.Lock()
+        
+        # Background watcher for changes to the intents file
+        self.watch_thread = None
+        self.watch_stop = threading.Event()
+        
+        # Use the prebuilt tables from the routing cache if they are up to date
+        cached = routing_cache.section("nlp") if routing_cache else None
+        if cached:
+            self.intents = cached.intents
+            self.compiled = cached
+            self._remember_intents_file()
+            return
+        
         # Load or create intents
         self.intents = self.load_intents()
+        self._remember_intents_file()
         
         # Compile regex patterns for faster matching
         self.compile_patterns()
@@ -194,96 +253,164 @@ class NLPProcessor:
     
     def compile_patterns(self):
         """Compile regex patterns for faster matching"""
-        self.compiled_patterns = {}
-        
-        # Compile intent patterns
-        for intent in self.intents["intents"]:
-            tag = intent["tag"]
-            patterns = intent["patterns"]
-            self.compiled_patterns[tag] = [re.compile(f"\\b{pattern}\\b", re.IGNORECASE) for pattern in patterns]
+        with self.reload_lock:
+            self.compiled = CompiledIntents(
+                self.intents,
+                # Index intent patterns so all of them are matched in one scan
+                IntentMatcher(self.intents["intents"]),
+                # Similarity classifier for utterances that match no pattern
+                SimilarityClassifier(self.intents["intents"]) if NUMPY_AVAILABLE else None,
+                # Merge entity patterns into a single scanner
+                EntityScanner(self.intents.get("entities", []))
+            )
         
-        # Compile entity patterns
-        self.compiled_entity_patterns = {}
-        for entity in self.intents.get("entities", []):
-            tag = entity["tag"]
-            self.compiled_entity_patterns[tag] = []
-            
-            for pattern in entity["patterns"]:
-                regex_pattern = pattern["regex"]
-                self.compiled_entity_patterns[tag].append({
-                    "regex": re.compile(regex_pattern, re.IGNORECASE),
-                    "value": pattern.get("value"),
-                    "group": pattern.get("group", 0)
-                })
+        self._notify_reload()
     
-    def extract_intent(self, text):
-        """Extract intent from text"""
-        if not text:
-            return {"intent": "unknown", "confidence": 0}
+    def update_intents(self, new_intents):
+        """Recompile only the intents and entities that changed, then swap them in"""
+        with self.reload_lock:
+            current = self.compiled
+            old_by_tag = {intent["tag"]: intent for intent in current.intents["intents"]}
+            new_by_tag = {intent["tag"]: intent for intent in new_intents["intents"]}
+            
+            removed = [tag for tag in old_by_tag if tag not in new_by_tag]
+            changed = [tag for tag, intent in new_by_tag.items()
+                       if tag not in old_by_tag or old_by_tag[tag]["patterns"] != intent["patterns"]]
+            entities_changed = current.intents.get("entities", []) != new_intents.get("entities", [])
+            # Ties go to the intent that comes first in the file, as after a full compile
+            reordered = list(current.intent_matcher.order) != list(new_by_tag)
+            
+            # Build the new tables next to the current ones, sharing what didn't change
+            intent_matcher = current.intent_matcher
+            fallback_classifier = current.fallback_classifier
+            if removed or changed or reordered:
+                intent_matcher = intent_matcher.copy()
+                for tag in removed:
+                    intent_matcher.remove_intent(tag)
+                for tag in changed:
+                    intent_matcher.add_intent(tag, new_by_tag[tag]["patterns"])
+                intent_matcher.set_order(new_by_tag)
+                if fallback_classifier:
+                    fallback_classifier = fallback_classifier.updated(new_intents["intents"])
+            
+            entity_scanner = current.entity_scanner
+            if entities_changed:
+                entity_scanner = EntityScanner(new_intents.get("entities", []))
             
-        best_match = {"intent": "unknown", "confidence": 0}
+            self.intents = new_intents
+            self.compiled = CompiledIntents(new_intents, intent_matcher, fallback_classifier, entity_scanner)
         
-        # Count how many patterns match for each intent
-        matches = defaultdict(int)
-        total_patterns = 0
+        if removed or changed or reordered or entities_changed:
+            self._notify_reload()
         
-        for intent, patterns in self.compiled_patterns.items():
-            for pattern in patterns:
-                if pattern.search(text.lower()):
-                    matches[intent] += 1
-            total_patterns += len(patterns)
+        return {
+            "changed": [tag for tag in changed if tag in old_by_tag],
+            "added": [tag for tag in changed if tag not in old_by_tag],
+            "removed": removed,
+            "reordered": reordered,
+            "entities_changed": entities_changed
+        }
+    
+    def _remember_intents_file(self):
+        """Record the state of the intents file so changes can be detected"""
+        self.intents_signature = None
+        self.intents_hash = None
+        self.failed_hash = None
+        try:
+            stat = os.stat(self.intents_file)
+            with open(self.intents_file, 'rb') as file:
+                self.intents_hash = hashlib.sha1(file.read()).hexdigest()
+            self.intents_signature = (stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            pass
+    
+    def check_for_updates(self):
+        """Reload the intents file if it changed on disk"""
+        try:
+            stat = os.stat(self.intents_file)
+        except OSError:
+            return None
         
-        # Calculate confidence for each intent with matches
-        for intent, match_count in matches.items():
-            # Simple confidence calculation based on number of matching patterns
-            confidence = match_count / max(1, len(self.compiled_patterns[intent]))
-            
-            if confidence > best_match["confidence"]:
-                best_match = {"intent": intent, "confidence": confidence}
+        # Only hash the file when its modification time or size changed
+        signature = (stat.st_mtime_ns, stat.st_size)
+        if signature == self.intents_signature:
+            return None
         
-        return best_match
-    
-    def extract_entities(self, text):
-        """Extract entities from text"""
-        if not text:
-            return {}
-            
-        entities = {}
+        with open(self.intents_file, 'rb') as file:
+            content = file.read()
+        digest = hashlib.sha1(content).hexdigest()
+        if digest == self.intents_hash:
+            self.intents_signature = signature
+            return None
+        if digest == self.failed_hash:
+            return None
         
-        for entity_type, patterns in self.compiled_entity_patterns.items():
-            entities[entity_type] = []
-            
-            for pattern_info in patterns:
-                regex = pattern_info["regex"]
-                group = pattern_info.get("group", 0)
-                default_value = pattern_info.get("value")
-                
-                for match in regex.finditer(text):
-                    try:
-                        value = match.group(group)
-                        if default_value:
-                            value = default_value
-                            
-                        # For numbers, convert to integer if possible
-                        if entity_type == "number":
-                            try:
-                                value = int(value)
-                            except ValueError:
-                                pass
-                                
-                        entities[entity_type].append({
-                            "value": value,
-                            "start": match.start(group),
-                            "end": match.end(group)
-                        })
-                    except IndexError:
-                        continue
+        # The signature is only recorded once the new intents are swapped in,
+        # so a half-written file is read again on the next check; the same
+        # broken content is only reported once
+        self.failed_hash = digest
+        try:
+            new_intents = json.loads(content)
+        except ValueError as e:
+            print(f"Error loading intents: {e}")
+            return None
         
-        return entities
+        start = time.perf_counter()
+        summary = self.update_intents(new_intents)
+        self.intents_hash = digest
+        self.intents_signature = signature
+        self.failed_hash = None
+        
+        print(f"Reloaded intents in {(time.perf_counter() - start) * 1000:.1f}ms: "
+              f"{len(summary['added'])} added, {len(summary['changed'])} changed, {len(summary['removed'])} removed"
+              f"{', reordered' if summary['reordered'] else ''}"
+              f"{', entities updated' if summary['entities_changed'] else ''}")
+        return summary
+    
+    def start_watching(self, interval=2.0):
+        """Start checking the intents file for changes in the background"""
+        if self.watch_thread and self.watch_thread.is_alive():
+            return
+        
+        self.watch_stop.clear()
+        self.watch_thread = threading.Thread(target=self._watch_loop, args=(interval,), daemon=True)
+        self.watch_thread.start()
+    
+    def stop_watching(self):
+        """Stop the intents file watcher"""
+        self.watch_stop.set()
+        if self.watch_thread and self.watch_thread.is_alive():
+            self.watch_thread.join(timeout=1.0)
+    
+    def _watch_loop(self, interval):
+        """Poll the intents file until stopped"""
+        while not self.watch_stop.wait(interval):
+            try:
+                self.check_for_updates()
+            except Exception as e:
+                # Keep the current tables if the new intents don't compile
+                print(f"Error reloading intents: {e}")
+    
+    def _notify_reload(self):
+        """Let dependent caches know the compiled patterns changed"""
+        for listener in self.reload_listeners:
+            listener()
+    
+    def add_reload_listener(self, callback):
+        """Register a callback to run whenever the patterns are recompiled"""
+        self.reload_listeners.append(callback)
+    
+    def extract_intent(self, text):
+        """Extract intent from text or an Utterance"""
+        return self.compiled.extract_intent(text)
+    
+    def extract_entities(self, text):
+        """Extract entities from text or an Utterance"""
+        return self.compiled.extract_entities(text)
     
     def get_random_response(self, intent_tag):
         """Get a random response for a given intent tag"""
-        for intent in self.intents["intents"]:
+        for intent in self.compiled.intents["intents"]:
             if intent["tag"] == intent_tag and intent.get("responses"):
                 return random.choice(intent["responses"])
         return None
@@ -0,0 +1,144 @@
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+_estimator = None
+_estimator_lock = threading.Lock()
+
+# Noise floor (RMS) above which the room counts as normal, and as noisy
+QUIET_LEVEL = 100
+NOISY_LEVEL = 500
+
+
+class NoiseFloorEstimator:
+    """Track the background noise level of the live audio and keep energy thresholds current
+
+    Reads the capture buffer on its own thread and computes the RMS energy
+    of every window_ms window. The noise floor is a low percentile of the
+    windows of the last history_seconds, so speech doesn't raise it but a
+    louder room does within a few seconds. Every attached object with an
+    energy_threshold (a speech_recognition Recognizer, the barge-in monitor)
+    gets ratio times the floor, but never less than min_threshold, which
+    replaces calibrating with adjust_for_ambient_noise() before each listen.
+    """
+
+    def __init__(self, capture, window_ms=50, history_seconds=5, percentile=20, ratio=1.5,
+                 min_threshold=150, update_ms=250):
+        """Initialize the estimator; start() begins reading the capture"""
+        self.capture = capture
+        self.window = max(1, int(capture.rate * window_ms / 1000))
+        self.energies = deque(maxlen=max(1, int(history_seconds * 1000 / window_ms)))
+        self.percentile = percentile
+        self.ratio = ratio
+        self.min_threshold = min_threshold
+        self.update_every = max(1, int(update_ms / window_ms))
+        self.targets = []
+        self.floor = None
+        self.threshold = None
+        self.windows = 0
+        self.cpu_seconds = 0.0
+        self.running = False
+        self.thread = None
+
+    def attach(self, target):
+        """Keep target.energy_threshold set from the noise floor
+
+        Turns off the target's own dynamic adjustment, which would work
+        against the estimator.
+        """
+        if hasattr(target, "dynamic_energy_threshold"):
+            target.dynamic_energy_threshold = False
+        if target not in self.targets:
+            self.targets.append(target)
+        if self.threshold is not None:
+            target.energy_threshold = self.threshold
+
+    def detach(self, target):
+        """Stop updating target"""
+        if target in self.targets:
+            self.targets.remove(target)
+
+    def start(self):
+        """Start the estimator thread if it isn't running"""
+        if self.running:
+            return
+        self.running = True
+        self.thread = threading.Thread(target=self._estimate_loop, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """Stop the estimator thread"""
+        self.running = False
+        if self.thread and self.thread is not threading.current_thread():
+            self.thread.join(timeout=1.0)
+
+    def _estimate_loop(self):
+        """Measure windows of the capture until stopped"""
+        # Start with the audio already in the buffer, so the first estimate is ready at once
+        reader = self.capture.reader(start=self.capture.position() - self.energies.maxlen * self.window)
+        while self.running:
+            samples = reader.read(self.window, timeout=1.0)
+            if samples is None:
+                if not self.capture.running:
+                    time.sleep(0.1)
+                continue
+            self.process(samples)
+
+    def process(self, samples):
+        """Add a window of 16-bit samples; returns the energy threshold"""
+        start = time.process_time()
+        energy = float(np.sqrt(np.mean(samples.astype(np.float32) ** 2))) if len(samples) else 0.0
+        self.energies.append(energy)
+        self.windows += 1
+        if self.floor is None or self.windows % self.update_every == 0:
+            self.update()
+        self.cpu_seconds += time.process_time() - start
+        return self.threshold
+
+    def update(self):
+        """Recompute the noise floor and pass the threshold on"""
+        if not self.energies:
+            return
+        self.floor = float(np.percentile(self.energies, self.percentile))
+        self.threshold = max(self.min_threshold, self.floor * self.ratio)
+        for target in self.targets:
+            target.energy_threshold = self.threshold
+
+    def level(self):
+        """Get the noise level as "quiet", "normal" or "noisy", or None before the first estimate"""
+        if self.floor is None:
+            return None
+        if self.floor < QUIET_LEVEL:
+            return "quiet"
+        if self.floor < NOISY_LEVEL:
+            return "normal"
+        return "noisy"
+
+    def stats(self):
+        """Get the current estimate and what it cost"""
+        return {
+            "noise_floor": self.floor,
+            "energy_threshold": self.threshold,
+            "windows": self.windows,
+            "cpu_seconds": self.cpu_seconds
+        }
+
+
+def get_noise_floor_estimator(capture):
+    """Get the shared NoiseFloorEstimator of an AudioCapture, starting it on first use"""
+    global _estimator
+    with _estimator_lock:
+        if _estimator is None or _estimator.capture is not capture:
+            if _estimator is not None:
+                _estimator.stop()
+            _estimator = NoiseFloorEstimator(capture)
+        _estimator.start()
+        return _estimator
+
+
+def noise_level():
+    """Get the noise level measured by the running estimator, or None if there is none"""
+    estimator = _estimator
+    return estimator.level() if estimator is not None else None
@@ -0,0 +1,67 @@
+import threading
+from collections import OrderedDict
+
+
+def normalize_utterance(text):
+    """Normalize an utterance for use as a cache key"""
+    return " ".join(text.lower().split())
+
+
+class ParseCache:
+    """Bounded LRU cache of parse results keyed by normalized utterance text"""
+
+    def __init__(self, maxsize=512):
+        """Initialize the cache"""
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, key):
+        """Get the cached parse for a key, or None"""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key, entry):
+        """Store a parse, evicting the least recently used one if full"""
+        if self.maxsize <= 0:
+            return
+
+        with self.lock:
+            self.entries[key] = entry
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def discard(self, key):
+        """Drop a single cached parse"""
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def clear(self):
+        """Drop all cached parses, e.g. after the intents were recompiled"""
+        with self.lock:
+            self.entries.clear()
+            self.invalidations += 1
+
+    def stats(self):
+        """Get cache statistics"""
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self.entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "invalidations": self.invalidations
+            }
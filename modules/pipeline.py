@@ -0,0 +1,98 @@
+import time
+import threading
+from collections import deque
+
+from utils.benchmark import percentile
+
+
+class PipelineRun:
+    """The stages of one utterance, each evaluated at most once and on demand
+
+    A stage is a function taking the run; it gets the output of earlier
+    stages with run.get(name), which runs them the first time they are
+    needed. The time recorded for a stage excludes the stages it pulled in.
+    """
+
+    def __init__(self, stages, utterance):
+        """Initialize the run"""
+        self.stages = stages
+        self.utterance = utterance
+        self.results = {}
+        self.timings = {}  # stage -> milliseconds, in the order the stages finished
+        self.started = time.perf_counter()
+        self._nested = 0.0
+
+    def get(self, name):
+        """Get the output of a stage, running it if it hasn't run yet"""
+        if name in self.results:
+            return self.results[name]
+
+        outer_nested, self._nested = self._nested, 0.0
+        start = time.perf_counter()
+        try:
+            result = self.stages[name](self)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.timings[name] = (elapsed - self._nested) * 1000
+            self._nested = outer_nested + elapsed
+
+        self.results[name] = result
+        return result
+
+    def ran(self, name):
+        """Check whether a stage has run"""
+        return name in self.results
+
+
+class Pipeline:
+    """Named processing stages with wall time statistics per stage"""
+
+    def __init__(self, stages, history=200):
+        """Initialize the pipeline from a {name: function(run)} dict"""
+        self.stages = stages
+        self.history = history
+        self.lock = threading.Lock()
+        self.runs = 0
+        self.durations = {}  # stage -> recent durations in ms
+        self.counts = {}     # stage -> number of runs that used the stage
+        self.last = {}
+
+    def start(self, utterance):
+        """Start a run for one utterance"""
+        return PipelineRun(self.stages, utterance)
+
+    def finish(self, run):
+        """Record the stage timings of a finished run"""
+        timings = dict(run.timings)
+        timings["total"] = (time.perf_counter() - run.started) * 1000
+
+        with self.lock:
+            self.runs += 1
+            self.last = timings
+            for name, duration in timings.items():
+                self.durations.setdefault(name, deque(maxlen=self.history)).append(duration)
+                self.counts[name] = self.counts.get(name, 0) + 1
+
+    def stats(self):
+        """Get per-stage timing statistics in milliseconds over the recent runs"""
+        with self.lock:
+            stages = {}
+            for name, durations in self.durations.items():
+                values = list(durations)
+                stages[name] = {
+                    "runs": self.counts[name],
+                    "skipped": self.runs - self.counts[name],
+                    "mean_ms": sum(values) / len(values),
+                    "p50_ms": percentile(values, 50),
+                    "p95_ms": percentile(values, 95),
+                    "max_ms": max(values)
+                }
+            return {"utterances": self.runs, "stages": stages, "last": dict(self.last)}
+
+    def reset_stats(self):
+        """Forget all recorded timings"""
+        with self.lock:
+            self.runs = 0
+            self.durations.clear()
+            self.counts.clear()
+            self.last = {}
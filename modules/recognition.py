@@ -0,0 +1,215 @@
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+from utils.benchmark import percentile
+
+try:
+    import pocketsphinx
+    POCKETSPHINX_AVAILABLE = True
+except ImportError:
+    POCKETSPHINX_AVAILABLE = False
+
+
+class RecognitionResult:
+    """A transcript from one recognizer backend"""
+
+    def __init__(self, text, confidence, backend, seconds):
+        """Initialize the result"""
+        self.text = text
+        self.confidence = confidence
+        self.backend = backend
+        self.seconds = seconds
+
+    def __repr__(self):
+        return f"RecognitionResult({self.text!r}, {self.confidence:.2f}, {self.backend!r})"
+
+
+class RecognizerBackend(ABC):
+    """A speech recognizer a RecognitionRace can run
+
+    Subclasses set name and implement recognize(audio), which returns
+    (text, confidence) with confidence between 0 and 1, or None when the
+    audio wasn't understood, and raises when the recognizer failed.
+    """
+
+    name = "backend"
+
+    @abstractmethod
+    def recognize(self, audio):
+        """Turn speech_recognition AudioData into (text, confidence), or None"""
+
+
+class GoogleBackend(RecognizerBackend):
+    """Google Web Speech through speech_recognition, with Google's own confidence"""
+
+    name = "google"
+
+    def __init__(self, recognizer, default_confidence=0.8):
+        """Initialize the backend"""
+        self.recognizer = recognizer
+        self.default_confidence = default_confidence
+
+    def recognize(self, audio):
+        """Recognize audio with Google"""
+        response = self.recognizer.recognize_google(audio, show_all=True)
+        alternatives = response.get("alternative") if isinstance(response, dict) else None
+        if not alternatives:
+            return None
+        best = alternatives[0]
+        return best["transcript"], best.get("confidence", self.default_confidence)
+
+
+class SphinxBackend(RecognizerBackend):
+    """CMU Sphinx through speech_recognition, offline
+
+    Sphinx doesn't report a usable confidence (its posterior is often 1.0
+    for poor transcripts), so every transcript gets the fixed confidence
+    given, low enough that a confident cloud result wins when it arrives
+    in time. The race's patience bounds how long it waits for one.
+    """
+
+    name = "sphinx"
+
+    def __init__(self, recognizer, confidence=0.5):
+        """Initialize the backend"""
+        self.recognizer = recognizer
+        self.confidence = confidence
+
+    def recognize(self, audio):
+        """Recognize audio with Sphinx"""
+        try:
+            text = self.recognizer.recognize_sphinx(audio)
+        except Exception as e:
+            if type(e).__name__ == "UnknownValueError":
+                return None
+            raise
+        return (text, self.confidence) if text else None
+
+
+class StandInBackend(RecognizerBackend):
+    """A local recognizer that answers with a fixed transcript, for tests and benchmarks
+
+    transcript is a string or a function of the audio returning one (or
+    None for audio it doesn't understand). delay is the time it takes in
+    seconds, or a function returning it; with fail set it raises instead.
+    """
+
+    def __init__(self, name, transcript, confidence=0.9, delay=0.0, fail=False):
+        """Initialize the backend"""
+        self.name = name
+        self.transcript = transcript
+        self.confidence = confidence
+        self.delay = delay
+        self.fail = fail
+
+    def recognize(self, audio):
+        """Wait for the delay, then answer"""
+        time.sleep(self.delay() if callable(self.delay) else self.delay)
+        if self.fail:
+            raise RuntimeError(f"{self.name} recognizer failed")
+        text = self.transcript(audio) if callable(self.transcript) else self.transcript
+        confidence = self.confidence(audio) if callable(self.confidence) else self.confidence
+        return (text, confidence) if text else None
+
+
+class RecognitionRace:
+    """Run several recognizers on the same audio at once and take the first good answer
+
+    recognize() returns the first result with at least min_confidence. If
+    none has it by the time every backend finished, deadline seconds
+    passed, or patience seconds passed since the first less confident
+    result, the most confident result so far is returned (or None). A
+    backend that is still running then finishes in the background and its
+    result is discarded, so a slow network no longer adds its full timeout
+    before the offline fallback gets a chance.
+    """
+
+    def __init__(self, backends, min_confidence=0.6, deadline=4.0, patience=1.0):
+        """Initialize the race"""
+        self.backends = list(backends)
+        self.min_confidence = min_confidence
+        self.deadline = deadline
+        self.patience = patience
+        # Room for a second race while backends of an abandoned one are still running
+        self.pool = ThreadPoolExecutor(max_workers=max(1, 2 * len(self.backends)), thread_name_prefix="recognizer")
+        self.latencies = deque(maxlen=200)
+        self.counts = {"races": 0, "confident": 0, "fallback": 0, "no_result": 0, "deadline": 0, "patience": 0}
+        self.wins = {backend.name: 0 for backend in self.backends}
+        self.errors = {backend.name: 0 for backend in self.backends}
+
+    def _run(self, backend, audio):
+        """Run one backend; returns its RecognitionResult, or None"""
+        start = time.perf_counter()
+        try:
+            answer = backend.recognize(audio)
+        except Exception as e:
+            self.errors[backend.name] += 1
+            print(f"{backend.name} recognition failed: {e}")
+            return None
+        if not answer:
+            return None
+        text, confidence = answer
+        return RecognitionResult(text, confidence, backend.name, time.perf_counter() - start)
+
+    def recognize(self, audio):
+        """Get the RecognitionResult for audio, or None if no backend understood it"""
+        start = time.monotonic()
+        deadline = start + self.deadline
+        self.counts["races"] += 1
+        pending = {self.pool.submit(self._run, backend, audio) for backend in self.backends}
+        best = None
+        until = deadline
+        while pending:
+            remaining = until - time.monotonic()
+            if remaining <= 0:
+                self.counts["deadline" if until == deadline else "patience"] += 1
+                break
+            finished, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+            for future in finished:
+                result = future.result()
+                if result and (best is None or result.confidence > best.confidence):
+                    if best is None:
+                        # Wait a little longer for a confident answer, not the whole deadline
+                        until = min(deadline, time.monotonic() + self.patience)
+                    best = result
+            if best and best.confidence >= self.min_confidence:
+                self.counts["confident"] += 1
+                return self._finish(best, start)
+
+        for future in pending:
+            future.cancel()
+        if best is None:
+            self.counts["no_result"] += 1
+            self.latencies.append(time.monotonic() - start)
+            return None
+        self.counts["fallback"] += 1
+        return self._finish(best, start)
+
+    def _finish(self, result, start):
+        """Record the winner of a race"""
+        self.wins[result.backend] += 1
+        self.latencies.append(time.monotonic() - start)
+        return result
+
+    def stats(self):
+        """Get how races ended, which backends won and how long it took"""
+        latencies = list(self.latencies)
+        return dict(self.counts, wins=dict(self.wins), errors=dict(self.errors),
+                    p50_ms=percentile(latencies, 50) * 1000, p95_ms=percentile(latencies, 95) * 1000)
+
+    def shutdown(self):
+        """Stop the worker threads without waiting for abandoned backends"""
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+
+def build_recognition_race(recognizer, names=("google", "sphinx"), min_confidence=0.6, deadline=4.0, patience=1.0):
+    """Get a RecognitionRace over the speech_recognition backends with the given names
+
+    Sphinx is left out when pocketsphinx isn't installed.
+    """
+    factories = {"google": GoogleBackend, "sphinx": SphinxBackend}
+    backends = [factories[name](recognizer) for name in names
+                if name in factories and (name != "sphinx" or POCKETSPHINX_AVAILABLE)]
+    return RecognitionRace(backends, min_confidence, deadline, patience)
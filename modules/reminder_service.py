@@ -1,11 +1,13 @@
 from datetime import datetime, timedelta
 import threading
-import time
+
+from modules.response_queue import ALERT
 
 class ReminderService:
     def __init__(self, voice_engine):
         self.reminders = []
         self.voice_engine = voice_engine
+        self.reminders_changed = threading.Event()
         self.reminder_thread = threading.Thread(target=self._check_reminders, daemon=True)
         self.reminder_thread.start()
 
@@ -15,6 +17,7 @@ class ReminderService:
             'time': reminder_time,
             'message': f"Timer for {minutes} minutes is up!"
         })
+        self.reminders_changed.set()
         return f"Timer set for {minutes} minutes"
 
     def set_reminder(self, message, hours):
@@ -23,13 +26,20 @@ class ReminderService:
             'time': reminder_time,
             'message': message
         })
+        self.reminders_changed.set()
         return f"Reminder set for {hours} hours from now"
 
     def _check_reminders(self):
         while True:
+            self.reminders_changed.clear()
             current_time = datetime.now()
             for reminder in self.reminders[:]:
                 if current_time >= reminder['time']:
-                    self.voice_engine.speak(reminder['message'])
                     self.reminders.remove(reminder)
-            time.sleep(30)
+                    # Alerts interrupt whatever is being said
+                    self.voice_engine.speak(reminder['message'], ALERT)
+
+            # Sleep until the next reminder is due or a new one is set
+            next_time = min((reminder['time'] for reminder in self.reminders), default=None)
+            timeout = None if next_time is None else max(0, (next_time - datetime.now()).total_seconds())
+            self.reminders_changed.wait(timeout)
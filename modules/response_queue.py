@@ -0,0 +1,191 @@
+import time
+import itertools
+import threading
+from collections import deque
+
+from utils.benchmark import percentile
+
+# Message classes, most urgent first
+ALERT = "alert"
+REPLY = "reply"
+CHATTER = "chatter"
+PRIORITIES = {ALERT: 0, REPLY: 1, CHATTER: 2}
+
+
+def response_key(text):
+    """Get the text a response is compared by when coalescing duplicates"""
+    return " ".join(text.lower().split())
+
+
+class Response:
+    """One message waiting to be, or being, delivered to the user"""
+
+    def __init__(self, seq, text, priority):
+        """Initialize the response"""
+        self.seq = seq
+        self.text = text
+        self.priority = priority
+        self.rank = PRIORITIES[priority]
+        self.key = response_key(text)
+        self.queued = time.perf_counter()
+        self.started = None
+        self.preempted = False
+        self.job = None  # speech job delivering the response, if any
+
+
+class ResponseQueue:
+    """Bounded priority queue of responses with preemption and coalescing
+
+    Responses come in three classes: alerts (reminders, timers), replies
+    to the user and chatter (progress notes, greetings). get() returns the
+    most urgent pending response, oldest first within a class. Queuing a
+    more urgent response than the one being delivered calls
+    on_preempt(response) for the current one, so its speech can be cut
+    short. A response with the same text as one that is pending or being
+    delivered is coalesced into it. When maxsize responses are pending the
+    oldest least urgent one is dropped to make room, and a response that
+    isn't more urgent than any pending one is dropped instead.
+    """
+
+    def __init__(self, maxsize=20, on_preempt=None, history=200):
+        """Initialize the queue"""
+        self.maxsize = maxsize
+        self.on_preempt = on_preempt
+        self.pending = {priority: deque() for priority in PRIORITIES}
+        self.current = None
+        self.closed = False
+        self.lock = threading.Condition()
+        self.seqs = itertools.count(1)
+        self.history = history
+        self.latency_ms = {priority: deque(maxlen=history) for priority in PRIORITIES}
+        self.counts = {"queued": 0, "delivered": 0, "coalesced": 0, "dropped": 0, "preempted": 0}
+
+    def put(self, text, priority=REPLY):
+        """Queue a response; returns it, or None if it was coalesced or dropped"""
+        if priority not in PRIORITIES:
+            raise ValueError(f"Unknown response priority: {priority}")
+
+        response = Response(next(self.seqs), text, priority)
+        with self.lock:
+            if self.closed or self._coalesce(response):
+                return None
+            if len(self) >= self.maxsize and not self._make_room(response):
+                self.counts["dropped"] += 1
+                return None
+
+            self.pending[priority].append(response)
+            self.counts["queued"] += 1
+            self.lock.notify()
+
+            current = self.current
+            if current and not current.preempted and response.rank < current.rank:
+                current.preempted = True
+                self.counts["preempted"] += 1
+            else:
+                current = None
+
+        if current and self.on_preempt:
+            try:
+                self.on_preempt(current)
+            except Exception as e:
+                print(f"Error preempting response: {e}")
+        return response
+
+    def _coalesce(self, response):
+        """Merge a response into a pending or current duplicate (called with the lock held)"""
+        if self.current and not self.current.preempted and self.current.key == response.key:
+            self.counts["coalesced"] += 1
+            return True
+
+        for priority, pending in self.pending.items():
+            for duplicate in pending:
+                if duplicate.key != response.key:
+                    continue
+                # Keep the earlier message, in the more urgent class of the two
+                if response.rank < duplicate.rank:
+                    pending.remove(duplicate)
+                    duplicate.priority, duplicate.rank = response.priority, response.rank
+                    self._insert(duplicate)
+                self.counts["coalesced"] += 1
+                return True
+        return False
+
+    def _insert(self, response):
+        """Put a response in its class in queue order (called with the lock held)"""
+        pending = self.pending[response.priority]
+        index = len(pending)
+        while index and pending[index - 1].seq > response.seq:
+            index -= 1
+        pending.insert(index, response)
+
+    def _make_room(self, response):
+        """Drop the oldest response of the least urgent class below response (called with the lock held)"""
+        for priority in sorted(PRIORITIES, key=PRIORITIES.get, reverse=True):
+            if PRIORITIES[priority] <= response.rank:
+                break
+            if self.pending[priority]:
+                self.pending[priority].popleft()
+                self.counts["dropped"] += 1
+                return True
+        return False
+
+    def get(self, timeout=None):
+        """Take the most urgent response and make it the current one; None on timeout or close"""
+        with self.lock:
+            deadline = None if timeout is None else time.monotonic() + timeout
+            while not self.closed and not len(self):
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return None
+                self.lock.wait(remaining)
+            if self.closed:
+                return None
+
+            for priority in PRIORITIES:
+                if self.pending[priority]:
+                    response = self.pending[priority].popleft()
+                    break
+
+            response.started = time.perf_counter()
+            self.latency_ms[response.priority].append((response.started - response.queued) * 1000)
+            self.counts["delivered"] += 1
+            self.current = response
+            return response
+
+    def done(self, response):
+        """Mark a response as delivered"""
+        with self.lock:
+            if self.current is response:
+                self.current = None
+
+    def clear(self):
+        """Drop every pending response"""
+        with self.lock:
+            for pending in self.pending.values():
+                self.counts["dropped"] += len(pending)
+                pending.clear()
+
+    def close(self):
+        """Drop pending responses and wake up get()"""
+        with self.lock:
+            self.closed = True
+            for pending in self.pending.values():
+                pending.clear()
+            self.lock.notify_all()
+
+    def __len__(self):
+        return sum(len(pending) for pending in self.pending.values())
+
+    def stats(self):
+        """Get queue statistics, with the time from put() to delivery per class in milliseconds"""
+        with self.lock:
+            latency = {}
+            for priority, values in self.latency_ms.items():
+                values = list(values)
+                latency[priority] = {
+                    "delivered": len(values),
+                    "p50_ms": percentile(values, 50),
+                    "p95_ms": percentile(values, 95),
+                    "max_ms": max(values, default=0.0)
+                }
+            return dict(self.counts, pending=len(self), latency=latency)
@@ -0,0 +1,216 @@
+import io
+import os
+import sys
+import json
+import mmap
+import stat
+import pickle
+import struct
+import hashlib
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+# Bump when the layout of any cached section changes
+CACHE_VERSION = 2
+
+MAGIC = b"NATROUTE"
+ALIGNMENT = 64
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Source files whose code defines the cached tables, the tokenizer they are
+# keyed by, and the file format
+SOURCE_MODULES = [
+    os.path.join(BASE_DIR, "modules", name) for name in (
+        "nlp_processor.py", "intent_matcher.py", "intent_classifier.py",
+        "entity_scanner.py", "command_executor.py", "utterance.py",
+        "routing_cache.py"
+    )
+]
+
+
+class RoutingCache:
+    """Versioned snapshot of the warmed routing tables
+
+    The file holds the compiled NLP tables and the custom pattern table,
+    keyed by a hash of intents.json and of the modules that build them.
+    The CommandProcessor table isn't cached: its regexes would be compiled
+    again when unpickled, and loading the cache costs more than building
+    it. The file is read through mmap. NumPy arrays are kept out of the
+    pickle: they are stored as raw buffers whose dtype and shape are in the
+    JSON header, like .npy files loaded with allow_pickle=False, and used
+    straight from the mapping. Only the small tables are pickled, and the
+    file is only unpickled if it belongs to the current user, nobody else
+    can write to it and its directory isn't writable by everyone. save()
+    writes it that way whatever the umask. When the key doesn't match,
+    load() returns None and the callers compile their tables as usual.
+    """
+
+    def __init__(self, cache_file=None, intents_file=None):
+        """Initialize the routing cache"""
+        self.cache_file = cache_file or os.path.join(BASE_DIR, 'data', 'routing_cache.bin')
+        self.intents_file = intents_file or os.path.join(BASE_DIR, 'config', 'intents.json')
+        self.sections = None
+        self.loaded = False
+
+    def source_key(self):
+        """Hash the sources the cached tables were built from"""
+        digest = hashlib.sha1(f"{CACHE_VERSION}:{sys.version_info[:2]}".encode())
+        for path in [self.intents_file] + SOURCE_MODULES:
+            try:
+                with open(path, 'rb') as file:
+                    digest.update(file.read())
+            except OSError:
+                digest.update(b"<missing>")
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    def load(self):
+        """Load the cached sections if they match the current sources"""
+        if self.loaded:
+            return self.sections
+        self.loaded = True
+
+        try:
+            with open(self.cache_file, 'rb') as file:
+                directory = os.stat(os.path.dirname(self.cache_file))
+                if not (_trusted(os.fstat(file.fileno())) and _trusted(directory, stat.S_IWOTH)):
+                    print(f"Ignoring routing cache {self.cache_file}: it isn't yours or others can write to it")
+                    return None
+                mapping = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return None
+
+        try:
+            if mapping[:len(MAGIC)] != MAGIC:
+                return None
+            header_length, = struct.unpack_from("<I", mapping, len(MAGIC))
+            header_start = len(MAGIC) + 4
+            header = json.loads(bytes(mapping[header_start:header_start + header_length]))
+
+            if header["version"] != CACHE_VERSION or header["key"] != self.source_key():
+                return None
+
+            if header["arrays"] and not NUMPY_AVAILABLE:
+                return None
+
+            view = memoryview(mapping)
+            pickle_start, pickle_end = header["pickle"]
+            arrays = [_array(view[start:end], dtype, shape) for (start, end), dtype, shape in header["arrays"]]
+            unpickler = pickle.Unpickler(io.BytesIO(view[pickle_start:pickle_end]))
+            unpickler.persistent_load = lambda index: arrays[index]
+            self.sections = unpickler.load()
+            return self.sections
+        except Exception as e:
+            print(f"Error loading routing cache: {e}")
+            return None
+
+    def section(self, name):
+        """Get one cached section, or None if the cache is missing or stale"""
+        sections = self.load()
+        return sections.get(name) if sections else None
+
+    def save(self, sections):
+        """Write the sections to the cache file"""
+        arrays = []
+
+        def array_id(value):
+            # Arrays are written after the pickle; the pickle refers to them by index
+            if NUMPY_AVAILABLE and isinstance(value, np.ndarray) and not value.dtype.hasobject:
+                arrays.append(np.ascontiguousarray(value))
+                return len(arrays) - 1
+            return None
+
+        stream = io.BytesIO()
+        pickler = pickle.Pickler(stream, protocol=pickle.HIGHEST_PROTOCOL)
+        pickler.persistent_id = array_id
+        pickler.dump(sections)
+        payload = stream.getvalue()
+        raw_buffers = [memoryview(array).cast("B") for array in arrays]
+
+        # Lay out the pickle and buffers after the header, buffers aligned for NumPy
+        def layout(header_length):
+            position = len(MAGIC) + 4 + header_length
+            pickle_range = [position, position + len(payload)]
+            position += len(payload)
+            ranges = []
+            for raw in raw_buffers:
+                position += -position % ALIGNMENT
+                ranges.append([position, position + raw.nbytes])
+                position += raw.nbytes
+            return pickle_range, ranges
+
+        key = self.source_key()
+        header_length = 0
+        while True:
+            pickle_range, ranges = layout(header_length)
+            header = json.dumps({"version": CACHE_VERSION, "key": key, "pickle": pickle_range,
+                                 "arrays": [[span, array.dtype.str, array.shape]
+                                            for span, array in zip(ranges, arrays)]}).encode()
+            if len(header) == header_length:
+                break
+            header_length = len(header)
+
+        os.makedirs(os.path.dirname(self.cache_file), mode=0o755, exist_ok=True)
+        temp_file = self.cache_file + ".tmp"
+        # Writable by the user only, whatever the umask, or load() won't trust it
+        descriptor = os.open(temp_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, "O_BINARY", 0), 0o644)
+        if hasattr(os, "fchmod"):
+            os.fchmod(descriptor, 0o644)
+        with os.fdopen(descriptor, 'wb') as file:
+            file.write(MAGIC + struct.pack("<I", len(header)) + header + payload)
+            for raw, (start, _) in zip(raw_buffers, ranges):
+                file.write(b"\0" * (start - file.tell()))
+                file.write(raw)
+
+        # Replace the old cache in one step so readers never see a partial file
+        os.replace(temp_file, self.cache_file)
+        self.sections = sections
+        self.loaded = True
+
+
+def _trusted(status, writable=stat.S_IWGRP | stat.S_IWOTH):
+    """Whether a file belongs to the current user and has none of the writable bits"""
+    if not hasattr(os, "getuid"):
+        return True
+    return status.st_uid == os.getuid() and not status.st_mode & writable
+
+
+def _array(buffer, dtype, shape):
+    """Get a NumPy array over a buffer of the cache file, refusing dtypes that hold objects"""
+    dtype = np.dtype(dtype)
+    if dtype.hasobject:
+        raise ValueError(f"Cached array of {dtype} holds objects")
+    return np.frombuffer(buffer, dtype=dtype).reshape(shape)
+
+
+def build_routing_cache(cache_file=None, intents_file=None):
+    """Compile all routing tables, save them, and time cold vs warm startup"""
+    import time
+    from modules.nlp_processor import NLPProcessor
+    from modules.command_executor import CommandExecutor
+
+    start = time.perf_counter()
+    nlp = NLPProcessor(intents_file)
+    custom_patterns = CommandExecutor._load_custom_patterns()
+    cold_time = time.perf_counter() - start
+
+    cache = RoutingCache(cache_file, nlp.intents_file)
+    cache.save({
+        "nlp": nlp.compiled,
+        "custom_patterns": custom_patterns
+    })
+
+    start = time.perf_counter()
+    warm_cache = RoutingCache(cache_file, nlp.intents_file)
+    NLPProcessor(intents_file, routing_cache=warm_cache)
+    warm_cache.section("custom_patterns")
+    warm_time = time.perf_counter() - start
+
+    # Without a loadable cache the warm startup above compiled everything again
+    return {"cache_file": cache.cache_file, "cold_seconds": cold_time, "warm_seconds": warm_time,
+            "loaded": warm_cache.load() is not None}
@@ -0,0 +1,269 @@
+import json
+import time
+import uuid
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from modules.response_queue import REPLY
+from modules.user_preferences import UserPreferences
+from utils.benchmark import percentile
+
+
+class ServerBusy(Exception):
+    """The server has no room for another session or request; try again later"""
+
+
+class SessionBusy(Exception):
+    """A session has as many requests in flight as it may; wait for one to finish"""
+
+
+class SessionPreferences(UserPreferences):
+    """Preferences of one session, copied from the user's and kept in memory"""
+
+    def __init__(self, base, **overrides):
+        """Copy the preferences of base, with overrides"""
+        self.config_file = None
+        self.defaults = base.defaults
+        self.preferences = json.loads(json.dumps(base.preferences))
+        self.preferences.update(overrides)
+
+    def save_preferences(self, preferences=None):
+        """Keep the preferences in memory only"""
+        if preferences is not None:
+            self.preferences = preferences
+
+
+class SessionRequest:
+    """One utterance of a session; done is set by its first response, or when it has none"""
+
+    def __init__(self, request_id, text):
+        """Initialize the request"""
+        self.id = request_id
+        self.text = text
+        self.submitted = time.perf_counter()
+        self.responses = []
+        self.done = threading.Event()
+        self.finished = None
+
+    def answer(self, text):
+        """Add a response"""
+        self.responses.append(text)
+        if self.finished is None:
+            self.finished = time.perf_counter()
+        self.done.set()
+
+
+class AssistantSession:
+    """The state of one user of a shared assistant: preferences, context and history
+
+    Responses are published as events with increasing ids; a client reads
+    the ones after the last id it saw, so a reconnecting client can catch
+    up. Only the newest events are kept. The context (the last intent and
+    entities) and the history are kept for inspection, not fed back into
+    parsing.
+    """
+
+    def __init__(self, session_id, preferences, history=50, events=100):
+        """Initialize the session"""
+        self.id = session_id
+        self.preferences = preferences
+        self.history = deque(maxlen=history)
+        self.context = {}
+        self.events = deque(maxlen=events)
+        self.lock = threading.Condition()
+        self.last_event = 0
+        self.requests = 0
+        self.in_flight = 0
+        self.last_seen = time.monotonic()
+        self.closed = False
+
+    def publish(self, request, text, priority=REPLY):
+        """Publish a response to a request"""
+        with self.lock:
+            self.last_event += 1
+            self.events.append({"id": self.last_event, "request": request.id, "text": text, "priority": priority})
+            self.lock.notify_all()
+
+    def events_after(self, event_id, timeout=None):
+        """Get the events after event_id, waiting up to timeout for one"""
+        with self.lock:
+            self.lock.wait_for(lambda: self.last_event > event_id or self.closed, timeout)
+            return [event for event in self.events if event["id"] > event_id]
+
+    def close(self):
+        """End the session and wake up its readers"""
+        with self.lock:
+            self.closed = True
+            self.lock.notify_all()
+
+    def state(self):
+        """Get the context and conversation history of the session"""
+        with self.lock:
+            return {"session": self.id, "requests": self.requests, "in_flight": self.in_flight,
+                    "preferences": self.preferences.preferences,
+                    "context": dict(self.context), "history": list(self.history)}
+
+
+class SessionManager:
+    """Serve many sessions from one VoiceAssistant on a pool of worker threads
+
+    The assistant's compiled intents, caches and command runner are shared;
+    every session has its own preferences, context and history, and gets
+    the responses to its own utterances, including "still working" notices
+    and the reminders and timers it set. A session's preferences give the
+    assistant name in its answers and count its commands; voice settings
+    and quiet hours only apply to speech, which sessions don't use.
+    submit() refuses work instead of
+    queueing it without bound: ServerBusy when max_pending requests are
+    waiting or running, or there are max_sessions sessions, SessionBusy
+    when a session already has max_in_flight requests. Sessions idle for
+    longer than ttl seconds are closed.
+    """
+
+    def __init__(self, assistant, workers=8, max_pending=64, max_in_flight=4, max_sessions=1000, ttl=1800):
+        """Initialize the manager and start its workers"""
+        self.assistant = assistant
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="session")
+        self.workers = workers
+        self.max_pending = max_pending
+        self.max_in_flight = max_in_flight
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self.base_preferences = assistant.preferences
+        self.sessions = {}
+        self.lock = threading.Lock()
+        self.pending = 0
+        self.ids = 0
+        self.latencies = deque(maxlen=1000)
+        self.counts = {"sessions": 0, "requests": 0, "answered": 0, "rejected": 0, "expired": 0, "errors": 0}
+        self.running = True
+        self.reaper = threading.Thread(target=self._expire_loop, daemon=True)
+        self.reaper.start()
+
+    def create_session(self, preferences=None):
+        """Start a session with the user's preferences updated by preferences; raises ServerBusy when there are max_sessions"""
+        with self.lock:
+            if len(self.sessions) >= self.max_sessions:
+                self.counts["rejected"] += 1
+                raise ServerBusy("Too many sessions")
+            session = AssistantSession(uuid.uuid4().hex, SessionPreferences(self.base_preferences, **(preferences or {})))
+            self.sessions[session.id] = session
+            self.counts["sessions"] += 1
+            return session
+
+    def get_session(self, session_id):
+        """Get an open session, or None"""
+        with self.lock:
+            session = self.sessions.get(session_id)
+        if session:
+            session.last_seen = time.monotonic()
+        return session
+
+    def close_session(self, session_id):
+        """End a session; returns whether it was open"""
+        with self.lock:
+            session = self.sessions.pop(session_id, None)
+        if session:
+            session.close()
+        return session is not None
+
+    def submit(self, session, text):
+        """Queue an utterance of a session; returns its SessionRequest"""
+        with self.lock:
+            if self.pending >= self.max_pending:
+                self.counts["rejected"] += 1
+                raise ServerBusy("Too many requests in progress")
+            with session.lock:
+                if session.in_flight >= self.max_in_flight:
+                    self.counts["rejected"] += 1
+                    raise SessionBusy("Too many requests in progress for this session")
+                session.in_flight += 1
+                session.requests += 1
+            self.pending += 1
+            self.ids += 1
+            self.counts["requests"] += 1
+            request = SessionRequest(self.ids, text)
+        session.last_seen = time.monotonic()
+        self.pool.submit(self._process, session, request)
+        return request
+
+    def _process(self, session, request):
+        """Run an utterance through the assistant on a worker"""
+        entry = {"user": request.text, "responses": request.responses, "time": time.time()}
+        with session.lock:
+            session.history.append(entry)
+
+        def respond(text, priority=REPLY):
+            if not text or session.closed:
+                return
+            request.answer(text)
+            session.publish(request, text, priority)
+            self._record(request)
+
+        try:
+            run = self.assistant.process_input(request.text, respond=respond, preferences=session.preferences)
+            if run is not None:
+                intent = run.results.get("intent")
+                with session.lock:
+                    session.context.update(last_intent=intent["intent"] if intent else None,
+                                           last_entities=run.get("entities"))
+            # Commands running on the command runner answer later; anything else is done
+            if run is None or run.results.get("execute") is not None or not run.ran("command"):
+                request.done.set()
+        except Exception as e:
+            print(f"Error processing session input: {e}")
+            with self.lock:
+                self.counts["errors"] += 1
+            respond("Sorry, something went wrong with that request.")
+        finally:
+            with session.lock:
+                session.in_flight -= 1
+            with self.lock:
+                self.pending -= 1
+
+    def _record(self, request):
+        """Count a request's first answer"""
+        if len(request.responses) == 1:
+            with self.lock:
+                self.counts["answered"] += 1
+                self.latencies.append(request.finished - request.submitted)
+
+    def _expire_loop(self):
+        """Close sessions that have been idle for longer than the ttl"""
+        while self.running:
+            time.sleep(min(30, self.ttl / 2))
+            now = time.monotonic()
+            with self.lock:
+                idle = [session_id for session_id, session in self.sessions.items()
+                        if now - session.last_seen > self.ttl and not session.in_flight]
+            for session_id in idle:
+                if self.close_session(session_id):
+                    with self.lock:
+                        self.counts["expired"] += 1
+
+    def stats(self):
+        """Get session and request counts and the latency to the first answer"""
+        with self.lock:
+            latencies = list(self.latencies)
+            return dict(self.counts, open_sessions=len(self.sessions), pending=self.pending, workers=self.workers,
+                        p50_ms=percentile(latencies, 50) * 1000, p95_ms=percentile(latencies, 95) * 1000,
+                        p99_ms=percentile(latencies, 99) * 1000)
+
+    def shutdown(self):
+        """Stop taking requests and close every session"""
+        self.running = False
+        for session_id in list(self.sessions):
+            self.close_session(session_id)
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+
+def build_session_manager(workers=8, max_pending=64, max_in_flight=4, max_sessions=1000, ttl=1800):
+    """Get a SessionManager over a VoiceAssistant with speech off, configured from the user's preferences"""
+    from modules.voice_assistant import VoiceAssistant
+
+    preferences = SessionPreferences(UserPreferences(), use_tts=False, use_stt=False)
+    assistant = VoiceAssistant(preferences)
+    if preferences.get_preference("watch_intents", True):
+        assistant.nlp.start_watching()
+    return SessionManager(assistant, workers, max_pending, max_in_flight, max_sessions, ttl)
@@ -0,0 +1,410 @@
+import os
+import re
+import time
+import wave
+import queue
+import shutil
+import tempfile
+import threading
+
+from utils.benchmark import percentile
+
+# Audio players for rendered speech, in order of preference
+try:
+    import winsound
+    WINSOUND_AVAILABLE = True
+except ImportError:
+    WINSOUND_AVAILABLE = False
+
+try:
+    import simpleaudio
+    SIMPLEAUDIO_AVAILABLE = True
+except ImportError:
+    SIMPLEAUDIO_AVAILABLE = False
+
+# Breaks after sentence ends and line ends, and after clauses for long sentences
+SENTENCE_BREAK_RE = re.compile(r"(?<=[.!?])\s+|\n+")
+CLAUSE_BREAK_RE = re.compile(r"(?<=[,;:])\s+")
+
+
+def split_sentences(text, max_chars=160):
+    """Split text into sentences, and sentences longer than max_chars into clauses"""
+    chunks = []
+
+    for sentence in SENTENCE_BREAK_RE.split(text):
+        sentence = sentence.strip()
+        if not sentence:
+            continue
+        if len(sentence) <= max_chars:
+            chunks.append(sentence)
+            continue
+
+        # Group clauses so no chunk is needlessly short
+        chunk = ""
+        for clause in CLAUSE_BREAK_RE.split(sentence):
+            if chunk and len(chunk) + len(clause) + 1 > max_chars:
+                chunks.append(chunk)
+                chunk = clause
+            else:
+                chunk = f"{chunk} {clause}" if chunk else clause
+        chunks.append(chunk)
+
+    return chunks
+
+
+class WinsoundPlayer:
+    """Play WAV files with winsound; stop() cuts the current file short"""
+
+    def __init__(self):
+        """Initialize the player"""
+        self.stopped = threading.Event()
+
+    def __call__(self, path):
+        """Play a file and block until it ends or is stopped"""
+        with wave.open(path, 'rb') as wav:
+            duration = wav.getnframes() / wav.getframerate()
+        self.stopped.clear()
+        winsound.PlaySound(path, winsound.SND_FILENAME | winsound.SND_ASYNC)
+        if self.stopped.wait(duration):
+            winsound.PlaySound(None, winsound.SND_PURGE)
+
+    def stop(self):
+        """Stop the file that is playing"""
+        self.stopped.set()
+
+
+class SimpleaudioPlayer:
+    """Play WAV files with simpleaudio; stop() cuts the current file short"""
+
+    def __init__(self):
+        """Initialize the player"""
+        self.playing = None
+
+    def __call__(self, path):
+        """Play a file and block until it ends or is stopped"""
+        self.playing = simpleaudio.WaveObject.from_wave_file(path).play()
+        self.playing.wait_done()
+
+    def stop(self):
+        """Stop the file that is playing"""
+        playing = self.playing
+        if playing:
+            playing.stop()
+
+
+def find_player():
+    """Get a player that plays a WAV file and blocks until it ends, or None
+
+    A player is called with the path of the file; the players found here
+    can also be stopped from another thread.
+    """
+    if WINSOUND_AVAILABLE:
+        return WinsoundPlayer()
+    if SIMPLEAUDIO_AVAILABLE:
+        return SimpleaudioPlayer()
+    return None
+
+
+class Pyttsx3Renderer:
+    """Synthesize speech with a pyttsx3 engine, to a file or to the speakers
+
+    pyttsx3 isn't thread-safe, so the engine is created by start() on the
+    thread that uses it, unless one is passed in.
+    """
+
+    def __init__(self, engine=None, prefer_female=True):
+        """Initialize the renderer"""
+        self.engine = engine
+        self.prefer_female = prefer_female
+        self.settings = {}
+
+    def start(self):
+        """Create the engine on the calling thread and pick the voice"""
+        if self.engine is None:
+            import pyttsx3
+            self.engine = pyttsx3.init()
+
+            # Try to set a female voice if available
+            if self.prefer_female:
+                for voice in self.engine.getProperty('voices'):
+                    if 'female' in voice.name.lower():
+                        self.engine.setProperty('voice', voice.id)
+                        break
+
+        self.settings = {name: self.engine.getProperty(name) for name in ('voice', 'rate', 'volume')}
+
+    def configure(self, settings):
+        """Apply the voice, rate and volume of a job where they differ from the current ones"""
+        for name, value in settings.items():
+            if self.settings.get(name) != value:
+                self.engine.setProperty(name, value)
+                self.settings[name] = value
+
+    def render(self, text, path):
+        """Synthesize text into an audio file"""
+        self.engine.save_to_file(text, path)
+        self.engine.runAndWait()
+
+    def speak(self, text):
+        """Synthesize and play text directly"""
+        self.engine.say(text)
+        self.engine.runAndWait()
+
+    def voice_key(self):
+        """Get the (voice id, rate, volume) the engine speaks with"""
+        return (self.settings.get('voice'), self.settings.get('rate'), self.settings.get('volume'))
+
+
+class SpeechJob:
+    """One text being spoken by the speech pipeline"""
+
+    def __init__(self, text, chunks, settings=None, play=True):
+        """Initialize the job"""
+        self.text = text
+        self.chunks = chunks
+        self.settings = settings
+        self.play = play
+        self.rendered = 0
+        self.queued = time.perf_counter()
+        self.first_audio = None
+        self.last_end = None
+        self.gaps = []
+        self.remaining = len(chunks)
+        self.cancelled = False
+        self.done = threading.Event()
+        if not chunks:
+            self.done.set()
+
+
+class SpeechPipeline:
+    """Stream speech sentence by sentence instead of synthesizing it all first
+
+    speak() splits the text into sentences and queues them. A synthesis
+    thread renders each sentence to a WAV file while a player thread plays
+    the previous one, so speech starts after the first sentence is
+    rendered. Without a player the synthesis thread speaks each sentence
+    directly, which still starts speaking after the first sentence.
+
+    With a TTSCache, sentences that were rendered before with the same voice
+    are played from the cache and new ones are stored in it.
+
+    Only the synthesis thread uses the renderer, and each job can carry
+    its own voice settings. Records the time from speak() to the first
+    audio and the gaps between sentences; see stats().
+    """
+
+    def __init__(self, renderer, player=None, cache=None, lookahead=1, max_chars=160, history=100):
+        """Initialize the pipeline and start its threads
+
+        player defaults to the first available audio player; pass False to
+        always speak directly.
+        """
+        self.renderer = renderer
+        self.player = find_player() if player is None else player or None
+        self.cache = cache if self.player else None
+        self.max_chars = max_chars
+        self.directory = tempfile.mkdtemp(prefix="natasha_tts_") if self.player else None
+        self.text_queue = queue.Queue()
+        self.audio_queue = queue.Queue(maxsize=lookahead)
+        self.lock = threading.Lock()
+        self.jobs = []
+        self.playing = None  # job whose sentence the player is playing
+        self.first_audio_ms = []
+        self.gap_ms = []
+        self.history = history
+        self.spoken = 0
+        self.running = True
+        self.counter = 0
+
+        self.synthesis_thread = threading.Thread(target=self._synthesis_loop, daemon=True)
+        self.synthesis_thread.start()
+        self.player_thread = None
+        if self.player:
+            self.player_thread = threading.Thread(target=self._player_loop, daemon=True)
+            self.player_thread.start()
+
+    def speak(self, text, wait=False, settings=None):
+        """Queue text to be spoken with optional voice settings; returns its SpeechJob"""
+        job = self._queue(SpeechJob(text, split_sentences(text or "", self.max_chars), settings))
+        if wait:
+            job.done.wait()
+        return job
+
+    def prewarm(self, texts, settings=None):
+        """Render the sentences of texts into the cache without playing them; returns how many were rendered"""
+        if not self.cache:
+            return 0
+
+        chunks = [chunk for text in texts for chunk in split_sentences(text or "", self.max_chars)]
+        job = self._queue(SpeechJob(" ".join(texts), list(dict.fromkeys(chunks)), settings, play=False))
+        job.done.wait()
+        return job.rendered
+
+    def _queue(self, job):
+        """Queue the sentences of a job for the synthesis thread"""
+        # A job without sentences is done already and would never be removed
+        if not job.chunks:
+            return job
+        with self.lock:
+            self.jobs.append(job)
+        for chunk in job.chunks:
+            self.text_queue.put((job, chunk))
+        return job
+
+    def cancel(self, job):
+        """Drop the sentences of a job that haven't been spoken yet
+
+        A sentence that is being played is cut short if the player can be
+        stopped; one that is spoken directly by the engine runs to its end.
+        """
+        with self.lock:
+            if job in self.jobs:
+                self.jobs.remove(job)
+            playing = self.playing is job
+        job.cancelled = True
+        if playing and hasattr(self.player, "stop"):
+            self.player.stop()
+        job.done.set()
+
+    def stop(self):
+        """Drop everything that hasn't been spoken yet"""
+        with self.lock:
+            jobs = list(self.jobs)
+        for job in jobs:
+            self.cancel(job)
+
+    def close(self):
+        """Stop the pipeline threads and remove rendered audio"""
+        self.stop()
+        self.running = False
+        self.text_queue.put(None)
+        if self.directory:
+            shutil.rmtree(self.directory, ignore_errors=True)
+
+    def _synthesis_loop(self):
+        """Render queued sentences, or speak them directly without a player"""
+        if hasattr(self.renderer, "start"):
+            try:
+                self.renderer.start()
+            except Exception as e:
+                print(f"Error initializing TTS engine: {e}")
+
+        while self.running:
+            item = self.text_queue.get()
+            if item is None:
+                break
+            job, chunk = item
+            if job.cancelled:
+                continue
+
+            try:
+                if job.settings:
+                    self.renderer.configure(job.settings)
+
+                if not self.player:
+                    self._started(job)
+                    self.renderer.speak(chunk)
+                    self._finished(job)
+                    continue
+
+                # Play sentences spoken before straight from the cache
+                voice = self.renderer.voice_key() if self.cache else None
+                cached = self.cache.get(chunk, voice) if self.cache else None
+                if cached:
+                    if job.play:
+                        self.audio_queue.put((job, cached, False))
+                    else:
+                        self._finished(job)
+                    continue
+
+                path = self._render(chunk)
+                job.rendered += 1
+                if self.cache:
+                    path = self.cache.put(chunk, voice, path)
+
+                if job.play:
+                    self.audio_queue.put((job, path, not self.cache))
+                else:
+                    self._finished(job)
+            except Exception as e:
+                print(f"TTS error: {e}")
+                self._finished(job)
+
+        self.audio_queue.put(None)
+
+    def _player_loop(self):
+        """Play rendered sentences in order"""
+        while True:
+            item = self.audio_queue.get()
+            if item is None:
+                break
+            job, path, temporary = item
+
+            try:
+                with self.lock:
+                    self.playing = None if job.cancelled else job
+                if self.playing:
+                    self._started(job)
+                    self.player(path)
+            except Exception as e:
+                print(f"Audio playback error: {e}")
+            finally:
+                with self.lock:
+                    self.playing = None
+                self._finished(job)
+                if temporary:
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        pass
+
+    def _render(self, chunk):
+        """Render one sentence to a new file in the pipeline directory"""
+        self.counter += 1
+        path = os.path.join(self.directory, f"chunk_{self.counter}.wav")
+        self.renderer.render(chunk, path)
+        return path
+
+    def _started(self, job):
+        """Record the start of a sentence"""
+        now = time.perf_counter()
+        if job.first_audio is None:
+            job.first_audio = now
+            self._record(self.first_audio_ms, (now - job.queued) * 1000)
+        elif job.last_end is not None:
+            gap = (now - job.last_end) * 1000
+            job.gaps.append(gap)
+            self._record(self.gap_ms, gap)
+
+    def _finished(self, job):
+        """Record the end of a sentence, and of the job after its last one"""
+        with self.lock:
+            job.last_end = time.perf_counter()
+            job.remaining -= 1
+            if job.remaining > 0:
+                return
+            if job in self.jobs:
+                self.jobs.remove(job)
+                self.spoken += job.play
+        job.done.set()
+
+    def _record(self, values, value):
+        """Keep a bounded history of a metric"""
+        with self.lock:
+            values.append(value)
+            del values[:-self.history]
+
+    def stats(self):
+        """Get time-to-first-audio and inter-sentence gap statistics in milliseconds"""
+        with self.lock:
+            first_audio, gaps = list(self.first_audio_ms), list(self.gap_ms)
+            return {
+                "spoken": self.spoken,
+                "mode": "streaming" if self.player else "direct",
+                "first_audio_p50_ms": percentile(first_audio, 50),
+                "first_audio_p95_ms": percentile(first_audio, 95),
+                "gap_p50_ms": percentile(gaps, 50),
+                "gap_p95_ms": percentile(gaps, 95),
+                "gap_max_ms": max(gaps, default=0.0),
+                "cache": self.cache.stats() if self.cache else None
+            }
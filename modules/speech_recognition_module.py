@@ -1,6 +1,11 @@
 import threading
 import time
 
+from modules.audio_capture import get_audio_capture, CaptureSource
+from modules.noise_floor import get_noise_floor_estimator
+from modules.endpointer import Endpointer
+from modules.recognition import build_recognition_race
+
 class SpeechRecognizer:
     """Handles speech recognition functionality"""
     
@@ -16,9 +21,19 @@ class SpeechRecognizer:
             self.microphone = sr.Microphone()
             self.sr_available = True
             
-            # Adjust for ambient noise
-            with self.microphone as source:
-                self.recognizer.adjust_for_ambient_noise(source)
+            # Keep the microphone open in the background
+            self.capture = get_audio_capture(self.microphone)
+            
+            # Follow the ambient noise level in the background
+            noise_floor = get_noise_floor_estimator(self.capture)
+            noise_floor.attach(self.recognizer)
+            
+            # End each phrase as soon as it is complete
+            self.endpointer = Endpointer(self.capture.rate)
+            noise_floor.attach(self.endpointer)
+            
+            # Run Google and the offline recognizer at once
+            self.recognition = build_recognition_race(self.recognizer)
                 
         except ImportError:
             print("Speech recognition library not available.")
@@ -46,23 +61,25 @@ class SpeechRecognizer:
         """Continuously listen for speech"""
         import speech_recognition as sr
         
+        # One source for the whole loop: what is said while a phrase is being
+        # recognized waits in the capture buffer instead of being lost
+        source = CaptureSource(self.capture)
         while self.is_listening:
             try:
-                with self.microphone as source:
-                    print("Listening...")
-                    audio = self.recognizer.listen(source, timeout=5, phrase_time_limit=5)
+                print("Listening...")
+                frames = self.endpointer.capture(source, timeout=5)
+                if frames is None:
+                    continue
+                audio = sr.AudioData(frames, source.SAMPLE_RATE, source.SAMPLE_WIDTH)
                 
-                try:
-                    text = self.recognizer.recognize_google(audio)
-                    print(f"Recognized: {text}")
-                    
-                    # Call the callback with recognized text
-                    self.recognition_callback(text)
-                    
-                except sr.UnknownValueError:
+                result = self.recognition.recognize(audio)
+                if result is None:
                     print("Speech not recognized")
-                except sr.RequestError as e:
-                    print(f"Could not request results; {e}")
+                    continue
+                print(f"Recognized: {result.text}")
+                
+                # Call the callback with recognized text
+                self.recognition_callback(result.text)
                     
             except Exception as e:
                 print(f"Error in speech recognition: {e}")
@@ -0,0 +1,164 @@
+import os
+import json
+import time
+
+from modules.recognition import RecognizerBackend, RecognitionResult, StandInBackend
+
+try:
+    import vosk
+    VOSK_AVAILABLE = True
+except ImportError:
+    VOSK_AVAILABLE = False
+
+VOSK_MODEL_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "vosk-model")
+
+
+class VoskSession:
+    """One utterance being transcribed by Vosk as its audio arrives"""
+
+    def __init__(self, recognizer):
+        """Initialize the session"""
+        self.recognizer = recognizer
+        self.recognizer.SetWords(True)
+        self.texts = []
+        self.confidences = []
+
+    def accept(self, frames):
+        """Feed 16-bit PCM frames; returns the transcript so far"""
+        if self.recognizer.AcceptWaveform(frames):
+            # Vosk ended a segment on a pause of its own
+            self._collect(json.loads(self.recognizer.Result()))
+            partial = ""
+        else:
+            partial = json.loads(self.recognizer.PartialResult()).get("partial", "")
+        return " ".join(self.texts + [partial]).strip()
+
+    def finish(self):
+        """Get the final (text, confidence), or None if nothing was said"""
+        self._collect(json.loads(self.recognizer.FinalResult()))
+        text = " ".join(self.texts).strip()
+        if not text:
+            return None
+        return text, sum(self.confidences) / len(self.confidences) if self.confidences else 1.0
+
+    def _collect(self, result):
+        """Keep the text and word confidences of a finished segment"""
+        if result.get("text"):
+            self.texts.append(result["text"])
+            self.confidences.extend(word["conf"] for word in result.get("result", []))
+
+
+class VoskBackend(RecognizerBackend):
+    """Vosk, an offline recognizer that transcribes while the audio arrives
+
+    stream(rate) starts a session for one utterance; also usable in a
+    RecognitionRace, where it transcribes a whole phrase at once.
+    """
+
+    name = "vosk"
+
+    def __init__(self, model_dir=VOSK_MODEL_DIR):
+        """Load the model (a directory unpacked from https://alphacephei.com/vosk/models)"""
+        vosk.SetLogLevel(-1)
+        self.model = vosk.Model(model_dir)
+
+    def stream(self, rate):
+        """Start transcribing an utterance of 16-bit mono audio at rate"""
+        return VoskSession(vosk.KaldiRecognizer(self.model, rate))
+
+    def recognize(self, audio):
+        """Transcribe speech_recognition AudioData"""
+        session = self.stream(audio.sample_rate)
+        session.accept(audio.get_raw_data(convert_width=2))
+        return session.finish()
+
+
+class StandInSession:
+    """A stand-in streaming session: reveals the transcript word by word as audio arrives"""
+
+    def __init__(self, backend, rate):
+        """Initialize the session"""
+        self.backend = backend
+        self.rate = rate
+        self.seconds = 0.0
+
+    def accept(self, frames):
+        """Count the audio; returns the words said so far"""
+        self.seconds += len(frames) / 2 / self.rate
+        words = self.backend.transcript.split()
+        return " ".join(words[:int(self.seconds * self.backend.words_per_second)])
+
+    def finish(self):
+        """Wait for the final delay, then return the whole transcript"""
+        time.sleep(self.backend.final_delay)
+        return (self.backend.transcript, self.backend.confidence) if self.backend.transcript else None
+
+
+class StandInStreamingBackend(StandInBackend):
+    """A local streaming recognizer with a fixed transcript, for tests and benchmarks
+
+    Partial transcripts grow by words_per_second of audio; the final one
+    comes final_delay seconds after the audio ends.
+    """
+
+    def __init__(self, name, transcript, confidence=0.9, delay=0.0, words_per_second=2.5, final_delay=0.05):
+        """Initialize the backend"""
+        super().__init__(name, transcript, confidence, delay)
+        self.words_per_second = words_per_second
+        self.final_delay = final_delay
+
+    def stream(self, rate):
+        """Start a stand-in session"""
+        return StandInSession(self, rate)
+
+
+class StreamingTranscriber:
+    """Transcribe an utterance while it is captured, passing on each new partial transcript
+
+    feed() goes to Endpointer.capture(on_audio=...), on_partial(text) is
+    called whenever the transcript so far changes, e.g. to start parsing
+    it, and finish() returns the RecognitionResult once capture ended.
+    """
+
+    def __init__(self, backend, rate, on_partial=None):
+        """Start a session on backend"""
+        self.backend = backend
+        self.session = backend.stream(rate)
+        self.on_partial = on_partial
+        self.partial = ""
+        self.partials = 0
+        self.started = time.perf_counter()
+
+    def feed(self, frames):
+        """Feed captured frames"""
+        partial = self.session.accept(frames)
+        if partial and partial != self.partial:
+            self.partial = partial
+            self.partials += 1
+            if self.on_partial:
+                try:
+                    self.on_partial(partial)
+                except Exception as e:
+                    print(f"Error handling partial transcript: {e}")
+
+    def finish(self):
+        """Get the final RecognitionResult, or None if nothing was understood"""
+        answer = self.session.finish()
+        if not answer:
+            return None
+        text, confidence = answer
+        return RecognitionResult(text, confidence, self.backend.name, time.perf_counter() - self.started)
+
+
+def build_streaming_backend(model_dir=VOSK_MODEL_DIR):
+    """Get a VoskBackend, or None when Vosk or its model isn't installed"""
+    if not VOSK_AVAILABLE:
+        return None
+    if not os.path.isdir(model_dir):
+        print(f"No Vosk model in {model_dir}, transcribing phrases after they end")
+        return None
+    try:
+        return VoskBackend(model_dir)
+    except Exception as e:
+        print(f"Error loading the Vosk model: {e}")
+        return None
@@ -0,0 +1,202 @@
+import os
+import json
+import time
+import threading
+
+from modules.response_queue import REPLY
+from modules.user_preferences import UserPreferences
+from utils.benchmark import percentile
+
+
+def read_utterances(path):
+    """Read utterances from a transcript file
+
+    A .jsonl file has one JSON object per line with the utterance under
+    "text" (or "utterance" or "transcript"); any other file has one
+    utterance per line. Blank lines are skipped.
+    """
+    jsonl = os.path.splitext(path)[1].lower() in (".jsonl", ".ndjson")
+    utterances = []
+    with open(path, encoding="utf-8") as file:
+        for number, line in enumerate(file, 1):
+            line = line.strip()
+            if not line:
+                continue
+            if not jsonl:
+                utterances.append(line)
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                print(f"Skipping line {number} of {path}: not JSON")
+                continue
+            text = record.get("text") or record.get("utterance") or record.get("transcript")
+            if text:
+                utterances.append(text)
+    return utterances
+
+
+class StandInKeys:
+    """An API key store without keys, so commands answer without calling a service"""
+
+    def get_api_key(self, service):
+        """Get no key"""
+        return None
+
+
+class StandInTranslator:
+    """A translator that leaves text as it is, without a network"""
+
+    def detect_language(self, text):
+        """Take all text for English"""
+        return "en"
+
+    def translate(self, text, target_language="en", source_language=None):
+        """Return the text unchanged"""
+        return text
+
+    def get_supported_languages(self):
+        """Support English only"""
+        return {"en": "English"}
+
+
+def build_replay_assistant(directory):
+    """Get a VoiceAssistant to replay transcripts through
+
+    It runs with a copy of the user's preferences kept in directory, so
+    replayed commands don't count as the user's, with speech input and
+    output off, and with local stand-ins for the network services.
+    """
+    from modules.voice_assistant import VoiceAssistant
+
+    preferences = UserPreferences(os.path.join(directory, "preferences.json"))
+    preferences.preferences.update(UserPreferences().preferences)
+    preferences.preferences.update(use_tts=False, use_stt=False, startup_greeting=False, watch_intents=False)
+    preferences.save_preferences()
+
+    assistant = VoiceAssistant(preferences)
+    assistant.api_key_manager = StandInKeys()
+    assistant.translator = StandInTranslator()
+    return assistant
+
+
+class ReplayTurn:
+    """One replayed utterance"""
+
+    def __init__(self, text, due):
+        """Initialize the turn"""
+        self.text = text
+        self.due = due
+        self.intent = None
+        self.dispatched = False
+        self.answered = None
+
+
+class TranscriptReplay:
+    """Push utterances through VoiceAssistant.process_input and time each one
+
+    Utterances go in one after the other as fast as possible, or at rate
+    per second. A turn's latency runs from when it was due to its first
+    response, so at a rate above capacity the time spent waiting behind
+    earlier turns counts too; commands that run on the command runner's
+    workers answer when they finish. Responses are only recorded, not
+    queued to be spoken.
+    """
+
+    def __init__(self, assistant, rate=None, timeout=10.0):
+        """Initialize the replay"""
+        self.assistant = assistant
+        self.rate = rate
+        self.timeout = timeout
+        self.lock = threading.Condition()
+        self.turns = []
+        self.current = None
+        self.started = None
+        self.finished = None
+
+    def run(self, utterances):
+        """Replay utterances; returns stats()"""
+        assistant = self.assistant
+        respond, dispatch = assistant.respond, assistant.executor.dispatch_command
+        assistant.respond = self._respond
+        assistant.executor.dispatch_command = self._dispatch(dispatch)
+        try:
+            self.started = time.perf_counter()
+            for i, text in enumerate(utterances):
+                due = self.started + i / self.rate if self.rate else time.perf_counter()
+                delay = due - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+
+                turn = ReplayTurn(text, due)
+                self.turns.append(turn)
+                self.current = turn
+                run = assistant.process_input(text)
+                self.current = None
+                turn.intent = self._intent(run)
+                with self.lock:
+                    if turn.answered is None and not turn.dispatched:
+                        turn.answered = time.perf_counter()
+
+            # Wait for the commands still running on workers
+            with self.lock:
+                self.lock.wait_for(lambda: all(turn.answered for turn in self.turns), self.timeout)
+            self.finished = time.perf_counter()
+        finally:
+            assistant.respond = respond
+            assistant.executor.dispatch_command = dispatch
+        return self.stats()
+
+    def _respond(self, response_text, priority=REPLY):
+        """Note the first response to the turn being processed"""
+        turn = self.current
+        if response_text and turn is not None:
+            self._answer(turn)
+
+    def _dispatch(self, dispatch):
+        """Wrap CommandExecutor.dispatch_command to note when a command of a turn answers"""
+        def dispatch_command(command, args, callback):
+            turn = self.current
+            if turn is None:
+                return dispatch(command, args, callback)
+            turn.dispatched = True
+            return dispatch(command, args, lambda response: self._answer(turn))
+        return dispatch_command
+
+    def _answer(self, turn):
+        """Mark a turn answered"""
+        with self.lock:
+            if turn.answered is None:
+                turn.answered = time.perf_counter()
+                self.lock.notify_all()
+
+    @staticmethod
+    def _intent(run):
+        """Get the name of what handled a pipeline run"""
+        if run is None:
+            return "empty"
+        if run.results.get("custom_pattern"):
+            return "custom pattern"
+        intent = run.results.get("intent")
+        return intent["intent"] if intent else "unknown"
+
+    def stats(self):
+        """Get the throughput and the latency percentiles in milliseconds, overall and per intent"""
+        answered = [turn for turn in self.turns if turn.answered]
+        elapsed = (self.finished or time.perf_counter()) - self.started if self.started else 0.0
+        by_intent = {}
+        for turn in answered:
+            by_intent.setdefault(turn.intent, []).append((turn.answered - turn.due) * 1000)
+
+        def summary(latencies):
+            return {"count": len(latencies), "p50_ms": percentile(latencies, 50),
+                    "p95_ms": percentile(latencies, 95), "p99_ms": percentile(latencies, 99)}
+
+        return {
+            "utterances": len(self.turns),
+            "answered": len(answered),
+            "seconds": elapsed,
+            "per_second": len(answered) / elapsed if elapsed else 0.0,
+            "all": summary([latency for latencies in by_intent.values() for latency in latencies]),
+            "intents": {intent: summary(latencies) for intent, latencies in sorted(by_intent.items())}
+        }
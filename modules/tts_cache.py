@@ -0,0 +1,175 @@
+import os
+import json
+import wave
+import shutil
+import hashlib
+import threading
+from collections import OrderedDict
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def compact_wav(source, target, max_rate=16000):
+    """Copy a WAV file as 16-bit mono audio at no more than max_rate Hz
+
+    Files that can't be converted (no NumPy, or not a PCM WAV file such as
+    the AIFF written on macOS) are copied as they are.
+    """
+    try:
+        with wave.open(source, 'rb') as wav:
+            channels, width, rate = wav.getnchannels(), wav.getsampwidth(), wav.getframerate()
+            frames = wav.readframes(wav.getnframes())
+    except (wave.Error, EOFError):
+        shutil.copyfile(source, target)
+        return
+
+    dtypes = {1: np.uint8, 2: np.int16, 4: np.int32} if NUMPY_AVAILABLE else {}
+    if (channels == 1 and width == 2 and rate <= max_rate) or width not in dtypes:
+        shutil.copyfile(source, target)
+        return
+
+    # Convert to float samples on the 16-bit scale and mix down to mono
+    samples = np.frombuffer(frames, dtype=dtypes[width]).astype(np.float32)
+    if width == 1:
+        samples = (samples - 128) * 256
+    elif width == 4:
+        samples /= 65536
+    samples = samples.reshape(-1, channels).mean(axis=1)
+
+    if rate > max_rate and len(samples) > 1:
+        count = max(1, int(len(samples) * max_rate / rate))
+        samples = np.interp(np.linspace(0, len(samples) - 1, count), np.arange(len(samples)), samples)
+        rate = max_rate
+
+    with wave.open(target, 'wb') as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(rate)
+        wav.writeframes(np.clip(samples, -32768, 32767).astype('<i2').tobytes())
+
+
+class TTSCache:
+    """Synthesized speech stored on disk for text that is spoken again
+
+    Entries are keyed by a hash of the text, voice id, rate and volume, and
+    stored as compact WAV files. When the files exceed max_bytes the least
+    recently used ones are removed; the file modification time records use,
+    so the order survives restarts.
+    """
+
+    def __init__(self, directory=None, max_bytes=50 * 1024 * 1024):
+        """Initialize the cache from the files already in its directory"""
+        self.directory = directory or os.path.join(BASE_DIR, 'data', 'tts_cache')
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()  # key -> file size, least recently used first
+        self.total_bytes = 0
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+        os.makedirs(self.directory, exist_ok=True)
+        files = []
+        for name in os.listdir(self.directory):
+            if name.endswith(".wav"):
+                stat = os.stat(os.path.join(self.directory, name))
+                files.append((stat.st_mtime, name[:-4], stat.st_size))
+        for _, key, size in sorted(files):
+            self.entries[key] = size
+            self.total_bytes += size
+
+    @staticmethod
+    def key(text, voice):
+        """Hash the text and the (voice id, rate, volume) it is spoken with"""
+        return hashlib.sha1(json.dumps([text, list(voice)]).encode("utf-8")).hexdigest()
+
+    def _path(self, key):
+        """Get the file of an entry"""
+        return os.path.join(self.directory, key + ".wav")
+
+    def contains(self, text, voice):
+        """Check whether speech for text is cached, without counting a hit"""
+        with self.lock:
+            return self.key(text, voice) in self.entries
+
+    def get(self, text, voice):
+        """Get the cached audio file for text, or None"""
+        key = self.key(text, voice)
+        with self.lock:
+            if key not in self.entries:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+
+        path = self._path(key)
+        try:
+            os.utime(path)
+        except OSError:
+            # Removed behind our back
+            with self.lock:
+                self.total_bytes -= self.entries.pop(key, 0)
+            return None
+        return path
+
+    def put(self, text, voice, rendered_path):
+        """Store rendered audio for text; moves it into the cache and returns the cached file"""
+        key = self.key(text, voice)
+        path = self._path(key)
+        temp_path = f"{path}.{threading.get_ident()}.tmp"
+
+        compact_wav(rendered_path, temp_path)
+        os.replace(temp_path, path)
+        try:
+            os.remove(rendered_path)
+        except OSError:
+            pass
+
+        size = os.path.getsize(path)
+        with self.lock:
+            self.total_bytes += size - self.entries.pop(key, 0)
+            self.entries[key] = size
+            self._evict(keep=key)
+        return path
+
+    def _evict(self, keep):
+        """Remove least recently used entries until the cache fits (called with the lock held)"""
+        for key in list(self.entries):
+            if self.total_bytes <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            self.total_bytes -= self.entries.pop(key)
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+
+    def clear(self):
+        """Remove all cached audio"""
+        with self.lock:
+            for key in self.entries:
+                try:
+                    os.remove(self._path(key))
+                except OSError:
+                    pass
+            self.entries.clear()
+            self.total_bytes = 0
+
+    def stats(self):
+        """Get cache statistics"""
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self.entries),
+                "bytes": self.total_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0
+            }
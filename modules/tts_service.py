@@ -0,0 +1,78 @@
+import threading
+
+from modules.speech_pipeline import SpeechPipeline, Pyttsx3Renderer
+
+try:
+    import pyttsx3
+    TTS_AVAILABLE = True
+except ImportError:
+    TTS_AVAILABLE = False
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def _settings(rate, volume, voice):
+    """Get the engine properties a request sets"""
+    settings = {'rate': rate, 'volume': volume, 'voice': voice}
+    return {name: value for name, value in settings.items() if value is not None}
+
+
+class TTSService:
+    """The one text-to-speech engine of the process, behind a queue
+
+    pyttsx3 engines can't be shared between threads and each one picks its
+    voice on startup, so a single engine lives on the synthesis thread of a
+    SpeechPipeline and everything that speaks submits to it. Callers pass
+    their own rate, volume and voice with each request instead of
+    configuring an engine of their own.
+    """
+
+    def __init__(self, cache=None, stream=True):
+        """Initialize the service and start its engine thread
+
+        With stream off sentences are spoken directly by the engine instead
+        of being rendered to files and played.
+        """
+        self.pipeline = SpeechPipeline(Pyttsx3Renderer(), player=None if stream else False, cache=cache)
+
+    @property
+    def cache(self):
+        """The speech cache in use, or None"""
+        return self.pipeline.cache
+
+    def speak(self, text, wait=True, rate=None, volume=None, voice=None):
+        """Queue text to be spoken; returns its SpeechJob"""
+        return self.pipeline.speak(text, wait=wait, settings=_settings(rate, volume, voice))
+
+    def cancel(self, job):
+        """Stop one request, skipping what hasn't been spoken yet"""
+        if job:
+            self.pipeline.cancel(job)
+
+    def stop(self):
+        """Stop all requests"""
+        self.pipeline.stop()
+
+    def prewarm(self, texts, rate=None, volume=None, voice=None):
+        """Render texts into the speech cache; returns how many sentences were rendered"""
+        return self.pipeline.prewarm(texts, settings=_settings(rate, volume, voice))
+
+    def stats(self):
+        """Get speech statistics"""
+        return self.pipeline.stats()
+
+
+def get_tts_service(cache=None, stream=True):
+    """Get the shared TTSService, creating it on first use; None without pyttsx3
+
+    The cache and stream options only apply to the call that creates it.
+    """
+    global _service
+    if not TTS_AVAILABLE:
+        return None
+
+    with _service_lock:
+        if _service is None:
+            _service = TTSService(cache=cache, stream=stream)
+        return _service
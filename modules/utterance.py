@@ -0,0 +1,45 @@
+import re
+
+# Word tokens, using the same definition of a word character as the \b anchors
+WORD_RE = re.compile(r"\w+")
+
+
+def tokenize(text):
+    """Split text into (word, start, end) tuples"""
+    return [(match.group(), match.start(), match.end()) for match in WORD_RE.finditer(text)]
+
+
+class Utterance:
+    """One user utterance with the string work every parser needs done once
+
+    Holds the original text, its lowercase form, the (word, start, end)
+    tokens of the lowercase form, the set of words, the number spans and the
+    whitespace-normalized form used as the parse cache key. The NLP
+    processor, command executor and command processor accept an Utterance
+    anywhere they accept a string.
+    """
+
+    def __init__(self, text):
+        """Analyze the text"""
+        self.text = text or ""
+        self.lower = self.text.lower()
+        self.normalized = " ".join(self.lower.split())
+        self.tokens = tokenize(self.lower)
+        self.words = [word for word, _, _ in self.tokens]
+        self.word_set = set(self.words)
+        self.numbers = [(int(word), start, end) for word, start, end in self.tokens if word.isdecimal()]
+
+        # Lowercasing a few characters changes the length of the text, and
+        # with it the offsets of the tokens
+        self.aligned = len(self.lower) == len(self.text)
+
+    def __str__(self):
+        return self.text
+
+    def __bool__(self):
+        return bool(self.text)
+
+
+def as_utterance(text):
+    """Get an Utterance for a string, or the Utterance itself"""
+    return text if isinstance(text, Utterance) else Utterance(text)
@@ -3,7 +3,6 @@ import sys
 import time
 import datetime
 import threading
-import queue
 import json
 import re
 import random
@@ -14,14 +13,22 @@ from modules.user_preferences import UserPreferences
 from modules.nlp_processor import NLPProcessor
 from modules.language_translator import LanguageTranslator
 from modules.api_key_manager import ApiKeyManager
+from modules.parse_cache import ParseCache, normalize_utterance
+from modules.utterance import Utterance, as_utterance
+from modules.routing_cache import RoutingCache
+from modules.pipeline import Pipeline
+from modules.response_queue import ResponseQueue, REPLY, CHATTER
+from modules.tts_cache import TTSCache
+from modules.tts_service import get_tts_service, TTS_AVAILABLE
+from modules.audio_capture import get_audio_capture, CaptureSource
+from modules.noise_floor import get_noise_floor_estimator
+from modules.endpointer import Endpointer
+from modules.recognition import build_recognition_race
+from modules.streaming_recognition import StreamingTranscriber, build_streaming_backend, VOSK_MODEL_DIR
 
 # Text-to-speech and speech-to-text modules
-try:
-    import pyttsx3
-    TTS_AVAILABLE = True
-except ImportError:
+if not TTS_AVAILABLE:
     print("pyttsx3 not available, text-to-speech will be disabled")
-    TTS_AVAILABLE = False
 
 try:
     import speech_recognition as sr
@@ -33,11 +40,15 @@ except ImportError:
 class VoiceAssistant:
     """Main voice assistant class that integrates all components"""
     
-    def __init__(self):
+    def __init__(self, preferences=None):
+        """Initialize the assistant; preferences replaces the user's UserPreferences, e.g. in benchmarks"""
         # Initialize components
         self.api_key_manager = ApiKeyManager()
-        self.preferences = UserPreferences()
-        self.nlp = NLPProcessor()
+        self.preferences = preferences or UserPreferences()
+        
+        # Load prebuilt routing tables instead of compiling them when up to date
+        self.routing_cache = RoutingCache() if self.preferences.get_preference("use_routing_cache", True) else None
+        self.nlp = NLPProcessor(routing_cache=self.routing_cache)
         self.translator = LanguageTranslator(self.api_key_manager)
         
         # Load assistant name from preferences
@@ -47,12 +58,32 @@ class VoiceAssistant:
         # Initialize command executor with reference to self
         self.executor = CommandExecutor(self)
         
+        # Cache parses of repeated utterances until the intents are recompiled
+        self.parse_cache = ParseCache(self.preferences.get_preference("parse_cache_size", 512))
+        self.nlp.add_reload_listener(self.parse_cache.clear)
+        
+        # Intents guessed by similarity only run a command when this close
+        self.similarity_command_confidence = self.preferences.get_preference("similarity_command_confidence", 0.8)
+        
+        # Process input in stages that only run when a later stage needs them
+        self.pipeline = Pipeline({
+            "lookup": self._stage_lookup,
+            "custom_pattern": self._stage_custom_pattern,
+            "intent": self._stage_intent,
+            "entities": self._stage_entities,
+            "command": self._stage_command,
+            "execute": self._stage_execute
+        })
+        
         # Set up TTS and STT if available
         self._setup_tts()
         self._setup_stt()
         
-        # Create response queue for async responses
-        self.response_queue = queue.Queue()
+        # Create response queue for async responses; alerts cut short less urgent speech
+        self.response_queue = ResponseQueue(
+            maxsize=self.preferences.get_preference("response_queue_size", 20),
+            on_preempt=self._preempt_response
+        )
         self.response_thread = None
         self.running = True
         
@@ -62,25 +93,17 @@ class VoiceAssistant:
     def _setup_tts(self):
         """Set up Text-to-Speech"""
         self.tts_enabled = self.preferences.get_preference("use_tts", True) and TTS_AVAILABLE
-        self.tts_engine = None
+        self.tts = None
         
         if self.tts_enabled:
             try:
-                self.tts_engine = pyttsx3.init()
-                # Configure voice properties
-                self.tts_engine.setProperty('rate', self.preferences.get_preference("voice_rate", 175))
-                self.tts_engine.setProperty('volume', self.preferences.get_preference("voice_volume", 0.9))
+                # Replay recurring responses from disk instead of synthesizing them again
+                cache = None
+                if self.preferences.get_preference("tts_cache", True):
+                    cache = TTSCache(max_bytes=self.preferences.get_preference("tts_cache_mb", 50) * 1024 * 1024)
                 
-                # Try to set a female voice if available
-                voices = self.tts_engine.getProperty('voices')
-                female_voice = None
-                for voice in voices:
-                    if "female" in voice.name.lower():
-                        female_voice = voice.id
-                        break
-                
-                if female_voice:
-                    self.tts_engine.setProperty('voice', female_voice)
+                # Start speaking long responses after their first sentence is synthesized
+                self.tts = get_tts_service(cache=cache, stream=self.preferences.get_preference("stream_tts", True))
             except Exception as e:
                 print(f"Error initializing TTS engine: {e}")
                 self.tts_enabled = False
@@ -89,12 +112,28 @@ class VoiceAssistant:
         """Set up Speech-to-Text"""
         self.stt_enabled = self.preferences.get_preference("use_stt", True) and STT_AVAILABLE
         self.recognizer = None
+        self.microphone = None  # the system microphone, unless replaced before the first listen()
+        self.capture = None  # opened on the first listen()
+        self.endpointer = None
+        self.recognition = None
+        self.streaming = None
+        self.speculation = {"partials": 0, "finals": 0, "parsed_ahead": 0}
+        self.speculative = None  # the parse of the latest partial transcript
         
         if self.stt_enabled:
             try:
                 self.recognizer = sr.Recognizer()
-                # Adjust for ambient noise
-                self.recognizer.dynamic_energy_threshold = True
+                # Run the configured recognizers at once and take the first confident answer
+                self.recognition = build_recognition_race(
+                    self.recognizer,
+                    self.preferences.get_preference("recognizers", ["google", "sphinx"]),
+                    min_confidence=self.preferences.get_preference("recognition_confidence", 0.6),
+                    deadline=self.preferences.get_preference("recognition_deadline", 4.0),
+                    patience=self.preferences.get_preference("recognition_patience", 1.0)
+                )
+                # Transcribe while the user speaks, so parsing starts before they finish
+                if self.preferences.get_preference("streaming_stt", True):
+                    self.streaming = build_streaming_backend(self.preferences.get_preference("vosk_model", VOSK_MODEL_DIR))
             except Exception as e:
                 print(f"Error initializing STT: {e}")
                 self.stt_enabled = False
@@ -106,136 +145,331 @@ class VoiceAssistant:
         self.response_thread.daemon = True
         self.response_thread.start()
         
+        # Pick up changes to intents.json without a restart
+        if self.preferences.get_preference("watch_intents", True):
+            self.nlp.start_watching()
+        
         # Greet the user
         if self.preferences.get_preference("startup_greeting", True):
-            self.respond(self.startup_message)
+            self.respond(self.startup_message, CHATTER)
     
     def stop(self):
         """Stop the voice assistant"""
         self.running = False
+        self.nlp.stop_watching()
+        self.executor.runner.shutdown()
+        if self.tts:
+            self.tts.stop()
+        if self.recognition:
+            self.recognition.shutdown()
         if self.response_thread and self.response_thread.is_alive():
-            self.response_queue.put(None)  # Signal to stop the thread
+            self.response_queue.close()  # Signal to stop the thread
             self.response_thread.join(timeout=1.0)
     
     def speak(self, text):
         """Convert text to speech"""
-        if self.tts_enabled and self.tts_engine:
+        if self.tts_enabled and self.tts:
             try:
-                self.tts_engine.say(text)
-                self.tts_engine.runAndWait()
+                self.tts.speak(text, wait=True, **self._voice_settings())
                 return True
             except Exception as e:
                 print(f"TTS error: {e}")
                 return False
         return False
 
-    def listen(self, timeout=5):
-        """Listen for user input via microphone"""
+    def _voice_settings(self):
+        """Get the rate and volume the user chose for the voice"""
+        return {
+            "rate": self.preferences.get_preference("voice_rate", 175),
+            "volume": self.preferences.get_preference("voice_volume", 0.9)
+        }
+
+    def prewarm_speech(self):
+        """Render the fixed responses into the speech cache; returns how many sentences were rendered"""
+        if not self.tts or not self.tts.cache:
+            return 0
+        
+        texts = [
+            self.startup_message,
+            "Hello! How can I help you today?",
+            "Goodbye! Have a nice day.",
+            "You're welcome! Is there anything else I can help you with?",
+            "I'm not sure how to help with that. Can you be more specific?",
+            "Still working on that, give me a moment.",
+            "I'm listening",
+            "Entering standby mode",
+            self.executor.execute_command('help', None),
+            self.executor._respond_with_name(),
+            self.executor._respond_with_identity()
+        ]
+        for intent in self.nlp.compiled.intents["intents"]:
+            texts.extend(intent.get("responses", []))
+        
+        return self.tts.prewarm(texts, **self._voice_settings())
+
+    def open_microphone(self):
+        """Start capturing the microphone; listen() does this the first time it is called"""
+        self.capture = get_audio_capture(self.microphone)
+        # Follow the ambient noise level in the background, and end phrases as soon as they are complete
+        self.endpointer = Endpointer(self.capture.rate)
+        noise_floor = get_noise_floor_estimator(self.capture)
+        noise_floor.attach(self.recognizer)
+        noise_floor.attach(self.endpointer)
+        return self.capture
+
+    def listen(self, timeout=5, start=None):
+        """Listen for user input via microphone
+        
+        start is the capture position to listen from, e.g. where a wake
+        word ended; by default listening starts pre_roll_ms in the past.
+        """
         if not self.stt_enabled or not self.recognizer:
             return None
             
-        with sr.Microphone() as source:
+        # Keep the microphone open between turns, and hear what was said just before listening
+        if self.capture is None:
+            self.open_microphone()
+        with CaptureSource(self.capture, pre_roll_ms=self.preferences.get_preference("pre_roll_ms", 500), start=start) as source:
             print("Listening...")
             try:
-                audio = self.recognizer.listen(source, timeout=timeout)
+                # Transcribe while the phrase is captured, parsing each partial transcript
+                transcriber = None
+                if self.streaming:
+                    transcriber = StreamingTranscriber(self.streaming, source.SAMPLE_RATE, on_partial=self.process_partial)
+                frames = self.endpointer.capture(source, timeout=timeout, on_audio=transcriber.feed if transcriber else None)
+                if frames is None:
+                    print("Listen timeout")
+                    return None
                 print("Processing speech...")
                 
-                # Attempt to recognize speech
-                text = self.recognizer.recognize_google(audio)
-                print(f"Recognized: {text}")
-                return text
-            except sr.WaitTimeoutError:
-                print("Listen timeout")
-                return None
-            except sr.UnknownValueError:
-                print("Could not understand audio")
-                return None
-            except sr.RequestError as e:
-                print(f"Speech recognition error: {e}")
-                return None
+                result = transcriber.finish() if transcriber else None
+                # Vosk's own word confidence has to pass the same bar as the race
+                if result is not None and result.confidence < self.recognition.min_confidence:
+                    print(f"Low confidence transcript ({result.confidence:.2f}): {result.text}")
+                    result = None
+                if transcriber and result:
+                    self.speculation["finals"] += 1
+                    if normalize_utterance(result.text) == normalize_utterance(transcriber.partial):
+                        self.speculation["parsed_ahead"] += 1
+                
+                # Attempt to recognize the whole phrase
+                if result is None:
+                    audio = sr.AudioData(frames, source.SAMPLE_RATE, source.SAMPLE_WIDTH)
+                    result = self.recognition.recognize(audio)
+                if result is None:
+                    print("Could not understand audio")
+                    return None
+                print(f"Recognized ({result.backend}): {result.text}")
+                return result.text
             except Exception as e:
                 print(f"Error in speech recognition: {e}")
                 return None
 
-    def respond(self, response_text):
-        """Queue a response to be processed"""
+    def respond(self, response_text, priority=REPLY):
+        """Queue a response to be processed
+        
+        priority is the message class: "alert" for reminders and timers,
+        "reply" for answers and "chatter" for greetings and progress notes.
+        """
         if not response_text:
             return
             
         # Queue the response
-        self.response_queue.put(response_text)
+        self.response_queue.put(response_text, priority)
     
     def _process_responses(self):
-        """Process responses from the queue"""
+        """Process responses from the queue, most urgent first"""
         while self.running:
-            try:
-                response = self.response_queue.get(timeout=1.0)
-                if response is None:
+            response = self.response_queue.get(timeout=1.0)
+            if response is None:
+                if self.response_queue.closed:
                     break
-                    
+                continue
+                
+            try:
                 # Print the response
-                print(f"{self.name}: {response}")
+                print(f"{self.name}: {response.text}")
                 
                 # Speak the response if TTS is enabled
                 if not self.preferences.is_quiet_hours():
-                    self.speak(response)
+                    self._speak_response(response)
                     
                 # Track interaction
                 self.preferences.track_daily_activity()
-                    
-                # Mark the task as done
-                self.response_queue.task_done()
-            except queue.Empty:
-                pass
             except Exception as e:
                 print(f"Error processing response: {e}")
+            finally:
+                self.response_queue.done(response)
+    
+    def _speak_response(self, response):
+        """Speak a response until it ends or a more urgent one preempts it"""
+        if not self.tts_enabled or not self.tts:
+            return
+        try:
+            response.job = self.tts.speak(response.text, wait=False, **self._voice_settings())
+            if response.preempted:
+                self.tts.cancel(response.job)
+            response.job.done.wait()
+        except Exception as e:
+            print(f"TTS error: {e}")
+    
+    def _preempt_response(self, response):
+        """Stop speaking a response that a more urgent one preempted"""
+        if response.job and self.tts:
+            self.tts.cancel(response.job)
 
-    def process_input(self, user_input):
-        """Process user input and generate a response"""
+    def process_input(self, user_input, respond=None, preferences=None):
+        """Process user input and generate a response; returns the PipelineRun of the input
+        
+        respond and preferences replace the assistant's own for this input,
+        e.g. to answer one session of a server that shares the assistant.
+        """
         if not user_input:
-            return
+            return None
             
         # Print user input
         print(f"User: {user_input}")
         
-        # Extract intent and entities
-        intent = self.nlp.extract_intent(user_input)
-        entities = self.nlp.extract_entities(user_input)
+        # Run the stages the response needs, skipping the rest
+        run = self.pipeline.start(Utterance(user_input))
+        run.respond = respond or self.respond
+        # Commands answer later notices and alerts to the same caller
+        self.executor.set_caller(respond, preferences)
+        try:
+            response = run.get("execute")
+        finally:
+            self.executor.set_caller()
+        self.pipeline.finish(run)
+        run.respond(response)
+                
+        # Track command usage
+        intent = run.results.get("intent")
+        if intent and intent['intent'] != 'unknown':
+            (preferences or self.preferences).track_command_usage(intent['intent'])
+        return run
+    
+    def process_partial(self, partial):
+        """Parse a partial transcript while the user is still speaking
         
-        # Check for custom patterns first
-        custom_response = self.executor.handle_custom_pattern(user_input)
-        if custom_response:
-            self.respond(custom_response)
-            return
+        Only the cached parse stages run and nothing is executed. The parse is kept
+        in a single slot rather than the parse cache, as most partials are
+        never heard again; when the final transcript is the same text,
+        process_input() takes it over and goes straight to executing it.
+        """
+        self.speculation["partials"] += 1
+        utterance = Utterance(partial)
+        compiled = self.nlp.compiled
+        speculative = self.speculative
+        if speculative is None or speculative["key"] != utterance.normalized or speculative["compiled"] is not compiled:
+            speculative = {"key": utterance.normalized, "parsed": {}, "compiled": compiled}
+            self.speculative = speculative
+        
+        run = self.pipeline.start(utterance)
+        run.results["lookup"] = speculative
+        for stage in ("custom_pattern", "intent"):
+            run.get(stage)
+    
+    def get_pipeline_stats(self):
+        """Get the wall time statistics of every process_input stage"""
+        return self.pipeline.stats()
             
+    def _stage_lookup(self, run):
+        """Find the cached parse of the normalized utterance"""
+        # Use one set of compiled tables even if intents are reloaded meanwhile
+        compiled = self.nlp.compiled
+        key = run.utterance.normalized
+        parsed = self.parse_cache.get(key)
+        
+        if parsed is None:
+            # Take over the parse of the latest partial transcript if it is this text
+            speculative = self.speculative
+            if speculative and speculative["key"] == key and speculative["compiled"] is compiled:
+                parsed = speculative["parsed"]
+            else:
+                parsed = {}
+            self.parse_cache.put(key, parsed)
+        
+        return {"key": key, "parsed": parsed, "compiled": compiled}
+    
+    def _cached_parse(self, run, name, parse):
+        """Get one part of the parse from the parse cache, or parse and cache it"""
+        lookup = run.get("lookup")
+        parsed = lookup["parsed"]
+        
+        if name not in parsed:
+            # The utterance is analyzed once; its normalized form is only the key
+            parsed[name] = parse(lookup["compiled"], run.utterance)
+            
+            # Drop the entry if the intents were swapped while parsing
+            if self.nlp.compiled is not lookup["compiled"]:
+                self.parse_cache.discard(lookup["key"])
+        
+        return parsed[name]
+    
+    def _stage_custom_pattern(self, run):
+        """Find the custom pattern that matches the utterance"""
+        return self._cached_parse(run, "custom_pattern", lambda compiled, utterance: self.executor.match_custom_pattern(utterance))
+    
+    def _stage_intent(self, run):
+        """Extract the intent of the utterance"""
+        return self._cached_parse(run, "intent", lambda compiled, utterance: compiled.extract_intent(utterance))
+    
+    def _stage_entities(self, run):
+        """Extract the entities of the utterance as it was said
+        
+        Entity values keep their case and their offsets point into the
+        input, so they aren't cached under the normalized form.
+        """
+        return run.get("lookup")["compiled"].extract_entities(run.utterance)
+    
+    def _stage_command(self, run):
+        """Determine the command and arguments for the utterance"""
+        # This is a simplified command parsing logic
+        # In a real implementation, this would be more sophisticated
+        intent = run.get("intent")
+        
+        # A similarity score is a cosine, not a pattern match; a weak one is
+        # treated as no intent so small talk doesn't run a command
+        if intent.get("source") == "similarity" and intent["confidence"] < self.similarity_command_confidence:
+            intent = {"intent": "unknown", "confidence": 0}
+        return self._extract_command(run.utterance, intent)
+    
+    def _stage_execute(self, run):
+        """Run the matching custom pattern or command and get the response"""
+        # Check for custom patterns first
+        pattern = run.get("custom_pattern")
+        if pattern:
+            custom_response = self.executor.run_custom_pattern(pattern)
+            if custom_response:
+                return custom_response
+        
         # Process commands based on intent
+        intent = run.get("intent")
         if intent['intent'] == 'greeting':
-            self.respond(f"Hello! How can I help you today?")
+            return "Hello! How can I help you today?"
         elif intent['intent'] == 'farewell':
-            self.respond("Goodbye! Have a nice day.")
+            return "Goodbye! Have a nice day."
         elif intent['intent'] == 'gratitude':
-            self.respond("You're welcome! Is there anything else I can help you with?")
+            return "You're welcome! Is there anything else I can help you with?"
         elif intent['intent'] == 'help':
-            help_text = self.executor.execute_command('help', None)
-            self.respond(help_text)
-        else:
-            # Try to determine command and arguments
-            # This is a simplified command parsing logic
-            # In a real implementation, this would be more sophisticated
-            command = self._extract_command(user_input, intent, entities)
-            if command:
-                cmd, args = command
-                result = self.executor.execute_command(cmd, args)
-                self.respond(result)
-            else:
-                self.respond("I'm not sure how to help with that. Can you be more specific?")
-                
-        # Track command usage
-        if intent['intent'] != 'unknown':
-            self.preferences.track_command_usage(intent['intent'])
+            return self.executor.execute_command('help', None)
+        
+        # Try to determine command and arguments
+        command = run.get("command")
+        if command:
+            cmd, args = command
             
-    def _extract_command(self, text, intent, entities):
-        """Extract command and arguments from text"""
+            # Slow commands respond from a worker thread when they finish
+            self.executor.dispatch_command(cmd, args, run.respond)
+            return None
+        return "I'm not sure how to help with that. Can you be more specific?"
+    
+    def _extract_command(self, text, intent, entities=None):
+        """Extract command and arguments from text or an Utterance"""
+        utterance = as_utterance(text)
+        text = utterance.text
+        lower = utterance.lower
+        
         # Map intents to commands
         intent_to_command = {
             'weather': ('weather', 'local'),
@@ -257,7 +491,7 @@ class VoiceAssistant:
             # For some commands, we need to parse the arguments
             if cmd == 'timer':
                 # Try to find a number followed by "minute(s)" or "second(s)"
-                match = re.search(r'(\d+)\s*(minute|minutes|min|second|seconds|sec)', text.lower())
+                match = re.search(r'(\d+)\s*(minute|minutes|min|second|seconds|sec)', lower)
                 if match:
                     amount = int(match.group(1))
                     unit = match.group(2)
@@ -268,7 +502,7 @@ class VoiceAssistant:
                 
             elif cmd == 'reminder':
                 # Try to parse "remind me to X in Y hours/minutes"
-                match = re.search(r'remind\s+me\s+to\s+(.+?)\s+in\s+(\d+)\s*(hour|hours|minute|minutes|min)', text.lower())
+                match = re.search(r'remind\s+me\s+to\s+(.+?)\s+in\s+(\d+)\s*(hour|hours|minute|minutes|min)', lower)
                 if match:
                     task = match.group(1)
                     amount = int(match.group(2))
@@ -279,35 +513,34 @@ class VoiceAssistant:
                     
             elif cmd == 'volume':
                 # Check for volume up/down/mute
-                if 'up' in text.lower() or 'increase' in text.lower():
+                if 'up' in lower or 'increase' in lower:
                     return (cmd, 'up')
-                elif 'down' in text.lower() or 'decrease' in text.lower() or 'lower' in text.lower():
+                elif 'down' in lower or 'decrease' in lower or 'lower' in lower:
                     return (cmd, 'down')
-                elif 'mute' in text.lower():
+                elif 'mute' in lower:
                     return (cmd, 'mute')
                     
             elif cmd == 'math':
                 # Try to extract a mathematical expression
                 # This is a simplified approach
-                expression = text.lower()
-                expression = expression.replace('calculate', '').replace('compute', '').replace('what is', '').strip()
+                expression = lower.replace('calculate', '').replace('compute', '').replace('what is', '').strip()
                 return (cmd, expression)
             
             # For commands with default arguments
             return (cmd, default_args)
             
         # If we can't map the intent directly, try some pattern matching
-        if 'open' in text.lower() and len(text.split()) >= 2:
-            app_name = text.lower().replace('open', '').strip()
+        if 'open' in lower and len(text.split()) >= 2:
+            app_name = lower.replace('open', '').strip()
             return ('app', app_name)
             
-        if 'search for' in text.lower():
-            query = text.lower().replace('search for', '').strip()
+        if 'search for' in lower:
+            query = lower.replace('search for', '').strip()
             return ('search', query)
             
-        if 'play' in text.lower():
-            content = text.lower().replace('play', '').strip()
-            if 'spotify' in text.lower():
+        if 'play' in lower:
+            content = lower.replace('play', '').strip()
+            if 'spotify' in lower:
                 content = content.replace('on spotify', '').strip()
                 return ('spotify', content)
             else:
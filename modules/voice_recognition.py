@@ -1,37 +1,62 @@
 import speech_recognition as sr
-import pyttsx3
 import os
 import time
 import numpy as np
 
+from modules.tts_cache import TTSCache
+from modules.tts_service import get_tts_service
+from modules.response_queue import ALERT, REPLY
+from modules.barge_in import BargeInMonitor
+from modules.wake_word import build_wake_word_detector, save_wav, trim_silence, TEMPLATE_DIR
+from modules.audio_capture import get_audio_capture, CaptureSource
+from modules.noise_floor import get_noise_floor_estimator
+from modules.endpointer import Endpointer
+from modules.recognition import build_recognition_race
+
 class VoiceRecognizer:
-    def __init__(self):
+    def __init__(self, microphone=None):
+        """Initialize the recognizer; microphone replaces the system one, e.g. a ReplayMicrophone"""
         self.recognizer = sr.Recognizer()
-        self.engine = pyttsx3.init()
-        
-        # Configure speech engine
-        voices = self.engine.getProperty('voices')
-        # Try to set a female voice if available
-        for voice in voices:
-            if "female" in voice.name.lower():
-                self.engine.setProperty('voice', voice.id)
-                break
-                
-        # Set speech rate and volume
-        self.engine.setProperty('rate', 175)  # Default is 200
-        self.engine.setProperty('volume', 0.9)  # Default is 1.0
-        
-        # Energy threshold for wake word detection - adjust based on environment
+        
+        # Speak through the shared speech engine, which synthesizes the next
+        # sentence while the current one plays
+        self.tts = get_tts_service(cache=TTSCache())
+        self.voice_rate = 175  # Default is 200
+        self.voice_volume = 0.9  # Default is 1.0
+        
+        # Energy threshold until the noise floor is measured
         self.recognizer.energy_threshold = 300  # Default is 300
-        self.recognizer.dynamic_energy_threshold = True
-        self.recognizer.dynamic_energy_adjustment_damping = 0.15
-        self.recognizer.dynamic_energy_ratio = 1.5
         
         # Wake words/phrases
         self.wake_words = ["natasha", "hey natasha", "ok natasha", "hi natasha"]
         
         # Microphone selection
-        self.microphone = self._get_best_microphone()
+        self.microphone = microphone or self._get_best_microphone()
+        
+        # Keep the microphone open; every listener reads from the capture buffer
+        self.capture = get_audio_capture(self.microphone)
+        self.pre_roll_ms = 500  # Audio kept from before listen() so the first syllable isn't clipped
+        self.wake_reader = None
+        self.command_start = None  # where a command said right after the wake word starts
+        
+        # Track the room's noise level in the background instead of calibrating every turn
+        self.noise_floor = get_noise_floor_estimator(self.capture)
+        self.noise_floor.attach(self.recognizer)
+        
+        # Spot the wake word locally; only commands go to the cloud
+        self.wake_word_detector = self._build_wake_word_detector()
+        
+        # End commands as soon as they are complete, at the speaker's own pace
+        self.endpointer = Endpointer(self.capture.rate, energy_threshold=self.recognizer.energy_threshold)
+        self.noise_floor.attach(self.endpointer)
+        
+        # Run the cloud and offline recognizers at once instead of one after the other
+        self.recognition = build_recognition_race(self.recognizer)
+        
+        # Keep listening while speaking so the user can interrupt
+        self.barge_in = BargeInMonitor(energy_threshold=self.recognizer.energy_threshold)
+        self.noise_floor.attach(self.barge_in)
+        self.barge_in_audio = None
         
     def _get_best_microphone(self):
         """Find the best microphone device or use default"""
@@ -56,75 +81,122 @@ class VoiceRecognizer:
             print(f"Error selecting microphone: {str(e)}")
             return sr.Microphone()
     
-    def listen_for_wake_word(self):
-        """Listen specifically for wake words with lower threshold"""
-        with self.microphone as source:
-            # Use a shorter timeout for wake word detection
-            self.recognizer.adjust_for_ambient_noise(source, duration=0.5)
-            try:
-                print("Listening for wake word...")
-                audio = self.recognizer.listen(source, timeout=1, phrase_time_limit=3)
-                try:
-                    text = self.recognizer.recognize_google(audio).lower()
-                    print(f"Heard: {text}")
-                    # Check if any wake word is in the detected text
-                    for wake_word in self.wake_words:
-                        if wake_word in text:
-                            return True
-                except:
-                    pass  # Ignore errors in wake word detection
-            except:
-                pass  # Timeout or other error
+    def _build_wake_word_detector(self):
+        """Create the wake word detector, reading from the capture buffer"""
+        return build_wake_word_detector(self.recognizer, self.wake_words, self.capture.rate, buffer=self.capture.buffer)
+    
+    def listen_for_wake_word(self, duration=3):
+        """Listen for a wake word for up to duration seconds
+        
+        Runs offline: an energy gate passes only word-length sounds to the
+        local wake word spotter, so ambient sound never reaches the cloud.
+        """
+        # What was said over a response is only kept for the next command
+        self.barge_in_audio = None
+        
+        # Keep reading where the last call stopped, so no audio falls between calls
+        if self.wake_reader is None:
+            self.wake_reader = self.capture.reader()
+            self.wake_word_detector.reset()
+            
+        print("Listening for wake word...")
+        deadline = time.time() + duration
+        while time.time() < deadline and self.capture.running:
+            samples = self.wake_reader.read(self.capture.chunk, timeout=0.5)
+            if samples is not None and self.wake_word_detector.feed(samples, self.wake_reader.position):
+                # A command said in the same breath starts right after the wake word
+                self.command_start = self.wake_word_detector.wake_end if self.wake_word_detector.run_on else None
+                self.wake_reader = None
+                return True
         return False
 
-    def listen(self):
-        """Listen for a command with noise reduction"""
-        with self.microphone as source:
-            print("Listening...")
-            # Dynamically adjust for ambient noise
-            self.recognizer.adjust_for_ambient_noise(source, duration=0.5)
-            try:
-                audio = self.recognizer.listen(source, timeout=5, phrase_time_limit=10)
-                print("Processing speech...")
-                
-                # Try multiple recognition services for better accuracy
-                try:
-                    # First try Google (most reliable but requires internet)
-                    text = self.recognizer.recognize_google(audio)
-                    print(f"You said (Google): {text}")
-                    return text.lower()
-                except:
-                    try:
-                        # Fallback to Sphinx (offline, less accurate)
-                        text = self.recognizer.recognize_sphinx(audio)
-                        print(f"You said (Sphinx): {text}")
-                        return text.lower()
-                    except:
-                        self.speak("Sorry, I didn't catch that")
-                        return None
-            except sr.WaitTimeoutError:
+    def record_wake_word(self, count=3, directory=TEMPLATE_DIR):
+        """Record the wake word count times as templates for the local spotter"""
+        os.makedirs(directory, exist_ok=True)
+        for i in range(count):
+            self.speak(f"Say {self.wake_words[0]}")
+            source = CaptureSource(self.capture)
+            audio = self.recognizer.listen(source, timeout=5, phrase_time_limit=3)
+            samples = np.frombuffer(audio.get_raw_data(), dtype='<i2')
+            path = os.path.join(directory, f"wake_word_{int(time.time())}_{i}.wav")
+            save_wav(path, trim_silence(samples, source.SAMPLE_RATE), source.SAMPLE_RATE)
+        self.wake_word_detector = self._build_wake_word_detector()
+
+    def listen(self, intent=None):
+        """Listen for a command with noise reduction
+        
+        A phrase the user said over the last response is recognized first,
+        without listening again. intent is the endpointing class expected,
+        if known ("command" or "dictation").
+        """
+        if self.barge_in_audio:
+            audio, self.barge_in_audio = self.barge_in_audio, None
+            self.endpointer.last = None  # not captured by the endpointer, nothing to learn
+            print("Processing speech...")
+            return self._recognize(audio)
+            
+        # Start a little in the past, or where a command said with the wake word started
+        start = self.capture.position() - int(self.capture.rate * self.pre_roll_ms / 1000)
+        if self.command_start is not None:
+            start, self.command_start = self.command_start, None
+        source = CaptureSource(self.capture, start=start)
+        print("Listening...")
+        try:
+            frames = self.endpointer.capture(source, timeout=5, intent=intent)
+            if frames is None:
                 print("Listening timed out")
                 return None
-            except Exception as e:
-                print(f"Error in speech recognition: {str(e)}")
-                return None
+            audio = sr.AudioData(frames, source.SAMPLE_RATE, source.SAMPLE_WIDTH)
+            print("Processing speech...")
+        except Exception as e:
+            print(f"Error in speech recognition: {str(e)}")
+            return None
+        
+        return self._recognize(audio)
+    
+    def _recognize(self, audio):
+        """Turn recorded audio into lowercase text, or None"""
+        # Take the first confident answer; Sphinx (offline, less accurate) covers for Google when it is slow or down
+        result = self.recognition.recognize(audio)
+        if result is None:
+            self.speak("Sorry, I didn't catch that")
+            return None
+        print(f"You said ({result.backend.title()}): {result.text}")
+        return result.text.lower()
 
-    def speak(self, text):
-        """Convert text to speech with improved formatting"""
+    def speak(self, text, priority=REPLY, barge_in=False):
+        """Convert text to speech with improved formatting
+        
+        An "alert" priority stops whatever is being said first. With
+        barge_in the microphone stays open while speaking; if the user talks
+        over the response it stops, and the next listen() recognizes what
+        they said.
+        """
         if not text:
             return
             
         # Clean up the text for better speech
         text = text.replace('_', ' ').replace('-', ' ')
         
-        # Break down long sentences
-        sentences = text.split('. ')
-        
         print(f"Assistant: {text}")
         
-        for sentence in sentences:
-            if sentence:
-                self.engine.say(sentence)
-                self.engine.runAndWait()
-                # Brief pause between sentences for more natural speech
-                time.sleep(0.1)
+        # Speak sentence by sentence, starting as soon as the first one is synthesized
+        if self.tts:
+            if priority == ALERT:
+                self.tts.stop()
+            job = self.tts.speak(text, wait=not barge_in, rate=self.voice_rate, volume=self.voice_volume)
+            if barge_in:
+                self._monitor_barge_in(job)
+    
+    def _monitor_barge_in(self, job):
+        """Listen while a speech job plays and keep what the user says over it"""
+        self.barge_in_audio = None
+        try:
+            source = CaptureSource(self.capture)
+            frames = self.barge_in.monitor(source, job, lambda: self.tts.cancel(job))
+            if frames:
+                print("Interrupted")
+                self.barge_in_audio = sr.AudioData(frames, source.SAMPLE_RATE, source.SAMPLE_WIDTH)
+        except Exception as e:
+            print(f"Error listening during speech: {str(e)}")
+        job.done.wait()
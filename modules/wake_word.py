@@ -0,0 +1,354 @@
+import os
+import glob
+import time
+import wave
+from functools import lru_cache
+
+import numpy as np
+
+from modules.audio_buffer import RingBuffer
+
+try:
+    import pocketsphinx
+    POCKETSPHINX_AVAILABLE = True
+except ImportError:
+    POCKETSPHINX_AVAILABLE = False
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TEMPLATE_DIR = os.path.join(BASE_DIR, 'data', 'wake_word')
+
+
+@lru_cache(maxsize=8)
+def _mel_filterbank(count, nfft, rate):
+    """Triangular filters spaced evenly on the mel scale, as a (count, nfft // 2 + 1) matrix"""
+    mel_max = 2595 * np.log10(1 + rate / 2 / 700)
+    hz = 700 * (10 ** (np.linspace(0, mel_max, count + 2) / 2595) - 1)
+    bins = np.floor((nfft + 1) * hz / rate).astype(int)
+
+    filters = np.zeros((count, nfft // 2 + 1))
+    for i in range(count):
+        left, center, right = bins[i], bins[i + 1], bins[i + 2]
+        filters[i, left:center] = (np.arange(left, center) - left) / max(1, center - left)
+        filters[i, center:right] = (right - np.arange(center, right)) / max(1, right - center)
+    return filters
+
+
+@lru_cache(maxsize=8)
+def _dct_matrix(count, size):
+    """Type II DCT basis keeping the first count coefficients"""
+    return np.cos(np.pi / size * (np.arange(size) + 0.5)[None, :] * np.arange(count)[:, None])
+
+
+def mfcc(samples, rate, count=13, frame_ms=25, hop_ms=10, mels=26):
+    """Get the mel-frequency cepstral coefficients of audio, one row per 10 ms frame
+
+    The coefficients are mean-normalized over the clip, which removes the
+    coloring of the microphone and the room.
+    """
+    samples = np.asarray(samples, dtype=np.float32)
+    frame, hop = int(rate * frame_ms / 1000), int(rate * hop_ms / 1000)
+    if len(samples) < frame:
+        samples = np.pad(samples, (0, frame - len(samples)))
+
+    emphasized = np.append(samples[0], samples[1:] - 0.97 * samples[:-1])
+    frames = 1 + (len(emphasized) - frame) // hop
+    index = np.arange(frame)[None, :] + hop * np.arange(frames)[:, None]
+    windowed = emphasized[index] * np.hamming(frame)
+
+    nfft = 1 << (frame - 1).bit_length()
+    power = np.abs(np.fft.rfft(windowed, nfft)) ** 2 / nfft
+    energies = np.log(np.maximum(power @ _mel_filterbank(mels, nfft, rate).T, 1e-10))
+    coefficients = energies @ _dct_matrix(count, mels).T
+    return coefficients - coefficients.mean(axis=0)
+
+
+def _dtw_last_row(a, b):
+    """Get the accumulated cost of aligning all of a with each prefix of b"""
+    cost = np.sqrt(((a[:, None, :] - b[None, :, :]) ** 2).sum(axis=2))
+    rows, cols = cost.shape
+    previous = np.full(cols + 1, np.inf)
+    previous[0] = 0.0
+    current = np.full(cols + 1, np.inf)
+    for i in range(rows):
+        # current[j + 1] = cost[i, j] + min(diagonal_or_up[j], current[j]) unrolls to
+        # the running minimum of diagonal_or_up[m] - totals[m] plus totals[j + 1]
+        diagonal_or_up = np.minimum(previous[:-1], previous[1:])
+        totals = np.concatenate(([0.0], np.cumsum(cost[i])))
+        current[1:] = totals[1:] + np.minimum.accumulate(diagonal_or_up - totals[:-1])
+        previous, current = current, previous
+        current[0] = np.inf
+    return previous
+
+
+def dtw_prefix_match(a, b):
+    """Match a against the beginning of b; returns (distance per step, frames of b matched)
+
+    A wake word followed by a command without a pause still matches, and
+    the frames matched tell where the command starts.
+    """
+    if 2 * len(b) < len(a):
+        return np.inf, 0
+    distances = _dtw_last_row(a, b)[1:] / (len(a) + np.arange(1, len(b) + 1))
+    end = int(np.argmin(distances))
+    return float(distances[end]), end + 1
+
+
+def trim_silence(samples, rate, ratio=0.1):
+    """Cut the quiet start and end off a recording, in 10 ms frames"""
+    hop = max(1, rate // 100)
+    frames = len(samples) // hop
+    if frames < 2:
+        return samples
+    energy = np.sqrt(np.mean(samples[:frames * hop].astype(np.float32).reshape(frames, hop) ** 2, axis=1))
+    loud = np.flatnonzero(energy > energy.max() * ratio)
+    return samples[loud[0] * hop:(loud[-1] + 1) * hop]
+
+
+def save_wav(path, samples, rate):
+    """Write 16-bit mono samples to a WAV file"""
+    with wave.open(path, 'wb') as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(rate)
+        wav.writeframes(np.asarray(samples, dtype='<i2').tobytes())
+
+
+def read_wav(path):
+    """Read a 16-bit mono WAV file as (samples, rate)"""
+    with wave.open(path, 'rb') as wav:
+        if wav.getsampwidth() != 2:
+            raise ValueError(f"{path} is not 16-bit audio")
+        samples = np.frombuffer(wav.readframes(wav.getnframes()), dtype='<i2')
+        if wav.getnchannels() > 1:
+            samples = samples.reshape(-1, wav.getnchannels()).mean(axis=1).astype(np.int16)
+        return samples, wav.getframerate()
+
+
+class EnergyGate:
+    """First stage: find stretches of audio loud enough to be a word
+
+    Tracks the noise floor as a running average of the energy of quiet
+    frames; a frame is loud when its energy is ratio times the floor (and
+    at least min_energy). A segment ends after hangover_ms of quiet, and is
+    passed on when it lasted between min_ms and max_ms; longer speech is
+    cut at max_ms, since the wake word starts it.
+    """
+
+    def __init__(self, rate, ratio=3.0, min_energy=100, hangover_ms=200, min_ms=250, max_ms=1500):
+        """Initialize the gate"""
+        self.rate = rate
+        self.ratio = ratio
+        self.min_energy = min_energy
+        self.hangover = int(rate * hangover_ms / 1000)
+        self.min_samples = int(rate * min_ms / 1000)
+        self.max_samples = int(rate * max_ms / 1000)
+        self.noise_floor = None
+        self.segment_start = None  # stream position of the last segment passed on
+        self.reset()
+
+    def reset(self):
+        """Forget the segment in progress, keeping the noise floor"""
+        self.start = None
+        self.last_loud = None
+        self.emitted = False
+
+    def threshold(self):
+        """Get the energy a frame needs to count as loud"""
+        return max(self.min_energy, (self.noise_floor or 0.0) * self.ratio)
+
+    def process(self, samples, buffer, end=None):
+        """Feed samples that are in buffer, ending at position end (default: the newest)
+
+        Returns a finished segment, or None.
+        """
+        end = buffer.written if end is None else end
+        energy = float(np.sqrt(np.mean(samples.astype(np.float32) ** 2))) if len(samples) else 0.0
+
+        if energy > self.threshold():
+            if self.start is None:
+                self.start = end - len(samples)
+            self.last_loud = end
+        else:
+            self.noise_floor = energy if self.noise_floor is None else 0.95 * self.noise_floor + 0.05 * energy
+
+        if self.start is None:
+            return None
+
+        if not self.emitted and end - self.start >= self.max_samples:
+            # Too long for a wake word alone; check its beginning
+            self.emitted = True
+            self.segment_start = self.start
+            return buffer.read(self.start, self.start + self.max_samples)
+
+        if end - self.last_loud < self.hangover:
+            return None
+
+        start, stop, emitted = self.start, self.last_loud, self.emitted
+        self.reset()
+        if emitted or stop - start < self.min_samples:
+            return None
+        self.segment_start = start
+        return buffer.read(start, stop)
+
+
+class TemplateSpotter:
+    """Second stage: compare a segment with recordings of the wake word
+
+    Each template is the MFCC sequence of one recording; a segment matches
+    when its dynamic time warping distance to any template is below
+    threshold. Record the wake word a few times, as 16-bit WAV files in
+    data/wake_word/, and tune threshold with benchmarks/bench_wake_word.py.
+    """
+
+    def __init__(self, templates=(), threshold=23.0):
+        """Initialize the spotter with (samples, rate) templates"""
+        self.threshold = threshold
+        self.templates = []
+        self.match_seconds = None  # length of the wake word in the last segment checked
+        for samples, rate in templates:
+            self.add_template(samples, rate)
+
+    @classmethod
+    def from_directory(cls, directory=TEMPLATE_DIR, threshold=23.0):
+        """Load every WAV file in a directory as a template"""
+        paths = sorted(glob.glob(os.path.join(directory, "*.wav")))
+        return cls([read_wav(path) for path in paths], threshold)
+
+    def add_template(self, samples, rate):
+        """Add a recording of the wake word"""
+        samples = trim_silence(samples, rate)
+        self.templates.append((mfcc(samples, rate), len(samples) / rate))
+
+    def distance(self, samples, rate):
+        """Get the distance from a segment to the closest template
+
+        Only the beginning of a long segment is compared, so the features of
+        a command said right after the wake word don't skew its mean.
+        """
+        best, frames = np.inf, 0
+        for template, seconds in self.templates:
+            features = mfcc(samples[:int(seconds * rate * 1.3)], rate)
+            distance, matched = dtw_prefix_match(template, features)
+            if distance < best:
+                best, frames = distance, matched
+        self.match_seconds = frames / 100  # 10 ms frames
+        return best
+
+    def match(self, samples, rate):
+        """Check whether a segment is the wake word"""
+        return self.distance(samples, rate) < self.threshold
+
+
+class RecognizerSpotter:
+    """Second stage: check a segment with a speech_recognition recognizer
+
+    With keyword_mode the recognizer runs pocketsphinx offline in keyword
+    spotting mode for the wake words; otherwise the segment is sent to
+    Google, which only happens for segments that passed the energy gate.
+    """
+
+    def __init__(self, recognizer, wake_words, keyword_mode=True, sensitivity=1e-20):
+        """Initialize the spotter"""
+        self.recognizer = recognizer
+        self.wake_words = wake_words
+        self.keyword_mode = keyword_mode
+        self.keywords = [(word, sensitivity) for word in wake_words]
+        self.match_seconds = None  # the recognizers don't say where the word ends
+
+    def match(self, samples, rate):
+        """Check whether a segment contains a wake word"""
+        import speech_recognition as sr
+        audio = sr.AudioData(samples.astype('<i2').tobytes(), rate, 2)
+        try:
+            if self.keyword_mode:
+                text = self.recognizer.recognize_sphinx(audio, keyword_entries=self.keywords)
+            else:
+                text = self.recognizer.recognize_google(audio)
+        except (sr.UnknownValueError, sr.RequestError):
+            return False
+        text = text.lower()
+        print(f"Heard: {text}")
+        return any(word in text for word in self.wake_words)
+
+
+class WakeWordDetector:
+    """Detect the wake word in a stream of microphone frames
+
+    A cascade: every frame goes into a ring buffer and through the energy
+    gate, and only the segments the gate finds are checked by the spotter.
+    Pass the buffer of an AudioCapture to read the frames where the capture
+    thread wrote them, with feed() instead of process().
+    """
+
+    def __init__(self, spotter, rate, gate=None, buffer=None, buffer_seconds=5):
+        """Initialize the detector"""
+        self.spotter = spotter
+        self.rate = rate
+        self.gate = gate or EnergyGate(rate)
+        self.buffer = buffer or RingBuffer(buffer_seconds, rate)
+        self.frames = 0
+        self.segments = 0
+        self.activations = 0
+        self.spotter_seconds = 0.0
+        self.wake_end = None  # stream position where the last wake word ended
+        self.run_on = False   # whether the user kept talking after it
+
+    def process(self, frame):
+        """Feed a frame of 16-bit PCM audio; returns True when the wake word was heard"""
+        samples = np.frombuffer(frame, dtype='<i2')
+        self.buffer.write(samples)
+        return self.feed(samples, self.buffer.written)
+
+    def feed(self, samples, end):
+        """Check samples already in the buffer, ending at position end; returns True when the wake word was heard"""
+        self.frames += 1
+        segment = self.gate.process(samples, self.buffer, end)
+        if segment is None:
+            return False
+
+        self.segments += 1
+        start = time.perf_counter()
+        try:
+            heard = self.spotter.match(segment, self.rate)
+        finally:
+            self.spotter_seconds += time.perf_counter() - start
+        if heard:
+            self.activations += 1
+            segment_end = self.gate.segment_start + len(segment)
+            if self.spotter.match_seconds is None:
+                self.wake_end = segment_end
+            else:
+                self.wake_end = self.gate.segment_start + int(self.spotter.match_seconds * self.rate)
+            self.run_on = self.gate.emitted or segment_end - self.wake_end > self.gate.hangover
+            self.gate.reset()
+        return heard
+
+    def reset(self):
+        """Forget the segment in progress, e.g. after a gap in the audio"""
+        self.gate.reset()
+
+    def stats(self):
+        """Get how much audio reached each stage"""
+        return {
+            "frames": self.frames,
+            "segments": self.segments,
+            "activations": self.activations,
+            "spotter_seconds": self.spotter_seconds,
+            "noise_floor": self.gate.noise_floor
+        }
+
+
+def build_wake_word_detector(recognizer, wake_words, rate, buffer=None, template_dir=TEMPLATE_DIR):
+    """Get a detector with the best local spotter available
+
+    Uses recordings of the wake word from template_dir, then pocketsphinx
+    keyword spotting; without either, gated segments go to Google.
+    """
+    spotter = TemplateSpotter.from_directory(template_dir)
+    if not spotter.templates:
+        if POCKETSPHINX_AVAILABLE:
+            spotter = RecognizerSpotter(recognizer, wake_words)
+        else:
+            print("No wake word recordings or pocketsphinx found, checking the wake word online")
+            spotter = RecognizerSpotter(recognizer, wake_words, keyword_mode=False)
+    return WakeWordDetector(spotter, rate, buffer=buffer)
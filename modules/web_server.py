@@ -0,0 +1,196 @@
+import json
+import threading
+
+from modules.session_manager import ServerBusy, SessionBusy
+
+try:
+    from flask import Flask, Response, request, jsonify
+    from werkzeug.serving import make_server, WSGIRequestHandler
+    FLASK_AVAILABLE = True
+except ImportError:
+    WSGIRequestHandler = object
+    FLASK_AVAILABLE = False
+
+try:
+    from flask_sock import Sock
+    SOCK_AVAILABLE = True
+except ImportError:
+    SOCK_AVAILABLE = False
+
+KEEP_ALIVE_SECONDS = 15
+
+
+def _error(status, message, retry_after=None):
+    """Get a JSON error response"""
+    response = jsonify({"error": message})
+    response.status_code = status
+    if retry_after:
+        response.headers["Retry-After"] = str(retry_after)
+    return response
+
+
+def _utterance(payload):
+    """Get the utterance text of a request body: JSON {"text": ...} or plain text"""
+    if isinstance(payload, dict):
+        return str(payload.get("text") or "").strip()
+    return str(payload or "").strip()
+
+
+def create_app(manager):
+    """Get the Flask app serving the sessions of a SessionManager
+
+    POST /sessions                          start a session, {"preferences": {...}} overriding the user's
+    GET /sessions/<id>                      its preferences, context and conversation history
+    DELETE /sessions/<id>                   end it
+    POST /sessions/<id>/utterances          {"text": ...}; answers with the first response,
+                                            or 202 if it takes longer than ?wait= seconds (default 10)
+    GET /sessions/<id>/events?after=<id>    every response as server-sent events
+    /sessions/<id>/ws                       a WebSocket taking utterances and sending responses,
+                                            when flask-sock is installed
+    GET /stats                              sessions, requests and latency
+
+    A full server answers 503 and a session with too many requests in
+    flight 429, both with Retry-After.
+    """
+    app = Flask(__name__)
+
+    def session_or_404(session_id):
+        session = manager.get_session(session_id)
+        if session is None:
+            return None, _error(404, "No such session")
+        return session, None
+
+    def submit(session, text):
+        """Submit an utterance; returns (request, error response)"""
+        if not text:
+            return None, _error(400, "No text")
+        try:
+            return manager.submit(session, text), None
+        except SessionBusy as e:
+            return None, _error(429, str(e), retry_after=1)
+        except ServerBusy as e:
+            return None, _error(503, str(e), retry_after=1)
+
+    @app.route("/sessions", methods=["POST"])
+    def create_session():
+        body = request.get_json(silent=True) if request.is_json else None
+        preferences = body.get("preferences") if isinstance(body, dict) else None
+        if preferences is not None and not isinstance(preferences, dict):
+            return _error(400, "preferences must be an object")
+        try:
+            session = manager.create_session(preferences)
+        except ServerBusy as e:
+            return _error(503, str(e), retry_after=5)
+        return jsonify({"session": session.id}), 201
+
+    @app.route("/sessions/<session_id>", methods=["GET"])
+    def get_session(session_id):
+        session, error = session_or_404(session_id)
+        if error:
+            return error
+        return Response(json.dumps(session.state(), default=str), mimetype="application/json")
+
+    @app.route("/sessions/<session_id>", methods=["DELETE"])
+    def delete_session(session_id):
+        if not manager.close_session(session_id):
+            return _error(404, "No such session")
+        return "", 204
+
+    @app.route("/sessions/<session_id>/utterances", methods=["POST"])
+    def post_utterance(session_id):
+        session, error = session_or_404(session_id)
+        if error:
+            return error
+        payload = request.get_json(silent=True) if request.is_json else request.get_data(as_text=True)
+        utterance, error = submit(session, _utterance(payload))
+        if error:
+            return error
+        if not utterance.done.wait(request.args.get("wait", 10, type=float)):
+            return jsonify({"request": utterance.id}), 202
+        return jsonify({"request": utterance.id, "responses": list(utterance.responses)})
+
+    @app.route("/sessions/<session_id>/events", methods=["GET"])
+    def events(session_id):
+        session, error = session_or_404(session_id)
+        if error:
+            return error
+        after = request.args.get("after", session.last_event, type=int)
+
+        def stream():
+            last = after
+            while not session.closed:
+                pending = session.events_after(last, timeout=KEEP_ALIVE_SECONDS)
+                if not pending:
+                    # A comment keeps proxies and the client from closing an idle stream
+                    yield ": keep-alive\n\n"
+                    continue
+                for event in pending:
+                    last = event["id"]
+                    yield f"id: {event['id']}\ndata: {json.dumps(event)}\n\n"
+
+        return Response(stream(), mimetype="text/event-stream",
+                        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+    @app.route("/stats", methods=["GET"])
+    def stats():
+        return jsonify(manager.stats())
+
+    if SOCK_AVAILABLE:
+        _add_websocket_route(app, manager)
+    return app
+
+
+def _add_websocket_route(app, manager):
+    """Serve a session over a WebSocket: utterances in, responses and errors out as JSON"""
+    sock = Sock(app)
+
+    @sock.route("/sessions/<session_id>/ws")
+    def websocket(ws, session_id):
+        session = manager.get_session(session_id)
+        if session is None:
+            ws.send(json.dumps({"type": "error", "status": 404, "error": "No such session"}))
+            return
+        connected = threading.Event()
+        connected.set()
+
+        def forward():
+            last = session.last_event
+            while connected.is_set() and not session.closed:
+                for event in session.events_after(last, timeout=KEEP_ALIVE_SECONDS):
+                    last = event["id"]
+                    ws.send(json.dumps(dict(event, type="response")))
+
+        threading.Thread(target=forward, daemon=True).start()
+        try:
+            while not session.closed:
+                message = ws.receive()
+                if message is None:
+                    break
+                try:
+                    payload = json.loads(message)
+                except ValueError:
+                    payload = message
+                text = _utterance(payload)
+                try:
+                    utterance = manager.submit(session, text) if text else None
+                except SessionBusy as e:
+                    ws.send(json.dumps({"type": "error", "status": 429, "error": str(e)}))
+                    continue
+                except ServerBusy as e:
+                    ws.send(json.dumps({"type": "error", "status": 503, "error": str(e)}))
+                    continue
+                if utterance:
+                    ws.send(json.dumps({"type": "accepted", "request": utterance.id}))
+        finally:
+            connected.clear()
+
+
+class KeepAliveRequestHandler(WSGIRequestHandler):
+    """Keep connections open between requests (HTTP/1.1)"""
+
+    protocol_version = "HTTP/1.1"
+
+
+def make_http_server(manager, host="127.0.0.1", port=8080):
+    """Get a threaded HTTP server for the sessions of manager; call serve_forever() on it"""
+    return make_server(host, port, create_app(manager), threaded=True, request_handler=KeepAliveRequestHandler)
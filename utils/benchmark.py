@@ -0,0 +1,91 @@
+import random
+import time
+
+# Words used to build synthetic intents.json content for benchmarks
+VOCABULARY = [
+    "play", "music", "weather", "today", "tomorrow", "remind", "me", "to", "call",
+    "set", "timer", "for", "alarm", "open", "close", "search", "find", "what",
+    "is", "the", "time", "date", "news", "about", "turn", "volume", "up", "down",
+    "lights", "on", "off", "kitchen", "bedroom", "tell", "joke", "story", "how",
+    "are", "you", "send", "message", "email", "schedule", "meeting", "cancel",
+    "start", "stop", "pause", "resume", "next", "previous", "song", "video",
+    "show", "list", "add", "remove", "shopping", "note", "read", "calendar",
+]
+
+
+def intent_keywords(index, count=5):
+    """Get the keywords that belong to one synthetic intent"""
+    return [f"topic{index}word{k}" for k in range(count)]
+
+
+def synthetic_intents(intent_count, patterns_per_intent=10, seed=42):
+    """Build an intents.json style dictionary with random multi-word patterns
+
+    Each pattern mixes common words with keywords specific to its intent, so
+    larger intent sets have a larger vocabulary like a real intents.json.
+    """
+    rng = random.Random(seed)
+    intents = []
+
+    for i in range(intent_count):
+        keywords = intent_keywords(i)
+        patterns = []
+        for _ in range(patterns_per_intent):
+            words = rng.sample(VOCABULARY, rng.randint(0, 2)) + rng.sample(keywords, rng.randint(1, 2))
+            patterns.append(" ".join(words))
+        intents.append({"tag": f"intent_{i}", "patterns": patterns, "responses": []})
+
+    return {"intents": intents, "entities": []}
+
+
+def synthetic_utterances(count, intent_count=10, seed=7):
+    """Build random utterances that mention keywords of the synthetic intents"""
+    rng = random.Random(seed)
+    utterances = []
+
+    for _ in range(count):
+        words = rng.choices(VOCABULARY, k=rng.randint(2, 8))
+        for index in rng.sample(range(intent_count), min(intent_count, rng.randint(0, 2))):
+            words.insert(rng.randint(0, len(words)), rng.choice(intent_keywords(index)))
+        utterances.append(" ".join(words))
+
+    return utterances
+
+
+def time_calls(func, inputs, repeat=1):
+    """Call func on every input and return the duration of each call in seconds"""
+    durations = []
+    for _ in range(repeat):
+        for item in inputs:
+            start = time.perf_counter()
+            func(item)
+            durations.append(time.perf_counter() - start)
+    return durations
+
+
+def percentile(values, pct):
+    """Get the given percentile (0-100) of a list of numbers"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+def summarize(durations):
+    """Summarize durations in seconds as milliseconds"""
+    count = len(durations)
+    return {
+        "count": count,
+        "mean_ms": sum(durations) / count * 1000 if count else 0.0,
+        "p50_ms": percentile(durations, 50) * 1000,
+        "p95_ms": percentile(durations, 95) * 1000,
+        "p99_ms": percentile(durations, 99) * 1000,
+    }
+
+
+def format_summary(label, durations):
+    """Format a one-line latency summary"""
+    stats = summarize(durations)
+    return (f"{label}: n={stats['count']} mean={stats['mean_ms']:.3f}ms "
+            f"p50={stats['p50_ms']:.3f}ms p95={stats['p95_ms']:.3f}ms p99={stats['p99_ms']:.3f}ms")